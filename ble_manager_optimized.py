@@ -9,8 +9,8 @@ import logging
 from typing import Optional, Callable, Dict, Any
 from bleak import BleakClient, BleakScanner
 from bleak.backends.characteristic import BleakGATTCharacteristic
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.backends import default_backend
+
+from src.modules.core.crypto import MaskCipher
 
 class MaskBLEManager:
     """Gestionnaire BLE optimisé et robuste"""
@@ -28,6 +28,8 @@ class MaskBLEManager:
         
         # Chiffrement
         self.encryption_key = bytes.fromhex(config.get('encryption_key', ''))
+        # Contexte AES ouvert une fois pour toute la connexion (cf. MaskCipher)
+        self.cipher = MaskCipher(self.encryption_key) if self.encryption_key else None
         
         # Callbacks
         self.notification_callbacks: Dict[str, Callable] = {}
@@ -50,12 +52,15 @@ class MaskBLEManager:
         self.logger.info(f"🔍 Scan des dispositifs {device_prefix}... (timeout: {timeout}s)")
         
         try:
-            devices = await BleakScanner.discover(timeout=timeout)
+            # Le scan s'arrête au premier masque annoncé au lieu d'attendre tout le timeout
+            device = await BleakScanner.find_device_by_filter(
+                lambda d, adv: bool(d.name) and device_prefix in d.name,
+                timeout=timeout,
+            )
             
-            for device in devices:
-                if device.name and device_prefix in device.name:
-                    self.logger.info(f"✅ Dispositif trouvé: {device.name} ({device.address})")
-                    return device.address
+            if device is not None:
+                self.logger.info(f"✅ Dispositif trouvé: {device.name} ({device.address})")
+                return device.address
             
             self.logger.warning(f"❌ Aucun dispositif {device_prefix} trouvé")
             return None
@@ -69,7 +74,8 @@ class MaskBLEManager:
         self.connection_stats['attempts'] += 1
         
         try:
-            # Scan si pas d'adresse fournie
+            # Scan si pas d'adresse fournie ni connue (reconnexion directe sinon)
+            device_address = device_address or self.device_address
             if not device_address:
                 device_address = await self.scan_for_device()
                 if not device_address:
@@ -154,21 +160,17 @@ class MaskBLEManager:
     
     def _encrypt_data(self, data: bytes) -> bytes:
         """Chiffre les données avec AES-128 ECB"""
-        if not self.encryption_key or len(data) != 16:
+        if not self.cipher or len(data) != 16:
             return data
         
-        cipher = Cipher(algorithms.AES(self.encryption_key), modes.ECB(), backend=default_backend())
-        encryptor = cipher.encryptor()
-        return encryptor.update(data) + encryptor.finalize()
+        return self.cipher.encrypt(data)
     
     def _decrypt_data(self, data: bytes) -> bytes:
         """Déchiffre les données avec AES-128 ECB"""
-        if not self.encryption_key or len(data) != 16:
+        if not self.cipher or len(data) != 16:
             return data
         
-        cipher = Cipher(algorithms.AES(self.encryption_key), modes.ECB(), backend=default_backend())
-        decryptor = cipher.decryptor()
-        return decryptor.update(data) + decryptor.finalize()
+        return self.cipher.decrypt(data)
     
     def _pad_data(self, data: bytes, length: int = 16) -> bytes:
         """Remplit les données à la longueur spécifiée"""
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks du chemin commande/notification du masque
+
+Usage:
+    python3 benchmark.py crypto [--iterations N]
+    python3 benchmark.py dispatch [--packets N] [--latency MS]
+    python3 benchmark.py throughput [--size BYTES] [--latency MS] [--link-kbps KBPS] [--mtu N] [--loss P]
+    python3 benchmark.py raster [--lengths 10,50,100,500]
+"""
+
+import argparse
+import asyncio
+import time
+
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.backends import default_backend
+
+from mask_crypto import MaskCipher, ENCRYPTION_KEY
+from mask_simulator import SimulatedMaskClient, SIMULATED_MTU
+from scrolling_text_controller import UPLOAD_UUID
+
+# Commandes typiques d'un upload (DATS, DATCP, LIGHT)
+SAMPLE_COMMANDS = [
+    bytearray([9]) + b"DATS" + bytes([0, 120, 0, 48, 0]),
+    bytearray([5]) + b"DATCP",
+    bytearray([6]) + b"LIGHT" + bytes([80]),
+]
+
+
+def _pad(data):
+    return bytes(data) + b'\x00' * (16 - len(data))
+
+
+def _legacy_encrypt(data):
+    """Ancien chemin : un Cipher complet reconstruit à chaque commande"""
+    cipher = Cipher(algorithms.AES(ENCRYPTION_KEY), modes.ECB(), backend=default_backend())
+    encryptor = cipher.encryptor()
+    return encryptor.update(data) + encryptor.finalize()
+
+
+def _rate(func, iterations):
+    start = time.perf_counter()
+    for i in range(iterations):
+        func(i)
+    elapsed = time.perf_counter() - start
+    return iterations / elapsed if elapsed > 0 else float('inf')
+
+
+def bench_crypto(iterations):
+    """Commandes/s : Cipher reconstruit vs contexte partagé vs lot de blocs"""
+    padded = [_pad(c) for c in SAMPLE_COMMANDS]
+    cipher = MaskCipher()
+
+    legacy = _rate(lambda i: _legacy_encrypt(padded[i % len(padded)]), iterations)
+    cached = _rate(lambda i: cipher.encrypt(padded[i % len(padded)]), iterations)
+
+    batch = b''.join(padded) * 32
+    blocks_per_call = len(batch) // 16
+    batched = _rate(lambda i: cipher.encrypt(batch), max(1, iterations // blocks_per_call)) * blocks_per_call
+
+    print(f"Chiffrement AES-128 ECB ({iterations} commandes)")
+    print(f"  avant (Cipher par commande) : {legacy:12.0f} cmd/s")
+    print(f"  après (contexte partagé)    : {cached:12.0f} cmd/s  (x{cached / legacy:.1f})")
+    print(f"  après (lot de {blocks_per_call} blocs)     : {batched:12.0f} cmd/s  (x{batched / legacy:.1f})")
+
+
+async def _timed_upload(mask, packets):
+    """Upload DATS → paquets/REOK → DATCP, retourne (durée totale, attente REOK moyenne)
+
+    L'attente REOK est mesurée depuis l'écriture du paquet : upload_part() rend la main
+    après le délai inter-paquets, souvent plus long que la latence simulée.
+    """
+    size = mask.link.chunk_size * packets
+    bitmap = bytes(size // 2)
+    colors = bytes(size - len(bitmap))
+    waits = []
+
+    written = []
+    write = mask.client.write_gatt_char
+
+    async def timed_write(uuid, data, response=None):
+        if uuid == UPLOAD_UUID:
+            written.append(time.perf_counter())
+        return await write(uuid, data, response=response)
+
+    mask.client.write_gatt_char = timed_write
+
+    start = time.perf_counter()
+    await mask.init_upload(bitmap, colors)
+    while mask.current_upload['bytes_sent'] < mask.current_upload['total_len']:
+        await mask.upload_part()
+        await mask.wait_for_response("REOK", timeout=3.0)
+        waits.append(time.perf_counter() - written[-1])
+    await mask.finish_upload()
+    await mask.wait_for_response("DATCPOK", timeout=3.0)
+    mask.upload_running = False
+    return time.perf_counter() - start, sum(waits) / len(waits)
+
+
+async def _bench_dispatch(packets, latency):
+    from scrolling_text_controller import ScrollingMaskController
+    from mask_pacing import PacingPolicy
+
+    class PollingMaskController(ScrollingMaskController):
+        """Ancienne attente : scrute notification_response toutes les 100 ms"""
+
+        async def wait_for_response(self, expected_response, timeout=3.0):
+            start_time = time.time()
+            while time.time() - start_time < timeout:
+                if self.notification_response == expected_response:
+                    self.notification_response = None
+                    return True
+                await asyncio.sleep(0.1)
+            raise TimeoutError(f"Timeout en attente de {expected_response}")
+
+    results = {}
+    for label, cls in (("avant (polling 100 ms)", PollingMaskController),
+                       ("après (dispatcher)", ScrollingMaskController)):
+        mask = cls(client=SimulatedMaskClient(latency=latency))
+        await mask.connect()
+        # Sans délai inter-paquets : seule l'attente de la notification est mesurée
+        mask.set_pacing(PacingPolicy('bench', window=1, max_packet_delay=0.0))
+        results[label] = await _timed_upload(mask, packets)
+
+    print(f"Upload de {packets} paquets, latence simulée {latency * 1000:.0f} ms")
+    for label, (total, wait) in results.items():
+        print(f"  {label:24s}: {total:6.2f} s au total, attente REOK moyenne {wait * 1000:6.1f} ms")
+
+
+def bench_dispatch(packets, latency_ms):
+    """Latence d'upload : polling de notification_response vs futures par mot-clé"""
+    asyncio.run(_bench_dispatch(packets, latency_ms / 1000.0))
+
+
+async def _bench_throughput(size, latency, link_bytes_per_s, mtu, loss):
+    from scrolling_text_controller import ScrollingMaskController
+    from mask_pacing import PacingPolicy, PACING_PRESETS
+
+    # Ancien comportement : stop-and-wait, 100 ms après commande, 200 ms après paquet
+    legacy = PacingPolicy('legacy', window=1, command_delay=0.1,
+                          min_packet_delay=0.2, max_packet_delay=0.2)
+    policies = [legacy] + list(PACING_PRESETS.values())
+
+    payload = bytes(size)
+    print(f"Upload de {size} bytes, latence {latency * 1000:.0f} ms, lien {link_bytes_per_s / 1000:.0f} kB/s, "
+          f"MTU {mtu}, perte {loss * 100:.0f} %")
+    for policy in policies:
+        client = SimulatedMaskClient(latency=latency, mtu=mtu, loss=loss,
+                                     link_bytes_per_s=link_bytes_per_s, seed=1)
+        mask = ScrollingMaskController(client=client)
+        await mask.connect()
+        mask.set_pacing(policy)
+
+        start = time.perf_counter()
+        await mask.init_upload(payload[:size // 2], payload[size // 2:])
+        await mask.upload_all_parts()
+        await mask.finish_upload()
+        await mask.wait_for_response("DATCPOK", timeout=3.0)
+        elapsed = time.perf_counter() - start
+
+        assert client.text_bitmap + client.text_colors == payload, "Données reçues corrompues"
+        print(f"  {policy.name:7s}: {elapsed:6.2f} s  {size / elapsed / 1000:7.1f} kB/s  "
+              f"{client.upload_writes / elapsed:6.1f} paquets/s  {client.dropped_packets} perdu(s)")
+
+
+def bench_throughput(size, latency_ms, link_kbps, mtu, loss):
+    """Débit d'upload par preset de cadencement sur un lien simulé"""
+    asyncio.run(_bench_throughput(size, latency_ms / 1000.0, link_kbps * 1000.0, mtu, loss))
+
+
+def _legacy_pixels_and_encode(img):
+    """Ancien chemin : getpixel pixel par pixel puis dict bit_mapping par pixel allumé"""
+    import struct
+    width = img.size[0]
+    pixels = []
+    for x in range(width):
+        pixels.append([1 if img.getpixel((x, y)) > 0 else 0 for y in range(16)])
+    results = bytearray()
+    for column in pixels:
+        val = 0
+        for j, pixel in enumerate(column):
+            if pixel == 1:
+                bit_mapping = {0: 128, 1: 64, 2: 32, 3: 16, 4: 8, 5: 4, 6: 2, 7: 1,
+                               8: 32768, 9: 16384, 10: 8192, 11: 4096,
+                               12: 2048, 13: 1024, 14: 512, 15: 256}
+                val |= bit_mapping[j]
+        results.extend(struct.pack('<H', val))
+    return bytes(results)
+
+
+def bench_raster(lengths):
+    """Conversion image -> bitmap : boucle par pixel vs NumPy, puis pipeline complet"""
+    from PIL import Image, ImageDraw, ImageFont
+    from mask_raster import image_to_columns, columns_to_wire, LAYOUT_MSB
+    from mask_controller import MaskTextDisplay
+
+    mask = MaskTextDisplay()
+    print("Texte  colonnes   avant (par pixel)   après (NumPy)   get_text_columns complet")
+    for length in lengths:
+        text = ("MERCI BOB <3 " * (length // 13 + 1))[:length]
+        columns = mask.get_text_columns(text)
+        img = Image.new('L', (len(columns), 16), 0)
+        ImageDraw.Draw(img).text((0, 0), text, fill=255, font=ImageFont.load_default())
+
+        runs = max(3, 2000 // length)
+        start = time.perf_counter()
+        for _ in range(runs):
+            legacy = _legacy_pixels_and_encode(img)
+        legacy_us = (time.perf_counter() - start) / runs * 1e6
+
+        start = time.perf_counter()
+        for _ in range(runs):
+            fast = columns_to_wire(image_to_columns(img), LAYOUT_MSB)
+        fast_us = (time.perf_counter() - start) / runs * 1e6
+        assert legacy == fast, "Encodage différent de l'ancien chemin"
+
+        start = time.perf_counter()
+        for _ in range(runs):
+            mask.get_text_columns(text)
+        full_ms = (time.perf_counter() - start) / runs * 1e3
+
+        print(f"{length:5d}  {len(columns):8d}   {legacy_us:14.0f} µs   {fast_us:10.1f} µs   {full_ms:10.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks du contrôleur de masque")
+    sub = parser.add_subparsers(dest='bench', required=True)
+
+    p_crypto = sub.add_parser('crypto', help="Débit de chiffrement des commandes")
+    p_crypto.add_argument('--iterations', type=int, default=100000)
+
+    p_dispatch = sub.add_parser('dispatch', help="Latence d'upload contre un faux périphérique")
+    p_dispatch.add_argument('--packets', type=int, default=40)
+    p_dispatch.add_argument('--latency', type=float, default=15.0, help="Latence de notification (ms)")
+
+    p_throughput = sub.add_parser('throughput', help="Débit d'upload par preset de cadencement")
+    p_throughput.add_argument('--size', type=int, default=8004, help="Taille du payload (bytes)")
+    p_throughput.add_argument('--latency', type=float, default=15.0, help="Latence de notification (ms)")
+    p_throughput.add_argument('--link-kbps', type=float, default=20.0, help="Débit du lien simulé (kB/s)")
+    p_throughput.add_argument('--mtu', type=int, default=SIMULATED_MTU, help="MTU ATT négocié")
+    p_throughput.add_argument('--loss', type=float, default=0.0, help="Probabilité de perte d'un paquet (0-1)")
+
+    p_raster = sub.add_parser('raster', help="Rastérisation du texte : par pixel vs NumPy")
+    p_raster.add_argument('--lengths', default="10,50,100,500", help="Longueurs de texte testées")
+
+    args = parser.parse_args()
+    if args.bench == 'crypto':
+        bench_crypto(args.iterations)
+    elif args.bench == 'dispatch':
+        bench_dispatch(args.packets, args.latency)
+    elif args.bench == 'throughput':
+        bench_throughput(args.size, args.latency, args.link_kbps, args.mtu, args.loss)
+    elif args.bench == 'raster':
+        bench_raster([int(n) for n in args.lengths.split(',')])
+
+
+if __name__ == "__main__":
+    main()
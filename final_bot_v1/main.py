@@ -15,6 +15,7 @@ import asyncio
 import signal
 import time
 import argparse
+import logging
 import random
 import json
 from typing import Optional, Dict, Any
@@ -25,7 +26,11 @@ from dotenv import load_dotenv
 
 # Local imports
 from mask_controller import MaskTextDisplay
-from web_server import WebServer
+from mask_slots import DiySlotLibrary
+from mask_supervisor import LinkSupervisor
+from mask_scheduler import DisplayScheduler, PRIORITY_ALERT, PRIORITY_SAY, PRIORITY_VAD, PRIORITY_IDLE
+from mask_upload import UploadPreempted
+from web_server import WebServer, ConsoleCapture
 
 # Load environment variables
 load_dotenv()
@@ -99,6 +104,14 @@ class MicrophoneVAD:
 # ==========================================
 # MASK COORDINATOR
 # ==========================================
+# Pre-rendered DIY images: (name, DIY image id, text, color). Kept at the end of the
+# 20 DIY slots so images saved from the editor in the first slots are left alone.
+DIY_SLOTS = [
+    (":)", 18, ":)", (255, 255, 255)),
+    (":O", 19, ":O", (255, 255, 255)),
+    ("Merci", 20, "MERCI\n<3", (0, 255, 255)),
+]
+
 class MaskCoordinator:
     """Manages the mask state, prioritizing events over animations/VAD."""
     
@@ -107,8 +120,9 @@ class MaskCoordinator:
         self.lock = asyncio.Lock()
         
         # State
-        self.mode = "ANIMATION" # or "SPEECH"
+        self.mode = "ANIMATION" # or "SPEECH", "DIY"
         self.current_anim_id = 18
+        self.current_diy_id = None
         self.vad_enabled = False
         
         # Faces for speech mode
@@ -120,95 +134,193 @@ class MaskCoordinator:
         self.overlay_active = False
         self.overlay_until = 0.0
 
+        # One display at a time: alerts > say > VAD face > idle look. Low-priority uploads are
+        # interrupted between packets, and the idle look comes back once nothing is waiting.
+        self.scheduler = DisplayScheduler(on_idle=self._restore_idle, interrupt_target=self.mask)
+
+        # Faces and frequent alerts stored on the mask, recalled with one PLAY
+        self.slots = DiySlotLibrary(self.mask)
+        for name, image_id, text, color in DIY_SLOTS:
+            self.slots.declare_text(name, image_id, text, color)
+
+        # Keeps the link up after the first Connect: reconnects with backoff and replays the state
+        self.link_lock = asyncio.Lock()
+        self.supervisor = LinkSupervisor(self._connect_and_restore, self.is_connected)
+        self.mask.on_disconnect = self.supervisor.link_down
+
+    def is_connected(self):
+        client = self.mask.client
+        return bool(client and client.is_connected)
+
     async def connect(self):
-        return await self.mask.connect()
+        """Manual connect (dashboard). On failure the supervisor keeps retrying in the background."""
+        self.supervisor.enable()
+        try:
+            await self._connect_and_restore()
+        except Exception as e:
+            print(f"❌ Mask connection failed: {e} (retrying in background)")
+            return False
+        self.supervisor.link_up()
+        return True
+
+    async def _connect_and_restore(self):
+        """(Re)connects, then restores brightness, colors, mode and the current look in one batch"""
+        async with self.link_lock:
+            if self.is_connected():
+                return
+            self.slots.invalidate()
+            if self.mask.client:
+                # Dead client left behind by a dropped link
+                try:
+                    await self.mask.disconnect()
+                except Exception:
+                    pass
+            await self.mask.connect()
+            try:
+                async with self.lock:
+                    # Upload only the DIY slots missing from this mask's manifest, then restore the look
+                    await self.slots.sync()
+                    await self.mask.restore_state()
+                    await self._refresh_state()
+            except Exception:
+                # Half-restored link: drop it so the next attempt starts over
+                await self.mask.disconnect()
+                raise
 
     async def disconnect(self):
+        await self.supervisor.stop()
+        self.slots.invalidate()
         await self.mask.disconnect()
 
+    async def _show_face(self, text, pacing=None):
+        """Pre-rendered DIY face if available (one PLAY), otherwise a steady text upload"""
+        if await self.slots.show(text):
+            return
+        self.mask.set_text_color_by_rgb((255, 255, 255))
+        await self.mask.set_scrolling_text(text, scroll_mode='steady', speed=50, pacing=pacing)
+
     async def set_mode_speech(self):
-        async with self.lock:
-            self.mode = "SPEECH"
-            # self.vad_enabled = True # VAD disabled by user request
-            print("🎭 Mode changed to SPEECH (VAD Disabled)")
-            await self._refresh_state()
+        self.mode = "SPEECH"
+        # self.vad_enabled = True # VAD disabled by user request
+        print("🎭 Mode changed to SPEECH (VAD Disabled)")
+        await self._schedule_refresh()
 
     async def set_mode_animation(self, anim_id):
-        async with self.lock:
-            self.mode = "ANIMATION"
-            self.vad_enabled = False
-            self.current_anim_id = int(anim_id)
-            print(f"🎭 Mode changed to ANIMATION {anim_id}")
-            await self._refresh_state()
+        self.mode = "ANIMATION"
+        self.vad_enabled = False
+        self.current_anim_id = int(anim_id)
+        print(f"🎭 Mode changed to ANIMATION {anim_id}")
+        await self._schedule_refresh()
 
-    async def update_vad_face(self, is_open):
-        """Called by VAD loop when speech state changes"""
-        if not self.vad_enabled or self.overlay_active:
+    async def set_mode_diy(self, image_id):
+        self.mode = "DIY"
+        self.vad_enabled = False
+        self.current_diy_id = int(image_id)
+        await self._schedule_refresh()
+
+    def set_pacing(self, pacing):
+        """Default transport pacing preset ('safe', 'fast', 'max') for every mask write"""
+        self.mask.set_pacing(pacing)
+        print(f"⏱️ Pacing preset: {self.mask.pacing.name}")
+
+    async def update_vad_face(self, is_open, pacing=None):
+        """Called by VAD loop when speech state changes. Stale frames are dropped by the scheduler."""
+        if not self.vad_enabled:
             return
 
         # Filtering updates to avoid excessive BLE traffic
         if self.last_face_open_state == is_open:
             return
-            
-        async with self.lock:
-            if not self.vad_enabled or self.overlay_active:
-                return
-            
-            self.last_face_open_state = is_open
-            text = self.face_open if is_open else self.face_closed
-            
-            try:
-                self.mask.set_text_color_by_rgb((255, 255, 255))
-                await self.mask.set_scrolling_text(text, scroll_mode='steady', speed=50)
-            except Exception as e:
-                print(f"❌ VAD Face Error: {e}")
 
-    async def show_overlay_message(self, text, duration=None, color=(0, 255, 0), speed=40):
-        """High priority message (Alerts, Follows, Say)"""
+        async def show_face():
+            async with self.lock:
+                if not self.vad_enabled:
+                    return
+                self.last_face_open_state = is_open
+                self._end_overlay()
+                text = self.face_open if is_open else self.face_closed
+                try:
+                    await self._show_face(text, pacing=pacing)
+                except UploadPreempted:
+                    raise
+                except Exception as e:
+                    print(f"❌ VAD Face Error: {e}")
+
+        # Only the latest pending face is kept
+        await self.scheduler.run(show_face, PRIORITY_VAD, key='vad')
+
+    async def show_overlay_message(self, text, duration=None, color=(0, 255, 0), speed=40, pacing=None,
+                                   priority=PRIORITY_SAY, slot=None):
+        """
+        Queued message (Alerts, Follows, Say). pacing overrides the transport preset for this upload.
+        priority: PRIORITY_ALERT for follows/subs, PRIORITY_SAY for chat and dashboard text.
+        slot: declared DIY slot (e.g. "Merci") played at once, while the text with the name is uploaded.
+        Returns True once the message is on the mask, False if it was dropped (stale, queue full).
+        """
         if speed is None: speed = 40
-        
-        async with self.lock:
-            self.overlay_active = True
-            
-            calc_duration = 3.0 # Default fallback
-            
-            try:
-                self.mask.set_text_color_by_rgb(color)
-                if len(text) > 3:
-                     # Scroll Mode - Get exact duration from generator
-                     calc_duration = await self.mask.set_scrolling_text(text, scroll_mode='scroll_left', speed=speed)
-                     if calc_duration is None: calc_duration = ((len(text) * 8) + 40) * (speed / 1000.0)
-                     print(f"🚨 Overlay: {text} (Exact Time: {calc_duration:.2f}s)")
-                else:
-                    # Steady Mode - Fixed time
-                    await self.mask.set_scrolling_text(text, scroll_mode='steady', speed=speed)
-                    calc_duration = 3.0 # Fixed for steady text
-            except Exception as e:
-                print(f"❌ Overlay Error: {e}")
-                calc_duration = max(3.0, len(text) * 0.5)
-
-            # Use override if provided, else calculated
-            if duration is None:
-                duration = calc_duration
-
-            self.overlay_until = time.time() + duration
-            
-        # Wait for the text to scroll through exactly once
-        await asyncio.sleep(duration)
-        
+
+        async def show():
+            async with self.lock:
+                self.overlay_active = True
+
+                calc_duration = 3.0 # Default fallback
+
+                try:
+                    self.mask.set_text_color_by_rgb(color)
+                    if slot is not None and await self.slots.show(slot):
+                        # Alert card already stored on the mask: on screen during the text upload
+                        print(f"🚨 Overlay: {slot} (DIY slot)")
+                    if len(text) > 3:
+                         # Scroll Mode - Get exact duration from generator
+                         calc_duration = await self.mask.set_scrolling_text(text, scroll_mode='scroll_left', speed=speed, pacing=pacing)
+                         if calc_duration is None: calc_duration = ((len(text) * 8) + 40) * (speed / 1000.0)
+                         print(f"🚨 Overlay: {text} (Exact Time: {calc_duration:.2f}s)")
+                    else:
+                        # Steady Mode - Fixed time
+                        await self.mask.set_scrolling_text(text, scroll_mode='steady', speed=speed, pacing=pacing)
+                        calc_duration = 3.0 # Fixed for steady text
+                except UploadPreempted:
+                    self.overlay_active = False
+                    raise
+                except Exception as e:
+                    print(f"❌ Overlay Error: {e}")
+                    calc_duration = max(3.0, len(text) * 0.5)
+
+                # Use override if provided, else calculated
+                hold = duration if duration is not None else calc_duration
+                self.overlay_until = time.time() + hold
+
+            # The scheduler keeps it on screen for about one scroll, less if more messages are waiting
+            return hold
+
+        # Duplicate alerts (same text and color) pending or on screen are shown once
+        return await self.scheduler.run(show, priority, key=('overlay', text, tuple(color)), name=text)
+
+    def _end_overlay(self):
+        self.overlay_active = False
+        self.overlay_until = 0.0
+
+    async def _restore_idle(self):
+        """Scheduler idle hook: back to the current mode's look once no message is waiting"""
         async with self.lock:
-            self.overlay_active = False
-            self.overlay_until = 0.0
+            self._end_overlay()
             await self._refresh_state()
 
+    async def _schedule_refresh(self):
+        """Redraws the mode's default look, after any message currently on screen"""
+        await self.scheduler.run(self._restore_idle, PRIORITY_IDLE, key='idle')
+
     async def _refresh_state(self):
         """Restores the current mode's default look."""
         try:
             if self.mode == "ANIMATION":
                 await self.mask.set_animation(self.current_anim_id)
             elif self.mode == "SPEECH":
-                self.mask.set_text_color_by_rgb((255, 255, 255))
-                await self.mask.set_scrolling_text(self.face_closed, scroll_mode='steady', speed=50)
+                await self._show_face(self.face_closed)
+            elif self.mode == "DIY" and self.current_diy_id is not None:
+                await self.mask.set_diy_image(self.current_diy_id)
+        except UploadPreempted:
+            raise
         except Exception as e:
             print(f"❌ Refresh State Error: {e}")
 
@@ -272,7 +384,8 @@ class FinalTwitchBot(commands.Bot):
     @commands.command(name='testfollow')
     async def cmd_testfollow(self, ctx):
         """Simulate a follow."""
-        await self.coordinator.show_overlay_message(f"Merci {ctx.author.name}", color=(0, 255, 255))
+        await self.coordinator.show_overlay_message(f"Merci {ctx.author.name}", color=(0, 255, 255), priority=PRIORITY_ALERT,
+                                                   slot="Merci")
 
     async def event_raw_usernotice(self, channel, tags):
         """Handle Subs/Gifts"""
@@ -280,7 +393,8 @@ class FinalTwitchBot(commands.Bot):
         display_name = tags.get('display-name') or 'User'
         if msg_id in {'sub', 'resub', 'subgift', 'anonsubgift'}:
             print(f"🎁 Sub Event: {display_name}")
-            asyncio.create_task(self.coordinator.show_overlay_message(f"Merci {display_name} <3", duration=8.0, color=(255, 215, 0)))
+            asyncio.create_task(self.coordinator.show_overlay_message(f"Merci {display_name} <3", duration=8.0, color=(255, 215, 0),
+                                                                      priority=PRIORITY_ALERT, slot="Merci"))
 
 # ==========================================
 # FOLLOW WATCHER (Helix API)
@@ -336,7 +450,8 @@ async def follow_watcher(coordinator, channel_name):
                 if last_follow_id and fid != last_follow_id:
                     print(f"🔔 NEW FOLLOW: {fname}")
                     last_follow_id = fid
-                    asyncio.create_task(coordinator.show_overlay_message(f"Merci {fname}", color=(0, 255, 255)))
+                    asyncio.create_task(coordinator.show_overlay_message(f"Merci {fname}", color=(0, 255, 255),
+                                                                         priority=PRIORITY_ALERT, slot="Merci"))
                 elif last_follow_id is None:
                     last_follow_id = fid
         except Exception as e:
@@ -367,16 +482,18 @@ async def main():
     bot = FinalTwitchBot(token, channel, nick, coordinator)
     server = WebServer(coordinator)
     
-    # Redirect stdout to capture logs for dashboard
-    class WebLogger:
-        def write(self, message):
-            sys.__stdout__.write(message)
-            if message.strip():
-                server.log(message.strip())
-        def flush(self):
-            sys.__stdout__.flush()
-    
-    sys.stdout = WebLogger()
+    # Dashboard log: logging records from libraries, plus print() output captured line by line
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.INFO)
+    root_logger.addHandler(server.log_handler())
+    terminal = logging.StreamHandler(sys.__stderr__)
+    terminal.setLevel(logging.WARNING)
+    root_logger.addHandler(terminal)
+    # print() output is already on the terminal: dashboard only
+    console_logger = logging.getLogger('console')
+    console_logger.addHandler(server.log_handler())
+    console_logger.propagate = False
+    sys.stdout = ConsoleCapture(console_logger)
     
     # VAD Disabled
     vad = None
@@ -414,6 +531,7 @@ async def main():
     finally:
         print("🛑 Shutting down...")
         await server.stop()
+        await coordinator.scheduler.stop()
         await coordinator.disconnect()
         if vad: await vad.stop()
 
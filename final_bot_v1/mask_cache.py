@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Cache d'upload adressé par contenu
+Suit ce qui est affiché et ce qui est rangé dans les emplacements DIY (SAVE01 / PLAY)
+pour éviter de renvoyer un bitmap identique par DATS -> paquets -> DATCP.
+Garde aussi la dernière image RGB envoyée par index pour mesurer ce qui change d'une image à l'autre.
+"""
+
+import hashlib
+
+import numpy as np
+
+# Résultat de lookup() quand le contenu est déjà à l'écran
+ON_SCREEN = 'on_screen'
+
+# Image DIY envoyée colonne par colonne : 58 pixels RGB par colonne
+DIY_COLUMN_BYTES = 58 * 3
+
+
+def payload_key(kind, *parts):
+    """
+    Empreinte d'un affichage : type ('text', 'rgb'...), données encodées et réglages
+    bytes / bytearray / ndarray sont hachés tels quels, le reste via repr()
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(kind.encode())
+    for part in parts:
+        if isinstance(part, (bytes, bytearray, memoryview)):
+            data = bytes(part)
+        elif hasattr(part, 'tobytes'):
+            data = part.tobytes()
+        else:
+            data = repr(part).encode()
+        digest.update(len(data).to_bytes(4, 'big'))
+        digest.update(data)
+    return f"{kind}:{digest.hexdigest()}"
+
+
+class UploadCache:
+    """
+    État connu du masque, indexé par empreinte de contenu
+
+    on_screen : empreinte de ce qui est affiché (None si inconnu)
+    slots     : (bank, image_id) -> empreinte de l'image sauvegardée dans cet emplacement
+
+    Tout ce qui change l'affichage hors du cache doit appeler show() ou invalidate(),
+    sinon un contenu différent pourrait être pris pour celui à l'écran.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.on_screen = None
+        self.slots = {}
+        self._slot_by_key = {}
+
+        self.hits = 0          # affichage identique déjà à l'écran : aucune écriture
+        self.slot_hits = 0     # contenu déjà dans un emplacement DIY : un seul PLAY
+        self.misses = 0        # upload complet
+        self.bytes_saved = 0
+        self.bytes_uploaded = 0
+
+    def lookup(self, key, size=0):
+        """
+        ON_SCREEN si le contenu est affiché, (bank, image_id) s'il est dans un
+        emplacement DIY, None s'il faut l'uploader. Met à jour les compteurs.
+        """
+        if self.enabled:
+            if key is not None and key == self.on_screen:
+                self.hits += 1
+                self.bytes_saved += size
+                return ON_SCREEN
+            slot = self._slot_by_key.get(key)
+            if slot is not None:
+                self.slot_hits += 1
+                self.bytes_saved += size
+                return slot
+        self.misses += 1
+        return None
+
+    def record_upload(self, key, size, slot=None):
+        """Upload terminé (DATCPOK) : le contenu est à l'écran, et dans slot s'il a été sauvegardé"""
+        self.bytes_uploaded += size
+        self.on_screen = key
+        if slot is not None:
+            self.store(slot, key)
+
+    def store(self, slot, key):
+        """Le contenu key est sauvegardé dans l'emplacement slot = (bank, image_id)"""
+        previous = self.slots.get(slot)
+        if previous is not None:
+            self._slot_by_key.pop(previous, None)
+        self.slots[slot] = key
+        self._slot_by_key[key] = slot
+
+    def slot_key(self, slot):
+        """Empreinte du contenu d'un emplacement DIY (None si inconnu)"""
+        return self.slots.get(slot)
+
+    def show(self, key):
+        """Un autre affichage (animation, PLAY...) remplace l'écran"""
+        self.on_screen = key
+
+    def invalidate(self, slots=False):
+        """Oublie l'écran (reconnexion, erreur d'upload), et les emplacements si slots=True"""
+        self.on_screen = None
+        if slots:
+            self.slots.clear()
+            self._slot_by_key.clear()
+
+    def stats(self):
+        lookups = self.hits + self.slot_hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'hits': self.hits,
+            'slot_hits': self.slot_hits,
+            'misses': self.misses,
+            'hit_rate': round((self.hits + self.slot_hits) / lookups, 3) if lookups else 0.0,
+            'bytes_saved': self.bytes_saved,
+            'bytes_uploaded': self.bytes_uploaded,
+            'slots': len(self.slots),
+        }
+
+
+def changed_column_ranges(previous, current, column_bytes=DIY_COLUMN_BYTES):
+    """Plages [(début, fin exclue)] des colonnes qui diffèrent entre deux buffers de même taille"""
+    a = np.frombuffer(previous, dtype=np.uint8).reshape(-1, column_bytes)
+    b = np.frombuffer(current, dtype=np.uint8).reshape(-1, column_bytes)
+    changed = np.flatnonzero((a != b).any(axis=1))
+    if changed.size == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(changed) > 1)
+    starts = np.concatenate(([changed[0]], changed[breaks + 1]))
+    ends = np.concatenate((changed[breaks], [changed[-1]])) + 1
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+class FrameDeltaTracker:
+    """
+    Dernière image RGB envoyée par index DIY, et différences avec la suivante
+
+    Le protocole DATS n'a ni offset de départ ni écriture partielle : une image modifiée
+    repart en entier. Les plages de colonnes modifiées servent au suivi (éditeur en direct) ;
+    les bytes économisés sont ceux des images remplacées par une plus récente avant la fin
+    de leur upload (les images identiques non renvoyées sont comptées par UploadCache).
+    """
+
+    def __init__(self, column_bytes=DIY_COLUMN_BYTES):
+        self.column_bytes = column_bytes
+        self.frames = {}
+
+        self.compared = 0
+        self.unchanged = 0
+        self.changed_columns = 0
+        self.columns = 0
+        self.superseded = 0
+        self.bytes_saved = 0
+        self.last_ranges = None
+
+    def compare(self, image_index, rgb_data):
+        """Plages de colonnes modifiées depuis la dernière image de cet index (None si pas de référence)"""
+        previous = self.frames.get(image_index)
+        if previous is None or len(previous) != len(rgb_data) or len(rgb_data) % self.column_bytes:
+            self.last_ranges = None
+            return None
+        ranges = changed_column_ranges(previous, rgb_data, self.column_bytes)
+        self.compared += 1
+        self.columns += len(rgb_data) // self.column_bytes
+        self.changed_columns += sum(end - start for start, end in ranges)
+        if not ranges:
+            self.unchanged += 1
+        self.last_ranges = ranges
+        return ranges
+
+    def record(self, image_index, rgb_data):
+        """Image envoyée en entier (DATCPOK) : nouvelle référence pour cet index"""
+        self.frames[image_index] = bytes(rgb_data)
+
+    def supersede(self, unsent):
+        """Image abandonnée pour une plus récente : unsent bytes jamais envoyés"""
+        self.superseded += 1
+        self.bytes_saved += unsent
+
+    def forget(self):
+        self.frames.clear()
+
+    def stats(self):
+        return {
+            'compared': self.compared,
+            'unchanged': self.unchanged,
+            'changed_ratio': round(self.changed_columns / self.columns, 3) if self.columns else None,
+            'last_ranges': self.last_ranges,
+            'superseded': self.superseded,
+            'bytes_saved': self.bytes_saved,
+        }
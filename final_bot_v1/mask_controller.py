@@ -10,17 +10,32 @@ import threading
 from queue import Queue
 from PIL import Image
 import struct
+import numpy as np
 
 # Ajouter le répertoire courant au path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from scrolling_text_controller import ScrollingMaskController
+from mask_pacing import get_pacing
+from mask_raster import pack_columns, white_color_array, pixel_grid_to_rgb
+from mask_glyphs import get_atlas
+from mask_cache import payload_key, ON_SCREEN, FrameDeltaTracker
+from mask_upload import UploadPreempted, UploadCancelled
 
 class MaskTextDisplay(ScrollingMaskController):
     """Contrôleur complet avec toutes les fonctionnalités incluant les couleurs"""
     
-    def __init__(self):
-        super().__init__()
+    # Polices essayées dans l'ordre (texte affiché, puis mesure pour l'auto-ajustement)
+    TEXT_FONT_PATHS = (
+        "ScienceGothic.ttf",
+        "/System/Library/Fonts/Arial.ttf",
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+        "arial.ttf",
+    )
+    SIZE_FONT_PATHS = TEXT_FONT_PATHS[1:]
+    
+    def __init__(self, client=None):
+        super().__init__(client)
         
         # Nouvelles propriétés de couleur
         self.text_color = (255, 255, 255)  # Blanc par défaut
@@ -32,9 +47,14 @@ class MaskTextDisplay(ScrollingMaskController):
         self.show_decorations = True
         self.decoration_style = "lines"
         self.bold_text = False
+        
+        # Dernière image RGB envoyée par index (différences entre images de l'éditeur)
+        self.frame_deltas = FrameDeltaTracker()
     
     def reset_upload_state(self):
         """Réinitialise complètement l'état d'upload"""
+        if self.upload_session is not None:
+            self.upload_session.cancel()
         self.upload_running = False
         if hasattr(self, 'upload_in_progress'):
             self.upload_in_progress = False
@@ -61,6 +81,7 @@ class MaskTextDisplay(ScrollingMaskController):
             data = bytes([length]) + cmd_payload + args
             
             await self.send_command(data)
+            self.upload_cache.show(f"anim:{int(anim_id)}")
             print(f"🎭 Animation {anim_id} activée via ANIM")
             return True
         except Exception as e:
@@ -80,64 +101,73 @@ class MaskTextDisplay(ScrollingMaskController):
             data = bytes([length]) + cmd + args
             
             await self.send_command(data)
+            self.upload_cache.show(self.upload_cache.slot_key((int(bank), int(image_id))))
             print(f"🖼️ DIY Image {image_id} (Bank {bank}) set via PLAY")
             return True
         except Exception as e:
             print(f"❌ Erreur set_diy_image: {e}")
             return False
 
-    async def set_scrolling_text(self, text, scroll_mode='scroll_left', speed=50, width_multiplier=1.2):
+    async def set_scrolling_text(self, text, scroll_mode='scroll_left', speed=50, width_multiplier=1.2, pacing=None):
         """
         Version avec couleurs personnalisées compatible mask-go
+        pacing: preset de cadencement pour cet appel ('safe', 'fast', 'max')
         """
         print(f"Affichage défilant: '{text}' (mode: {scroll_mode}, vitesse: {speed})")
+        # Preset de cet appel, passé à l'upload : self.pacing n'est pas modifié
+        pacing = get_pacing(pacing) if pacing is not None else None
+        policy = pacing or self.pacing
         
         try:
-            # Réinitialisation complète de l'état d'upload
+            # Upload précédent arrêté proprement, puis réinitialisation complète de l'état
+            await self.cancel_upload()
             self.reset_upload_state()
             
-            # 1. Configuration des couleurs selon le protocole mask-go
+            # 1. Génération des colonnes avec espace pour le défilement
+            pixel_map = self.get_text_columns(text, width_multiplier)
+            
+            # 2. Encodage du bitmap
+            bitmap = self.encode_bitmap_for_mask(pixel_map)
+            
+            # 3. Génération des couleurs (blanc pour compatibilité avec mask-go)
+            color_array = self.encode_white_color_array_for_mask(len(pixel_map))
+            
+            # Durée d'un défilement complet : largeur du texte + écran (32 px), speed = ms par pixel
+            width_px = len(pixel_map)
+            duration = (width_px + 32) * (speed / 1000.0)
+            
+            # 4. Même contenu, mêmes couleurs et même mode déjà à l'écran : rien à envoyer
+            key = payload_key('text', bitmap, color_array, tuple(self.text_color), scroll_mode, speed)
+            if self.upload_cache.lookup(key, len(bitmap) + len(color_array)) == ON_SCREEN:
+                print("♻️ Texte identique déjà affiché, upload ignoré")
+                return duration
+            
+            # 5. Configuration des couleurs selon le protocole mask-go
             await self.set_text_front_color(self.text_color)
             await self.set_text_background_color((0, 0, 0))  # Fond noir
             
-            # 2. Configuration du mode et de la vitesse
+            # 6. Configuration du mode et de la vitesse
             await self.set_mode(scroll_mode)
-            await asyncio.sleep(0.3)
             await self.set_scroll_speed(speed)
-            await asyncio.sleep(0.3)  # Attente avant upload pour éviter saturation
-            
-            # 3. Génération de l'image avec espace pour le défilement
-            pixel_map = self.get_text_image(text, width_multiplier)
-            
-            # 4. Encodage du bitmap
-            bitmap = self.encode_bitmap_for_mask(pixel_map)
-            
-            # 5. Génération des couleurs (blanc pour compatibilité avec mask-go)
-            color_array = self.encode_white_color_array_for_mask(len(pixel_map))
+            if policy.settle_delay:
+                await asyncio.sleep(policy.settle_delay)  # Attente avant upload (preset 'safe')
             
             print(f"Image: {len(pixel_map)} colonnes, Bitmap: {len(bitmap)} bytes")
             
-            # 6. Upload
-            await self.init_upload(bitmap, color_array)
-            
-            # 7. Envoi des paquets avec attente de confirmation
-            while self.current_upload['bytes_sent'] < self.current_upload['total_len']:
-                await self.upload_part()
-                await self.wait_for_response("REOK", timeout=3.0)
-                
-            # 8. Finalisation
-            await self.finish_upload()
-            await self.wait_for_response("DATCPOK", timeout=3.0)
+            # 7. Upload : DATS, paquets (fenêtre glissante, REOK par paquet), DATCP
+            await self.upload_buffer(self.text_dats(bitmap, color_array), bitmap + color_array, pacing=pacing)
             
+            self.upload_cache.record_upload(key, len(bitmap) + len(color_array))
             print("✅ Texte défilant configuré avec succès!")
-            
-            # Return calculated time for one full scroll
-            # Distance = Text Width + Screen Width (to clear)
-            # Speed = ms per pixel shift
-            width_px = len(pixel_map)
-            duration = (width_px + 32) * (speed / 1000.0)
             return duration
             
+        except UploadPreempted:
+            # Interrompu par l'ordonnanceur : l'appelant remet le message en file
+            self.reset_upload_state()
+            raise
+        except UploadCancelled:
+            # Remplacé par un texte plus récent (cancel_upload) : rien de plus à faire
+            return None
         except Exception as e:
             print(f"❌ Erreur upload: {e}")
             # Réinitialisation complète en cas d'erreur
@@ -145,45 +175,17 @@ class MaskTextDisplay(ScrollingMaskController):
             import traceback
             traceback.print_exc()
 
-    async def upload_pixel_grid(self, pixels_data):
-        """Uploads a 42x56 pixel grid (flattened hex list) to the mask"""
-        SRC_WIDTH = 42
-        SRC_HEIGHT = 56
-        TARGET_WIDTH = 46
-        TARGET_HEIGHT = 58
-        
+    async def upload_pixel_grid(self, pixels_data, pacing=None):
+        """
+        Uploads a 42x56 editor grid to the mask
+        pixels_data: flattened hex list, or raw row-major RGB (bytes or base64)
+        """
         try:
-            # 1. Create Source Image
-            img = Image.new('RGB', (SRC_WIDTH, SRC_HEIGHT), (0,0,0))
-            pixels = img.load()
-            
-            for i, hex_color in enumerate(pixels_data):
-                if i >= SRC_WIDTH * SRC_HEIGHT: break
-                x = i % SRC_WIDTH
-                y = i // SRC_WIDTH
-                
-                if hex_color and hex_color != 'rgba(0, 0, 0, 0)':
-                    try:
-                        h = hex_color.lstrip('#')
-                        if len(h) == 6:
-                            color = tuple(int(h[i:i+2], 16) for i in (0, 2, 4))
-                            pixels[x, y] = color
-                    except: pass
+            # Bulk decode, LANCZOS resize to 46x58, column-major buffer (NumPy)
+            rgb_buffer = pixel_grid_to_rgb(pixels_data)
             
-            # 2. Resize
-            img_resized = img.resize((TARGET_WIDTH, TARGET_HEIGHT), Image.Resampling.LANCZOS)
-            
-            # 3. Create Buffer
-            rgb_buffer = bytearray()
-            r_pixels = img_resized.load()
-            for x in range(TARGET_WIDTH):
-                for y in range(TARGET_HEIGHT):
-                    r, g, b = r_pixels[x, y]
-                    rgb_buffer.extend([r, g, b])
-            
-            # 4. Upload
             print(f"🎨 Uploading Grid ({len(rgb_buffer)} bytes)...")
-            await self.upload_raw_rgb(rgb_buffer)
+            await self.upload_raw_rgb(rgb_buffer, pacing=pacing)
             return True
             
         except Exception as e:
@@ -192,32 +194,52 @@ class MaskTextDisplay(ScrollingMaskController):
             traceback.print_exc()
             return False
 
-    async def upload_raw_rgb(self, rgb_data, image_index=1):
-        """Standard upload flow for full RGB image"""
+    async def upload_raw_rgb(self, rgb_data, image_index=1, pacing=None, save=False, cancel=None):
+        """
+        Standard upload flow for full RGB image
+        save: SAVE01 après l'upload, l'image reste dans l'emplacement DIY (1, image_index)
+        pacing: preset de cet upload ('safe', 'fast', 'max'), self.pacing n'est pas modifié
+        cancel: asyncio.Event qui arrête l'upload avant le paquet suivant (UploadCancelled)
+        Une image déjà affichée n'est pas renvoyée ; une image déjà sauvegardée est rejouée par PLAY.
+        """
+        key = payload_key('rgb', rgb_data)
+        ranges = self.frame_deltas.compare(image_index, rgb_data)
+        if ranges:
+            changed = sum(end - start for start, end in ranges)
+            print(f"Δ Image {image_index}: {changed} colonne(s) modifiée(s) {ranges}")
+        # Une sauvegarde dans un emplacement précis exige un vrai upload
+        hit = None if save else self.upload_cache.lookup(key, len(rgb_data))
+        if hit == ON_SCREEN:
+            print("♻️ Image identique déjà affichée, upload ignoré")
+            return
+        if hit is not None and hit != ON_SCREEN:
+            bank, image_id = hit
+            print(f"♻️ Image déjà dans l'emplacement DIY {image_id}, PLAY au lieu de l'upload")
+            await self.set_diy_image(image_id, bank)
+            return
+        
+        self.upload_cache.invalidate()
+        try:
+            await self._upload_raw_rgb(rgb_data, image_index, cancel, pacing)
+        except UploadCancelled:
+            # Remplacée par une image plus récente : le reste n'est jamais parti
+            self.frame_deltas.supersede(len(rgb_data) - self.upload_session.acked_bytes)
+            raise
+        self.frame_deltas.record(image_index, rgb_data)
+        slot = None
+        if save:
+            await self.send_command(b"SAVE01")
+            slot = (1, int(image_index))
+        self.upload_cache.record_upload(key, len(rgb_data), slot)
+
+    async def _upload_raw_rgb(self, rgb_data, image_index, cancel=None, pacing=None):
         total_len = len(rgb_data)
         
         # Init (Command 9) with Magic 01 ending
         cmd = bytearray([9]) + b"DATS" + struct.pack('>H', total_len) + struct.pack('>H', image_index) + b"\x01"
         
-        await self.send_command(cmd)
-        
-        # Setup upload state
-        self.current_upload = {
-            'total_len': total_len,
-            'bytes_sent': 0,
-            'complete_buffer': rgb_data,
-            'packet_count': 0
-        }
-        
-        # Upload Loop
-        while self.current_upload['bytes_sent'] < total_len:
-            await self.upload_part()
-            await asyncio.sleep(0.005) # Fast delay
-            
-        # Finish
-        cmd_fin = bytearray([5]) + b"DATCP"
-        await self.send_command(cmd_fin)
-        await self.wait_for_response("DATCPOK", timeout=5.0)
+        # DATS, sliding-window packets (resumed after a REOK timeout), DATCP
+        await self.upload_buffer(cmd, rgb_data, cancel=cancel, pacing=pacing)
 
 # Clean up imports for standalone usage
 
@@ -237,6 +259,7 @@ class MaskTextDisplay(ScrollingMaskController):
             data.append(b)
             
             await self.send_command(data)
+            self.upload_cache.invalidate()
             print(f"🎨 Couleur avant-plan configurée: RGB({r}, {g}, {b})")
             
         except Exception as e:
@@ -257,6 +280,7 @@ class MaskTextDisplay(ScrollingMaskController):
             data.append(b)
             
             await self.send_command(data)
+            self.upload_cache.invalidate()
             print(f"🌑 Couleur arrière-plan configurée: RGB({r}, {g}, {b})")
             
         except Exception as e:
@@ -264,10 +288,7 @@ class MaskTextDisplay(ScrollingMaskController):
     
     def encode_white_color_array_for_mask(self, columns):
         """Génère un tableau de couleurs blanches selon mask-go"""
-        results = bytearray()
-        for i in range(columns):
-            results.extend([0xFF, 0xFF, 0xFF])  # RGB blanc pour chaque colonne
-        return bytes(results)
+        return white_color_array(columns)
     
     def set_font_size(self, size):
         """Définit la taille de la police"""
@@ -462,36 +483,14 @@ class MaskTextDisplay(ScrollingMaskController):
     
     def find_optimal_font_size(self, text):
         """Trouve la taille de police optimale"""
-        from PIL import Image, ImageDraw, ImageFont
-        
         max_height = 12 if self.show_decorations else 15
         max_size = 14 if self.show_decorations else self.font_size
         
         for test_size in range(max_size, 6, -1):
             try:
-                font_paths = [
-                    "/System/Library/Fonts/Arial.ttf",
-                    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-                    "arial.ttf"
-                ]
-                
-                font = None
-                for font_path in font_paths:
-                    try:
-                        font = ImageFont.truetype(font_path, test_size)
-                        break
-                    except:
-                        continue
-                        
-                if font is None:
-                    font = ImageFont.load_default()
-                
-                dummy_img = Image.new('L', (1, 1))
-                dummy_draw = ImageDraw.Draw(dummy_img)
-                bbox = dummy_draw.textbbox((0, 0), text, font=font)
-                text_height = bbox[3] - bbox[1]
-                
-                if text_height <= max_height:
+                # Polices et hauteurs des glyphes en cache : pas de truetype() par taille testée
+                atlas = get_atlas(self.SIZE_FONT_PATHS, test_size)
+                if atlas.text_height(text) <= max_height:
                     return test_size
                     
             except Exception:
@@ -541,185 +540,83 @@ class MaskTextDisplay(ScrollingMaskController):
             
         return decorated_pixels
 
-    def get_text_image(self, text, width_multiplier=1.5):
-        """Génère uniquement le bitmap (sans image RGB) pour le masque"""
-        # Imports sécurisés
-        try:
-            from PIL import Image, ImageDraw, ImageFont
-        except ImportError:
-            print("❌ PIL manquant!")
-            return []
+    def get_text_columns(self, text, width_multiplier=1.5):
+        """Génère le texte directement en mots de colonne 16 bits (tableau NumPy) pour le masque"""
+        # Zone de texte selon les décorations
+        if self.show_decorations:
+            text_area_height = 12
+            text_y_start = 2
+        else:
+            text_area_height = 16
+            text_y_start = 0
 
+        # Glyphes rastérisés une fois par (police, taille, gras, zone de texte)
         try:
-            # Charger la police
-            font_paths = [
-                "ScienceGothic.ttf",
-                "/System/Library/Fonts/Arial.ttf",
-                "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-                "arial.ttf"
-            ]
-            
-            font = None
-            for font_path in font_paths:
-                try:
-                    font = ImageFont.truetype(font_path, self.font_size)
-                    break
-                except:
-                    continue
-                    
-            if font is None:
-                font = ImageFont.load_default()
-                
+            atlas = get_atlas(self.TEXT_FONT_PATHS, self.font_size, self.bold_text,
+                              text_area_height, text_y_start)
         except Exception as e:
-            print(f"⚠️ Erreur police: {e}")
-            font = ImageFont.load_default()
+            print(f"❌ Police indisponible: {e}")
+            return np.zeros(0, dtype='<u2')
 
         # 1. Forcer majuscules
         text = text.upper()
 
         # 2. Calculer la largeur avec espacement
         char_spacing = 2  # Espace entre les lettres (en pixels)
-        
-        # Initialiser dummy_draw pour les calculs
-        dummy_img = Image.new('L', (1, 1))
-        dummy_draw = ImageDraw.Draw(dummy_img)
-        
-        total_text_width = 0
-        char_widths = []
-        
-        for char in text:
-            bbox = dummy_draw.textbbox((0, 0), char, font=font)
-            w = bbox[2] - bbox[0]
-            char_widths.append(w)
-            total_text_width += w + char_spacing
+        total_text_width = atlas.text_width(text, char_spacing)
             
-        if char_widths:
-            total_text_width -= char_spacing # Retirer le dernier espace
-            
-        text_height = 12 # Hauteur max estimée
-        
         # Largeur totale de l'image (avec marge pour défilement)
         total_width = int(total_text_width * width_multiplier)
         if total_width < 32: total_width = 32 # Minimum vital
         
-        # Création de l'image en noir et blanc pour bitmap
-        img = Image.new('L', (total_width, 16), 0)  # Fond noir
-        draw = ImageDraw.Draw(img)
-        
-        # Zone de texte selon les décorations
-        if self.show_decorations:
-            text_area_height = 12
-            text_y_start = 2
-        else:
-            text_area_height = 16
-            text_y_start = 0
-        
         # Positionnement du texte (centré horizontalement dans l'image large)
         x_cursor = (total_width - total_text_width) // 2
         
-        # Dessiner lettre par lettre avec espacement
-        for i, char in enumerate(text):
-            bbox = draw.textbbox((0, 0), char, font=font)
-            char_h = bbox[3] - bbox[1]
-            char_top = bbox[1]
-            
-            # Centrage vertical
-            y_pos = text_y_start + (text_area_height - char_h) // 2 - char_top
-            
-            draw.text((x_cursor, y_pos), char, fill=255, font=font)
-            
-            # Effet gras par superposition si activé
-            if self.bold_text:
-                draw.text((x_cursor + 1, y_pos), char, fill=255, font=font)
-                draw.text((x_cursor, y_pos + 1), char, fill=255, font=font)
-                draw.text((x_cursor + 1, y_pos + 1), char, fill=255, font=font)
-            
-            x_cursor += char_widths[i] + char_spacing
+        # Concaténation des colonnes des glyphes avec espacement
+        columns = atlas.render(text, total_width, x_cursor, char_spacing)
         
-        # Ajouter les décorations directement sur le bitmap
         if self.show_decorations:
-            self.add_decorative_lines_to_bitmap(img, total_width)
+            lit = np.zeros((16, total_width), dtype=bool)
+            self.add_decorative_lines_to_bitmap(lit, total_width)
+            columns |= pack_columns(lit)
         
-        # Conversion directe en bitmap pour le masque
-        pixels = []
-        for x in range(total_width):
-            column = []
-            for y in range(16):
-                pixel_value = img.getpixel((x, y))
-                column.append(1 if pixel_value > 0 else 0)
-            pixels.append(column)
-        
-        return pixels
+        return columns
     
-    def add_decorative_lines_to_bitmap(self, img, width):
-        """Ajoute des décorations directement sur le bitmap noir et blanc"""
-        for x in range(width):
-            if self.decoration_style == "lines":
-                for y in [0, 1, 14, 15]:
-                    img.putpixel((x, y), 255)
-                    
-            elif self.decoration_style == "dots":
-                if x % 3 == 0:
-                    for y in [0, 1, 14, 15]:
-                        img.putpixel((x, y), 255)
-                        
-            elif self.decoration_style == "blocks":
-                if (x // 4) % 2 == 0:
-                    for y in [0, 1, 14, 15]:
-                        img.putpixel((x, y), 255)
-                        
-            elif self.decoration_style == "waves":
-                wave_top = int(1.5 + 0.5 * abs(((x % 20) - 10) / 10))
-                wave_bottom = int(14.5 - 0.5 * abs(((x % 20) - 10) / 10))
-                if 0 <= wave_top < 16:
-                    img.putpixel((x, wave_top), 255)
-                if 0 <= wave_bottom < 16:
-                    img.putpixel((x, wave_bottom), 255)
+    def add_decorative_lines_to_bitmap(self, lit, width):
+        """Ajoute des décorations directement sur le bitmap booléen (16, width)"""
+        x = np.arange(width)
+        
+        if self.decoration_style == "lines":
+            lit[[0, 1, 14, 15], :] = True
+                
+        elif self.decoration_style == "dots":
+            lit[np.ix_([0, 1, 14, 15], x % 3 == 0)] = True
                     
-            elif self.decoration_style == "blocks_pattern":
-                # Pattern en blocs comme dans BLOCKS_PATTERN_SUCCESS.md
-                for y in range(16):  # Hauteur fixe du masque
-                    if (x // 4) % 2 == 0 and (y // 2) % 2 == 0:
-                        if img.getpixel((x, y)) == 0:  # Seulement sur fond noir
-                            img.putpixel((x, y), 255)
-                            
-            elif self.decoration_style == "tata_pattern":
-                for y in [1, 14]:
-                    img.putpixel((x, y), 255)
-                if x % 5 == 0:
-                    for y in [0, 15]:
-                        img.putpixel((x, y), 255)
-                            
-            elif self.decoration_style == "tata_line_pattern":
-                # Pattern avec 10 points au début et à la fin de chaque ligne
-                for y in [0, 15]:
-                    should_light = False
+        elif self.decoration_style == "blocks":
+            lit[np.ix_([0, 1, 14, 15], (x // 4) % 2 == 0)] = True
                     
-                    if x < 10:
-                        # 10 premiers points (0-9): toujours allumés
-                        should_light = True
-                    elif x >= 54:
-                        # 10 derniers points (54-63): toujours allumés
-                        should_light = True
-                    else:
-                        # Zone milieu (10-53): motif répétitif de 16 pixels
-                        middle_pos = (x - 10) % 16
+        elif self.decoration_style == "waves":
+            wave = 0.5 * np.abs(((x % 20) - 10) / 10)
+            lit[(1.5 + wave).astype(int), x] = True
+            lit[(14.5 - wave).astype(int), x] = True
+                
+        elif self.decoration_style == "blocks_pattern":
+            # Pattern en blocs comme dans BLOCKS_PATTERN_SUCCESS.md
+            rows = [y for y in range(16) if (y // 2) % 2 == 0]
+            lit[np.ix_(rows, (x // 4) % 2 == 0)] = True
                         
-                        if middle_pos < 10:
-                            # 10 points continus
-                            should_light = True
-                        elif middle_pos == 10 or middle_pos == 11:
-                            # 2 espaces
-                            should_light = False
-                        elif middle_pos == 12 or middle_pos == 13:
-                            # 2 points
-                            should_light = True
-                        elif middle_pos == 14 or middle_pos == 15:
-                            # 2 espaces
-                            should_light = False
-                    
-                    if should_light and img.getpixel((x, y)) == 0:
-                        img.putpixel((x, y), 255)
+        elif self.decoration_style == "tata_pattern":
+            lit[[1, 14], :] = True
+            lit[np.ix_([0, 15], x % 5 == 0)] = True
+                        
+        elif self.decoration_style == "tata_line_pattern":
+            # 10 points au début et à la fin (0-9 et 54+), puis au milieu un motif
+            # de 16 pixels : 10 points, 2 espaces, 2 points, 2 espaces
+            middle_pos = (x - 10) % 16
+            should_light = (x < 10) | (x >= 54) | (middle_pos < 10) | (middle_pos == 12) | (middle_pos == 13)
+            lit[np.ix_([0, 15], should_light)] = True
+        
+        return lit
 
 class UltimateTextDisplay:
     def __init__(self):
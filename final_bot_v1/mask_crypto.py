@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Couche de chiffrement partagée pour le masque LED
+AES-128 ECB avec un contexte unique (key schedule) réutilisé pour toute la connexion
+"""
+
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.backends import default_backend
+
+# Clé AES du masque (identique à mask-go)
+ENCRYPTION_KEY = bytes.fromhex("32672f7974ad43451d9c6c894a0e8764")
+
+BLOCK_SIZE = 16
+
+
+class MaskCipher:
+    """
+    Contexte AES-128 ECB réutilisable
+
+    En ECB chaque bloc est indépendant : on garde un encryptor et un decryptor
+    ouverts (sans jamais appeler finalize) au lieu de recréer un Cipher à chaque
+    commande. Un appel peut traiter plusieurs blocs de 16 bytes d'un coup.
+    """
+
+    def __init__(self, key=ENCRYPTION_KEY):
+        cipher = Cipher(algorithms.AES(key), modes.ECB(), backend=default_backend())
+        self._encryptor = cipher.encryptor()
+        self._decryptor = cipher.decryptor()
+
+    @staticmethod
+    def _check_blocks(data):
+        if not data or len(data) % BLOCK_SIZE:
+            raise ValueError(f"Data length must be a multiple of {BLOCK_SIZE} bytes (got {len(data)})")
+
+    def encrypt(self, data):
+        """Chiffre un ou plusieurs blocs de 16 bytes"""
+        self._check_blocks(data)
+        return self._encryptor.update(bytes(data))
+
+    def decrypt(self, data):
+        """Déchiffre un ou plusieurs blocs de 16 bytes"""
+        self._check_blocks(data)
+        return self._decryptor.update(bytes(data))
+
+    def encrypt_command(self, data):
+        """Complète une commande à 16 bytes avec des zéros puis la chiffre"""
+        if len(data) > BLOCK_SIZE:
+            raise ValueError(f"Command too long: {len(data)} bytes")
+        return self.encrypt(bytes(data) + b'\x00' * (BLOCK_SIZE - len(data)))
+
+    def encrypt_commands(self, commands):
+        """Chiffre une série de commandes en un seul appel (un bloc par commande)"""
+        if any(len(c) > BLOCK_SIZE for c in commands):
+            raise ValueError(f"Command too long (max {BLOCK_SIZE} bytes)")
+        padded = b''.join(bytes(c) + b'\x00' * (BLOCK_SIZE - len(c)) for c in commands)
+        ciphertext = self.encrypt(padded)
+        return [ciphertext[i:i + BLOCK_SIZE] for i in range(0, len(ciphertext), BLOCK_SIZE)]
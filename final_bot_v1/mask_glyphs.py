@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Atlas de glyphes pour le texte défilant
+Chaque caractère est rastérisé une seule fois par (police, taille, gras, zone de texte)
+en mots de colonne 16 bits ; un texte devient une simple concaténation de colonnes.
+"""
+
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from mask_raster import MASK_HEIGHT, image_to_columns
+
+# Glyphes gardés par atlas, et atlas gardés au total (LRU)
+MAX_GLYPHS_PER_ATLAS = 256
+MAX_ATLASES = 16
+
+# Colonnes de marge autour de textbbox (anticrénelage hors de la boîte)
+GLYPH_MARGIN = 2
+
+
+@lru_cache(maxsize=64)
+def load_font(font_paths, size):
+    """
+    Charge la première police disponible de font_paths (tuple) à la taille donnée
+    Retourne (chemin, police) ; chemin vaut None pour la police par défaut de PIL
+    """
+    for font_path in font_paths:
+        try:
+            return font_path, ImageFont.truetype(font_path, size)
+        except Exception:
+            continue
+    return None, ImageFont.load_default()
+
+
+class Glyph:
+    """Colonnes d'un caractère, relatives à la position du curseur"""
+
+    __slots__ = ('bbox', 'width', 'offset', 'columns')
+
+    def __init__(self, bbox, offset, columns):
+        self.bbox = bbox
+        self.width = bbox[2] - bbox[0]  # avance utilisée pour le curseur
+        self.offset = offset            # première colonne dessinée, relative au curseur
+        self.columns = columns          # mots de colonne '<u2'
+
+
+class GlyphAtlas:
+    """
+    Glyphes d'une police pour une zone de texte donnée
+
+    Le positionnement vertical est celui de MaskTextDisplay.get_text_columns :
+    chaque caractère est centré dans la zone [text_y_start, text_y_start + text_area_height).
+    En gras, le caractère est redessiné décalé de (1, 0), (0, 1) et (1, 1).
+    """
+
+    def __init__(self, font, bold=False, text_area_height=MASK_HEIGHT, text_y_start=0,
+                 max_glyphs=MAX_GLYPHS_PER_ATLAS):
+        self.font = font
+        self.bold = bold
+        self.text_area_height = text_area_height
+        self.text_y_start = text_y_start
+        self.max_glyphs = max_glyphs
+        self._glyphs = OrderedDict()
+        self._draw = ImageDraw.Draw(Image.new('L', (1, 1)))
+        self.hits = 0
+        self.misses = 0
+
+    def glyph(self, char):
+        """Glyphe d'un caractère (rastérisé au premier appel)"""
+        glyph = self._glyphs.get(char)
+        if glyph is not None:
+            self._glyphs.move_to_end(char)
+            self.hits += 1
+            return glyph
+
+        self.misses += 1
+        glyph = self._rasterize(char)
+        self._glyphs[char] = glyph
+        if len(self._glyphs) > self.max_glyphs:
+            self._glyphs.popitem(last=False)
+        return glyph
+
+    def _rasterize(self, char):
+        bbox = self._draw.textbbox((0, 0), char, font=self.font)
+        char_h = bbox[3] - bbox[1]
+        y_pos = self.text_y_start + (self.text_area_height - char_h) // 2 - bbox[1]
+
+        # Tuile couvrant l'encre du caractère (approche négative et décalage gras compris)
+        extra = 1 if self.bold else 0
+        offset = min(0, bbox[0]) - GLYPH_MARGIN
+        tile_width = max(bbox[2], bbox[0]) + extra + GLYPH_MARGIN - offset
+        tile = Image.new('L', (tile_width, MASK_HEIGHT), 0)
+        draw = ImageDraw.Draw(tile)
+        x = -offset
+        draw.text((x, y_pos), char, fill=255, font=self.font)
+        if self.bold:
+            draw.text((x + 1, y_pos), char, fill=255, font=self.font)
+            draw.text((x, y_pos + 1), char, fill=255, font=self.font)
+            draw.text((x + 1, y_pos + 1), char, fill=255, font=self.font)
+
+        return Glyph(bbox, offset, image_to_columns(tile, threshold=0))
+
+    def text_width(self, text, char_spacing=0):
+        """Largeur du texte avec espacement entre les lettres"""
+        return sum(self.glyph(char).width for char in text) + char_spacing * max(0, len(text) - 1)
+
+    def text_height(self, text):
+        """Hauteur de l'encre du texte (comme textbbox sur la chaîne complète)"""
+        if not text:
+            return 0
+        glyphs = [self.glyph(char) for char in set(text)]
+        return max(g.bbox[3] for g in glyphs) - min(g.bbox[1] for g in glyphs)
+
+    def render(self, text, total_width, x_start, char_spacing=0):
+        """
+        Mots de colonne du texte sur total_width colonnes, premier caractère en x_start
+        Les colonnes des glyphes sont combinées par OU (les débordements se recouvrent
+        exactement comme avec draw.text sur une seule image)
+        """
+        columns = np.zeros(total_width, dtype='<u2')
+        x_cursor = x_start
+        for char in text:
+            glyph = self.glyph(char)
+            start = x_cursor + glyph.offset
+            lo = max(0, start)
+            hi = min(total_width, start + len(glyph.columns))
+            if lo < hi:
+                columns[lo:hi] |= glyph.columns[lo - start:hi - start]
+            x_cursor += glyph.width + char_spacing
+        return columns
+
+    def stats(self):
+        return {'glyphs': len(self._glyphs), 'hits': self.hits, 'misses': self.misses}
+
+
+_atlases = OrderedDict()
+
+
+def get_atlas(font_paths, size, bold=False, text_area_height=MASK_HEIGHT, text_y_start=0):
+    """Atlas partagé pour (police, taille, gras, zone de texte), avec éviction LRU"""
+    font_path, font = load_font(tuple(font_paths), size)
+    key = (font_path, size, bool(bold), text_area_height, text_y_start)
+    atlas = _atlases.get(key)
+    if atlas is None:
+        atlas = GlyphAtlas(font, bold, text_area_height, text_y_start)
+        _atlases[key] = atlas
+        if len(_atlases) > MAX_ATLASES:
+            _atlases.popitem(last=False)
+    else:
+        _atlases.move_to_end(key)
+    return atlas
+
+
+def clear_atlases():
+    """Vide les atlas et le cache des polices (ex : après changement de fichier de police)"""
+    _atlases.clear()
+    load_font.cache_clear()
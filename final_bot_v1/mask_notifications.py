@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Répartiteur de notifications du masque
+Réveille les tâches en attente dès qu'une réponse (DATSOK, REOK, DATCPOK...) est déchiffrée
+"""
+
+import asyncio
+from collections import defaultdict, deque
+
+# Nombre maximal de réponses gardées par mot-clé quand personne ne les attend
+MAX_PENDING_PER_KEYWORD = 64
+
+
+class NotificationDispatcher:
+    """
+    Route les réponses du masque vers des futures, une file par mot-clé
+
+    Une réponse qui arrive avant son attente est mise de côté : deux REOK
+    consécutifs ne se perdent plus comme avec l'ancien attribut unique.
+    """
+
+    def __init__(self, max_pending=MAX_PENDING_PER_KEYWORD):
+        self.max_pending = max_pending
+        self._waiters = defaultdict(deque)
+        self._pending = defaultdict(lambda: deque(maxlen=self.max_pending))
+        self._listeners = []
+        self.last_response = None
+
+    def dispatch(self, response, raw=None):
+        """
+        À appeler depuis le handler de notification (boucle asyncio)
+        raw: bloc déchiffré complet (16 bytes), utile pour le numéro de séquence des REOK
+        """
+        self.last_response = response
+        for listener in list(self._listeners):
+            listener(response)
+
+        waiters = self._waiters.get(response)
+        while waiters:
+            future = waiters.popleft()
+            if not future.done():
+                future.set_result((response, raw))
+                return
+        self._pending[response].append((response, raw))
+
+    def add_listener(self, callback):
+        """Appelle callback(response) pour chaque notification reçue"""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def pending(self, keyword):
+        """Nombre de réponses reçues et pas encore consommées"""
+        return len(self._pending.get(keyword, ()))
+
+    def clear(self, keyword=None):
+        """Oublie les réponses en attente (toutes ou pour un mot-clé)"""
+        if keyword is None:
+            self._pending.clear()
+        else:
+            self._pending.pop(keyword, None)
+
+    async def wait_for(self, keyword, timeout=None, raw=False):
+        """
+        Attend la prochaine réponse égale à keyword (asyncio.TimeoutError sinon)
+        Retourne la réponse, ou le bloc déchiffré complet si raw=True
+        """
+        pending = self._pending.get(keyword)
+        if pending:
+            response, block = pending.popleft()
+            return block if raw else response
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[keyword].append(future)
+        try:
+            response, block = await asyncio.wait_for(future, timeout)
+            return block if raw else response
+        finally:
+            waiters = self._waiters.get(keyword)
+            if waiters and future in waiters:
+                waiters.remove(future)
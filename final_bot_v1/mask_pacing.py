@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Politiques de cadencement du transport BLE du masque
+Remplace les sleeps fixes par un contrôle de flux à crédits (un crédit = un paquet sans REOK)
+"""
+
+
+class PacingPolicy:
+    """
+    Règles de cadencement d'un transfert
+
+    window          : crédits d'upload, nombre de paquets en vol sans REOK
+    command_delay   : pause après chaque commande chiffrée
+    settle_delay    : pause après MODE / SPEED avant un upload
+    min/max_packet_delay : bornes du délai inter-paquets réglé par LinkTuner
+    """
+
+    def __init__(self, name, window, command_delay=0.0, settle_delay=0.0,
+                 min_packet_delay=0.0, max_packet_delay=0.2):
+        self.name = name
+        self.window = window
+        self.command_delay = command_delay
+        self.settle_delay = settle_delay
+        self.min_packet_delay = min_packet_delay
+        self.max_packet_delay = max_packet_delay
+
+    def packet_delay(self, link=None):
+        """Délai inter-paquets : valeur adaptative du lien, bornée par la politique"""
+        delay = link.packet_delay if link is not None else self.min_packet_delay
+        return min(self.max_packet_delay, max(self.min_packet_delay, delay))
+
+    def __repr__(self):
+        return f"PacingPolicy({self.name!r}, window={self.window})"
+
+
+PACING_PRESETS = {
+    # Comportement proche de l'historique : stop-and-wait, pauses après les commandes
+    'safe': PacingPolicy('safe', window=1, command_delay=0.1, settle_delay=0.3,
+                         min_packet_delay=0.02, max_packet_delay=0.2),
+    # Fenêtre de 4 paquets, plus aucune pause fixe
+    'fast': PacingPolicy('fast', window=4, min_packet_delay=0.0, max_packet_delay=0.1),
+    # Débit maximal : seuls les REOK limitent le flux
+    'max': PacingPolicy('max', window=8, min_packet_delay=0.0, max_packet_delay=0.05),
+}
+
+DEFAULT_PACING = 'fast'
+
+
+def get_pacing(pacing=None):
+    """Retourne une PacingPolicy à partir d'un nom de preset, d'une politique ou de None"""
+    if pacing is None:
+        return PACING_PRESETS[DEFAULT_PACING]
+    if isinstance(pacing, PacingPolicy):
+        return pacing
+    try:
+        return PACING_PRESETS[str(pacing).lower()]
+    except KeyError:
+        raise ValueError(f"Preset de cadencement inconnu: {pacing} ({', '.join(PACING_PRESETS)})") from None
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Rastérisation vectorisée pour le masque LED
+Image PIL 'L' de 16 lignes -> mots de colonne 16 bits little-endian, sans listes Python
+Grille de l'éditeur (42x56, hex ou RGB brut) -> image DIY 46x58 RGB en colonnes, avec NumPy
+
+Format d'une colonne (identique à ScrollingMaskController.encode_bitmap_for_mask) :
+  byte 0 = lignes 0..7  (ligne 0 = 0x80)
+  byte 1 = lignes 8..15 (ligne 8 = 0x80)
+soit np.packbits sur l'axe des lignes, en ordre de bits 'big' (LAYOUT_MSB).
+LAYOUT_LSB (bit y = ligne y) est celui des contrôleurs de src/modules ; les deux
+passent par le même encodeur (miroir de src/modules/utils/bitmap.py), et la
+disposition est toujours donnée explicitement par l'appelant.
+"""
+
+import base64
+from collections.abc import Sequence
+
+import numpy as np
+from PIL import Image
+
+MASK_HEIGHT = 16
+
+LAYOUT_LSB = 'lsb'
+LAYOUT_MSB = 'msb'
+
+# Disposition -> ordre des bits de np.packbits dans chaque byte
+LAYOUTS = {
+    LAYOUT_LSB: 'little',
+    LAYOUT_MSB: 'big',
+}
+
+# Inversion des bits d'un byte : passe d'une disposition à l'autre
+_REVERSED_BITS = np.array([int(f"{i:08b}"[::-1], 2) for i in range(256)], dtype=np.uint8)
+
+# Grille de l'éditeur et image DIY du masque (RGB, colonne par colonne)
+GRID_WIDTH = 42
+GRID_HEIGHT = 56
+DIY_WIDTH = 46
+DIY_HEIGHT = 58
+DIY_RGB_SIZE = DIY_WIDTH * DIY_HEIGHT * 3  # 8004
+
+
+def threshold_image(img, threshold=0):
+    """Image PIL 'L' (ou tableau 16xW) -> tableau booléen (16, W)"""
+    return np.asarray(img, dtype=np.uint8) > threshold
+
+
+def pack_columns(lit):
+    """Tableau booléen (16, W) -> mots de colonne uint16 little-endian (W,)"""
+    packed = np.packbits(lit[:MASK_HEIGHT], axis=0, bitorder='big')  # (2, W)
+    return np.ascontiguousarray(packed.T).view('<u2').ravel()
+
+
+def image_to_columns(img, threshold=0):
+    """Image PIL 'L' de 16 lignes -> mots de colonne prêts à envoyer"""
+    return pack_columns(threshold_image(img, threshold))
+
+
+def columns_to_wire(columns, layout):
+    """Mots de colonne -> bytes du bitmap (aucune conversion de bits en LAYOUT_MSB)"""
+    data = np.asarray(columns, dtype='<u2').tobytes()
+    return convert_layout(data, LAYOUT_MSB, layout)
+
+
+def _bitorder(layout):
+    try:
+        return LAYOUTS[layout]
+    except KeyError:
+        raise ValueError(f"Disposition de bitmap inconnue: {layout!r} ({', '.join(LAYOUTS)})") from None
+
+
+def pixels_to_grid(pixel_map):
+    """List[List[int]] (une liste de pixels par colonne) -> tableau booléen (W, 16)"""
+    width = len(pixel_map)
+    grid = np.zeros((width, MASK_HEIGHT), dtype=bool)
+    if not width:
+        return grid
+    try:
+        values = np.asarray(pixel_map)
+    except ValueError:
+        values = None  # colonnes de longueurs différentes
+    if values is not None and values.ndim == 2 and values.dtype != object:
+        lit = values[:, :MASK_HEIGHT] == 1
+        grid[:, :lit.shape[1]] = lit
+        return grid
+    for x, column in enumerate(pixel_map):
+        lit = np.asarray(column[:MASK_HEIGHT]) == 1
+        grid[x, :len(lit)] = lit
+    return grid
+
+
+def encode_bitmap(pixel_map, layout):
+    """Colonnes de pixels -> bitmap du masque (2 bytes par colonne)"""
+    return np.packbits(pixels_to_grid(pixel_map), axis=1, bitorder=_bitorder(layout)).tobytes()
+
+
+def decode_bitmap(data, layout):
+    """Bitmap du masque -> colonnes de pixels List[List[int]]"""
+    packed = np.frombuffer(bytes(data), dtype=np.uint8).reshape(-1, 2)
+    return np.unpackbits(packed, axis=1, bitorder=_bitorder(layout)).tolist()
+
+
+def convert_layout(data, source, target):
+    """Réécrit un bitmap d'une disposition dans l'autre (table d'inversion des bits)"""
+    if _bitorder(source) == _bitorder(target):
+        return bytes(data)
+    return _REVERSED_BITS[np.frombuffer(bytes(data), dtype=np.uint8)].tobytes()
+
+
+def pixels_to_wire(pixel_map):
+    """Ancien format List[List[int]] (une liste de 16 pixels par colonne) -> bytes du bitmap"""
+    return encode_bitmap(pixel_map, LAYOUT_MSB)
+
+
+def unpack_columns(columns):
+    """Mots de colonne -> tableau booléen (16, W), inverse de pack_columns"""
+    packed = np.asarray(columns, dtype='<u2').view(np.uint8).reshape(-1, 2)
+    return np.unpackbits(packed, axis=1, bitorder='big').T.astype(bool)
+
+
+def columns_to_pixels(columns):
+    """Mots de colonne -> ancien format List[List[int]] (compatibilité)"""
+    return unpack_columns(columns).T.astype(np.uint8).tolist()
+
+
+def white_color_array(columns):
+    """Tableau de couleurs blanches (3 bytes par colonne)"""
+    return b'\xff' * (3 * columns)
+
+
+def _hex6(color):
+    """'#rrggbb' -> 'rrggbb' ; toute autre valeur (vide, non-chaîne, rgba(...), invalide) -> noir"""
+    if not isinstance(color, str):
+        return '000000'
+    h = color.lstrip('#')
+    return h if len(h) == 6 else '000000'
+
+
+def _is_hex(h):
+    try:
+        return len(bytes.fromhex(h)) == 3
+    except ValueError:
+        return False
+
+
+def decode_hex_grid(colors, width=GRID_WIDTH, height=GRID_HEIGHT):
+    """Liste de couleurs hex (ligne par ligne) -> tableau (height, width, 3) uint8, décodé d'un bloc"""
+    if not isinstance(colors, Sequence):
+        raise ValueError(f"Grille de pixels invalide ({type(colors).__name__}), liste de couleurs attendue")
+    count = width * height
+    hexes = [_hex6(c) for c in colors[:count]]
+    try:
+        raw = bytes.fromhex(''.join(hexes))
+    except ValueError:
+        raw = b''
+    if len(raw) != 3 * len(hexes):
+        # Au moins une couleur invalide (ou des espaces qui décaleraient la suite) : elle passe en noir
+        raw = bytes.fromhex(''.join(h if _is_hex(h) else '000000' for h in hexes))
+    grid = np.zeros(count * 3, dtype=np.uint8)
+    grid[:len(raw)] = np.frombuffer(raw, dtype=np.uint8)
+    return grid.reshape(height, width, 3)
+
+
+def decode_rgb_grid(data, width=GRID_WIDTH, height=GRID_HEIGHT):
+    """RGB brut ligne par ligne (bytes ou base64) -> tableau (height, width, 3) uint8 sans copie"""
+    if isinstance(data, str):
+        data = base64.b64decode(data, validate=True)
+    expected = width * height * 3
+    if len(data) != expected:
+        raise ValueError(f"Grille RGB de {len(data)} bytes, {expected} attendus ({width}x{height})")
+    return np.frombuffer(data, dtype=np.uint8).reshape(height, width, 3)
+
+
+def grid_to_diy_rgb(grid, width=DIY_WIDTH, height=DIY_HEIGHT):
+    """Tableau (h, w, 3) -> buffer DIY : redimensionné (LANCZOS) puis colonne par colonne (x puis y)"""
+    img = Image.fromarray(np.ascontiguousarray(grid, dtype=np.uint8), 'RGB')
+    if img.size != (width, height):
+        img = img.resize((width, height), Image.Resampling.LANCZOS)
+    return np.asarray(img).transpose(1, 0, 2).tobytes()
+
+
+def pixel_grid_to_rgb(pixels, width=GRID_WIDTH, height=GRID_HEIGHT):
+    """Grille de l'éditeur (liste hex, RGB brut ou base64) -> buffer DIY 46x58 de 8004 bytes"""
+    if isinstance(pixels, (bytes, bytearray, memoryview, str)):
+        grid = decode_rgb_grid(pixels, width, height)
+    else:
+        grid = decode_hex_grid(pixels, width, height)
+    return grid_to_diy_rgb(grid)
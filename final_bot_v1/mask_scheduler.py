@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Ordonnanceur d'affichage du masque
+Une seule chose à l'écran à la fois, choisie par classe de priorité :
+alertes (follow, sub, raid) > messages (!say, dashboard) > visage VAD > animation de repos.
+
+- un upload moins prioritaire est interrompu entre deux paquets (UploadPreempted) puis remis en file
+- un job trop vieux (visage VAD périmé, alerte d'un raid déjà passé) est abandonné sans être affiché
+- un job identique déjà en attente ou à l'écran (même clé) n'est pas dupliqué
+- le temps d'affichage d'un message est raccourci quand d'autres attendent derrière lui
+"""
+
+import asyncio
+import time
+from collections import deque
+
+from mask_upload import UploadPreempted
+
+PRIORITY_ALERT = 0
+PRIORITY_SAY = 1
+PRIORITY_VAD = 2
+PRIORITY_IDLE = 3
+
+PRIORITY_NAMES = {
+    PRIORITY_ALERT: 'alert',
+    PRIORITY_SAY: 'say',
+    PRIORITY_VAD: 'vad',
+    PRIORITY_IDLE: 'idle',
+}
+
+# Jobs gardés en attente par classe : au-delà, le plus ancien est abandonné
+MAX_PENDING = {PRIORITY_ALERT: 16, PRIORITY_SAY: 8, PRIORITY_VAD: 1, PRIORITY_IDLE: 1}
+# Attente maximale avant abandon (secondes, None = illimitée)
+MAX_WAIT = {PRIORITY_ALERT: 45.0, PRIORITY_SAY: 60.0, PRIORITY_VAD: 0.25, PRIORITY_IDLE: None}
+# Classes dont l'upload peut être interrompu par une classe plus prioritaire
+PREEMPTIBLE = {PRIORITY_SAY, PRIORITY_VAD, PRIORITY_IDLE}
+# Temps d'affichage garanti avant qu'un job de même classe prenne la place
+MIN_HOLD = 2.0
+
+# Lissage exponentiel des temps d'attente
+WAIT_ALPHA = 0.2
+
+
+class DisplayJob:
+    """Un affichage en attente : run() l'envoie au masque et retourne sa durée d'affichage (ou None)"""
+
+    def __init__(self, run, priority, key=None, max_wait=None, name=None):
+        self.run = run
+        self.priority = priority
+        self.key = key
+        self.name = name or PRIORITY_NAMES.get(priority, str(priority))
+        self.submitted_at = time.monotonic()
+        self.deadline = self.submitted_at + max_wait if max_wait is not None else None
+        self.future = asyncio.get_running_loop().create_future()
+
+    def expired(self, now):
+        return self.deadline is not None and now > self.deadline
+
+    def resolve(self, shown):
+        if not self.future.done():
+            self.future.set_result(shown)
+
+
+class DisplayScheduler:
+    """
+    File de priorité des affichages, exécutés un par un par une tâche de fond
+
+    on_idle     : coroutine appelée quand un message a fini son temps d'affichage et que
+                  plus rien n'attend (retour à l'animation ou au visage)
+    interrupt_target : contrôleur dont l'upload en cours peut être interrompu
+                  (attribut upload_interrupt, vérifié par WindowedUpload entre deux paquets)
+    """
+
+    def __init__(self, on_idle=None, interrupt_target=None, min_hold=MIN_HOLD,
+                 max_pending=None, max_wait=None):
+        self.on_idle = on_idle
+        self.interrupt_target = interrupt_target
+        self.min_hold = min_hold
+        self.max_pending = {**MAX_PENDING, **(max_pending or {})}
+        self.max_wait = {**MAX_WAIT, **(max_wait or {})}
+
+        self._queues = {priority: deque() for priority in PRIORITY_NAMES}
+        self._wakeup = None
+        self._task = None
+        self._interrupt = None
+        self._needs_idle = False
+        self.current = None
+
+        self.completed = 0
+        self.coalesced = 0
+        self.dropped_stale = 0
+        self.dropped_overflow = 0
+        self.preempted = 0
+        self.failed = 0
+        self.wait_avg = {}
+        self.wait_max = {}
+
+    # --- Soumission --------------------------------------------------------
+
+    def submit(self, run, priority, key=None, max_wait=..., name=None):
+        """
+        Met un affichage en file ; retourne un future résolu à True quand il est à l'écran,
+        False s'il a été abandonné (périmé, file pleine) ou a échoué
+        key : deux jobs de même clé ne coexistent pas ; le plus récent remplace le contenu du premier
+        """
+        self._ensure_started()
+        if max_wait is ...:
+            max_wait = self.max_wait.get(priority)
+        queue = self._queues[priority]
+
+        if key is not None:
+            current = self.current
+            if current is not None and current.key == key and current.priority == priority and current.future.done():
+                # Déjà à l'écran (pendant son temps d'affichage) : rien à refaire
+                self.coalesced += 1
+                return current.future
+            for pending in queue:
+                if pending.key == key:
+                    pending.run = run
+                    if max_wait is not None:
+                        pending.deadline = time.monotonic() + max_wait
+                    self.coalesced += 1
+                    return pending.future
+
+        job = DisplayJob(run, priority, key, max_wait, name)
+        while len(queue) >= self.max_pending.get(priority, len(queue) + 1):
+            dropped = queue.popleft()
+            self.dropped_overflow += 1
+            print(f"⏭️ Affichage abandonné (file {PRIORITY_NAMES.get(priority)} pleine): {dropped.name}")
+            dropped.resolve(False)
+        queue.append(job)
+
+        running = self.current
+        if (self._interrupt is not None and running is not None and not running.future.done()
+                and priority < running.priority):
+            # Upload moins prioritaire en cours : arrêt au prochain paquet
+            self._interrupt.set()
+        self._wakeup.set()
+        return job.future
+
+    async def run(self, run, priority, key=None, max_wait=..., name=None):
+        """submit() puis attente de l'affichage"""
+        return await self.submit(run, priority, key, max_wait, name)
+
+    # --- Boucle ------------------------------------------------------------
+
+    def _ensure_started(self):
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.current is not None:
+            self.current.resolve(False)
+        for queue in self._queues.values():
+            while queue:
+                queue.popleft().resolve(False)
+
+    def _best_pending(self):
+        """Priorité la plus haute en attente (None si rien)"""
+        for priority, queue in self._queues.items():
+            if queue:
+                return priority
+        return None
+
+    def _pop(self):
+        now = time.monotonic()
+        for priority, queue in self._queues.items():
+            while queue:
+                job = queue.popleft()
+                if job.expired(now):
+                    self.dropped_stale += 1
+                    job.resolve(False)
+                    continue
+                return job
+        return None
+
+    async def _loop(self):
+        while True:
+            job = self._pop()
+            if job is None:
+                if self._needs_idle and self.on_idle:
+                    self._needs_idle = False
+                    try:
+                        await self.on_idle()
+                    except Exception as e:
+                        print(f"❌ Retour à l'affichage de repos échoué: {e}")
+                    continue
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            self._record_wait(job)
+            self.current = job
+            try:
+                hold = await self._execute(job)
+                if hold:
+                    self._needs_idle = True
+                    await self._hold(job, hold)
+                elif job.future.done() and job.future.result():
+                    # Affichage permanent (visage, animation) : plus de retour au repos à faire
+                    self._needs_idle = False
+            finally:
+                self.current = None
+
+    async def _execute(self, job):
+        interrupt = asyncio.Event() if job.priority in PREEMPTIBLE else None
+        self._interrupt = interrupt
+        if self.interrupt_target is not None:
+            self.interrupt_target.upload_interrupt = interrupt
+        try:
+            hold = await job.run()
+        except UploadPreempted as e:
+            self.preempted += 1
+            print(f"⏸️ {job.name}: {e}, remis en file")
+            self._queues[job.priority].appendleft(job)
+            return None
+        except Exception as e:
+            self.failed += 1
+            print(f"❌ Affichage '{job.name}' échoué: {e}")
+            job.resolve(False)
+            return None
+        finally:
+            self._interrupt = None
+            if self.interrupt_target is not None:
+                self.interrupt_target.upload_interrupt = None
+        self.completed += 1
+        job.resolve(True)
+        return hold
+
+    async def _hold(self, job, hold):
+        """Laisse le job à l'écran 'hold' secondes, moins si plus urgent (ou pareil après MIN_HOLD) attend"""
+        start = time.monotonic()
+        end = start + hold
+        min_end = start + min(self.min_hold, hold)
+        while True:
+            now = time.monotonic()
+            pending = self._best_pending()
+            if pending is not None and (pending < job.priority or (pending == job.priority and now >= min_end)):
+                return
+            if now >= end:
+                return
+            wake_at = min(end, min_end) if pending == job.priority else end
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(0.0, wake_at - now))
+            except asyncio.TimeoutError:
+                pass
+
+    # --- Mesures -------------------------------------------------------------
+
+    def _record_wait(self, job):
+        name = PRIORITY_NAMES.get(job.priority, str(job.priority))
+        wait = time.monotonic() - job.submitted_at
+        previous = self.wait_avg.get(name)
+        self.wait_avg[name] = wait if previous is None else WAIT_ALPHA * wait + (1 - WAIT_ALPHA) * previous
+        self.wait_max[name] = max(wait, self.wait_max.get(name, 0.0))
+
+    def stats(self):
+        current = self.current
+        return {
+            'current': {'name': current.name, 'class': PRIORITY_NAMES.get(current.priority)} if current else None,
+            'depth': {PRIORITY_NAMES[p]: len(q) for p, q in self._queues.items()},
+            'wait_avg_ms': {name: round(v * 1000, 1) for name, v in self.wait_avg.items()},
+            'wait_max_ms': {name: round(v * 1000, 1) for name, v in self.wait_max.items()},
+            'completed': self.completed,
+            'coalesced': self.coalesced,
+            'dropped_stale': self.dropped_stale,
+            'dropped_overflow': self.dropped_overflow,
+            'preempted': self.preempted,
+            'failed': self.failed,
+        }
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Masque simulé : périphérique GATT en mémoire pour les tests et benchmarks sans radio
+Remplace BleakClient : ScrollingMaskController(client=SimulatedMaskClient())
+
+Caractéristiques simulées :
+  COMMAND_UUID : commandes chiffrées (DATS, DATCP, MODE, SPEED, FC, BG, LIGHT, ANIM, PLAY, SAVE01)
+  UPLOAD_UUID  : paquets [longueur+1, packet_count, données...] (write sans réponse)
+  NOTIFY_UUID  : réponses chiffrées DATSOK / REOK / DATCPOK, dernier byte = numéro de séquence
+"""
+
+import asyncio
+import random
+import struct
+
+from mask_crypto import MaskCipher
+from scrolling_text_controller import COMMAND_UUID, UPLOAD_UUID, NOTIFY_UUID
+
+# MTU ATT négocié par défaut (valeur courante sous Linux / Android)
+SIMULATED_MTU = 185
+ATT_HEADER_SIZE = 3
+
+# Mots-clés reconnus, après le byte de longueur
+COMMAND_KEYWORDS = (b"DATCP", b"DATS", b"MODE", b"SPEED", b"LIGHT", b"ANIM", b"PLAY", b"FC", b"BG")
+
+
+class SimulatedMaskClient:
+    """
+    Sous-ensemble de l'API BleakClient, avec l'état d'affichage du masque
+
+    latency          : délai avant chaque notification (secondes)
+    mtu              : MTU ATT ; un paquet d'upload plus grand que mtu - 3 est rejeté
+    loss             : probabilité de perdre un paquet d'upload (pas de REOK)
+    link_bytes_per_s : débit du lien (None = instantané)
+    write_latency    : aller-retour d'une écriture avec réponse (commandes)
+    """
+
+    def __init__(self, address="SIM:00:00:00:00:01", latency=0.005, mtu=SIMULATED_MTU, loss=0.0,
+                 link_bytes_per_s=None, write_latency=0.0, seed=None):
+        self.address = address
+        self.latency = latency
+        self.mtu_size = mtu
+        self.loss = loss
+        self.link_bytes_per_s = link_bytes_per_s
+        self.write_latency = write_latency
+        self.is_connected = False
+        self.cipher = MaskCipher()
+        self._callback = None
+        self._rng = random.Random(seed)
+        self.reset_state()
+
+    def reset_state(self):
+        """Masque sorti de la boîte : rien à l'écran, emplacements DIY vides"""
+        self.mode = None
+        self.speed = None
+        self.foreground = None
+        self.background = None
+        self.brightness = None
+        self.animation = None
+        self.playing = None
+        self.display = None          # ('text',), ('image', index), ('anim', id), ('diy', (bank, id))
+        self.text_bitmap = None
+        self.text_colors = None
+        self.image = None
+        self.image_index = None
+        self.diy_slots = {}
+
+        self.commands = []           # mots-clés reçus, dans l'ordre
+        self.upload_writes = 0
+        self.dropped_packets = 0
+        self.bytes_received = 0
+        self.uploads_completed = 0
+        self._upload = None
+
+    # --- API BleakClient -------------------------------------------------
+
+    async def connect(self, **kwargs):
+        self.is_connected = True
+        return True
+
+    async def disconnect(self):
+        self.is_connected = False
+        self._callback = None
+        return True
+
+    def drop_link(self, reboot=False):
+        """
+        Coupure radio (hors de portée, batterie) : plus de connexion ni de notifications
+        reboot=True : le masque redémarre, réglages et affichage perdus (emplacements DIY conservés)
+        """
+        self.is_connected = False
+        self._callback = None
+        if reboot:
+            diy_slots = self.diy_slots
+            self.reset_state()
+            self.diy_slots = diy_slots
+
+    async def start_notify(self, uuid, callback, **kwargs):
+        if uuid != NOTIFY_UUID:
+            raise ValueError(f"Caractéristique sans notification: {uuid}")
+        self._callback = callback
+
+    async def stop_notify(self, uuid):
+        self._callback = None
+
+    async def write_gatt_char(self, uuid, data, response=None):
+        if not self.is_connected:
+            raise RuntimeError("Masque simulé non connecté")
+        data = bytes(data)
+        if self.link_bytes_per_s:
+            # Temps d'antenne sur un lien de débit fini
+            await asyncio.sleep(len(data) / self.link_bytes_per_s)
+
+        if uuid == COMMAND_UUID:
+            if self.write_latency:
+                await asyncio.sleep(self.write_latency)
+            self._handle_command(self.cipher.decrypt(data))
+        elif uuid == UPLOAD_UUID:
+            if self.mtu_size and len(data) > self.mtu_size - ATT_HEADER_SIZE:
+                raise ValueError(f"Paquet de {len(data)} bytes > MTU {self.mtu_size}")
+            self._handle_upload(data)
+        else:
+            raise ValueError(f"Caractéristique inconnue: {uuid}")
+
+    # --- Protocole ---------------------------------------------------------
+
+    def _notify(self, text, sequence=0):
+        if self._callback is None:
+            return
+        payload = bytes([len(text)]) + text.encode('ascii')
+        payload += b'\x00' * (15 - len(payload)) + bytes([sequence & 0xFF])
+        data = self.cipher.encrypt(payload)
+        asyncio.get_running_loop().call_later(self.latency, self._callback, NOTIFY_UUID, bytearray(data))
+
+    def _handle_command(self, block):
+        if block.startswith(b"SAVE01"):
+            # Sauvegarde de la dernière image reçue dans son emplacement DIY
+            self.commands.append("SAVE01")
+            if self.image is not None:
+                self.diy_slots[(1, self.image_index)] = self.image
+            return
+
+        length = block[0]
+        for keyword in COMMAND_KEYWORDS:
+            if block[1:1 + len(keyword)] == keyword:
+                args = block[1 + len(keyword):1 + length]
+                self.commands.append(keyword.decode())
+                getattr(self, f"_cmd_{keyword.decode().lower()}")(args)
+                return
+        self.commands.append(block[1:1 + length].decode('ascii', errors='replace'))
+
+    def _cmd_dats(self, args):
+        total_len, second, flag = struct.unpack('>HHB', args[:5])
+        self._upload = {
+            'total_len': total_len,
+            'second': second,  # longueur du bitmap (texte) ou index de l'image (flag 1)
+            'flag': flag,
+            'buffer': bytearray(),
+            'expected': 0,
+        }
+        self._notify("DATSOK", 1)
+
+    def _cmd_datcp(self, args):
+        upload = self._upload
+        if upload is None or len(upload['buffer']) < upload['total_len']:
+            # Upload incomplet : le masque ne confirme pas
+            return
+        buffer = bytes(upload['buffer'][:upload['total_len']])
+        if upload['flag'] == 1:
+            self.image = buffer
+            self.image_index = upload['second']
+            self.display = ('image', self.image_index)
+        else:
+            self.text_bitmap = buffer[:upload['second']]
+            self.text_colors = buffer[upload['second']:]
+            self.display = ('text',)
+        self.uploads_completed += 1
+        self._upload = None
+        self._notify("DATCPOK", 0)
+
+    def _cmd_mode(self, args):
+        self.mode = args[0]
+
+    def _cmd_speed(self, args):
+        self.speed = args[0]
+
+    def _cmd_light(self, args):
+        self.brightness = args[0]
+
+    def _cmd_fc(self, args):
+        self.foreground = tuple(args[1:4]) if args[0] else None
+
+    def _cmd_bg(self, args):
+        self.background = tuple(args[1:4]) if args[0] else None
+
+    def _cmd_anim(self, args):
+        self.animation = args[0]
+        self.display = ('anim', args[0])
+
+    def _cmd_play(self, args):
+        self.playing = (args[0], args[1])
+        self.display = ('diy', self.playing)
+
+    def _handle_upload(self, data):
+        self.upload_writes += 1
+        if self.loss and self._rng.random() < self.loss:
+            self.dropped_packets += 1
+            return
+        upload = self._upload
+        if upload is None:
+            return
+
+        packet_count = data[1]
+        if packet_count == upload['expected'] & 0xFF:
+            payload = data[2:2 + data[0] - 1]
+            upload['buffer'].extend(payload)
+            upload['expected'] += 1
+            self.bytes_received += len(payload)
+            self._notify("REOK", packet_count + 2)
+        elif upload['expected']:
+            # Hors séquence : acquittement du dernier paquet reçu dans l'ordre
+            self._notify("REOK", upload['expected'] - 1 + 2)
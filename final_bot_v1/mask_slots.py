@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Bibliothèque d'images DIY pré-rendues
+Les visages et alertes fréquentes sont uploadés une fois dans les emplacements DIY
+(DATS image + SAVE01) puis rappelés par une seule commande PLAY.
+Un manifeste JSON garde, par adresse de masque, l'empreinte du contenu de chaque emplacement :
+à la connexion, seuls les emplacements périmés sont renvoyés.
+"""
+
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+
+from mask_cache import payload_key, ON_SCREEN
+from mask_glyphs import get_atlas
+from mask_raster import MASK_HEIGHT, unpack_columns
+
+# Image DIY : 46 colonnes x 58 lignes, RGB, colonne par colonne (cf. upload_pixel_grid)
+DIY_WIDTH = 46
+DIY_HEIGHT = 58
+DIY_BANK = 1
+
+DEFAULT_MANIFEST = os.path.join(os.path.dirname(os.path.abspath(__file__)), "diy_slots.json")
+
+
+def render_text_rgb(text, color, font_paths, font_size=12, bold=False, line_spacing=2):
+    """
+    Texte (plusieurs lignes séparées par '\\n') -> image DIY RGB de 46x58, centrée
+    Agrandie en pixels entiers (x2, x3) tant qu'elle tient dans l'image
+    """
+    atlas = get_atlas(font_paths, font_size, bold)
+    lines = []
+    for line in text.upper().split('\n'):
+        width = atlas.text_width(line, char_spacing=2)
+        lines.append(unpack_columns(atlas.render(line, width, 0, char_spacing=2)))
+
+    width = max(line.shape[1] for line in lines) if lines else 0
+    height = len(lines) * MASK_HEIGHT + line_spacing * (len(lines) - 1)
+    block = np.zeros((height, width), dtype=bool)
+    for i, line in enumerate(lines):
+        top = i * (MASK_HEIGHT + line_spacing)
+        left = (width - line.shape[1]) // 2
+        block[top:top + MASK_HEIGHT, left:left + line.shape[1]] = line
+
+    # Rogner les lignes et colonnes vides puis agrandir
+    rows = np.flatnonzero(block.any(axis=1))
+    cols = np.flatnonzero(block.any(axis=0))
+    if len(rows):
+        block = block[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+    scale = max(1, min(DIY_HEIGHT // max(1, block.shape[0]), DIY_WIDTH // max(1, block.shape[1])))
+    block = block.repeat(scale, axis=0).repeat(scale, axis=1)[:DIY_HEIGHT, :DIY_WIDTH]
+
+    canvas = np.zeros((DIY_HEIGHT, DIY_WIDTH), dtype=bool)
+    top = (DIY_HEIGHT - block.shape[0]) // 2
+    left = (DIY_WIDTH - block.shape[1]) // 2
+    canvas[top:top + block.shape[0], left:left + block.shape[1]] = block
+
+    # (colonnes, lignes, RGB) : l'ordre d'envoi du masque
+    rgb = canvas.T[:, :, None] * np.asarray(color, dtype=np.uint8)
+    return rgb.astype(np.uint8).tobytes()
+
+
+class DiySlot:
+    """Une image déclarée et son emplacement DIY"""
+
+    def __init__(self, name, image_id, rgb_data, bank=DIY_BANK):
+        self.name = name
+        self.bank = bank
+        self.image_id = image_id
+        self.rgb_data = bytes(rgb_data)
+        self.key = payload_key('rgb', self.rgb_data)
+        self.ready = False  # contenu confirmé sur le masque
+
+    @property
+    def slot(self):
+        return (self.bank, self.image_id)
+
+
+class DiySlotLibrary:
+    """
+    Emplacements DIY déclarés pour un contrôleur MaskTextDisplay
+
+    declare_text() / declare_image() : réserver un emplacement
+    sync()  : après connexion, uploader les emplacements absents ou périmés
+    show()  : afficher une image déclarée par PLAY (False si indisponible)
+    """
+
+    def __init__(self, controller, manifest_path=DEFAULT_MANIFEST):
+        self.controller = controller
+        self.manifest_path = manifest_path
+        self.slots = {}
+
+    def declare_image(self, name, image_id, rgb_data, bank=DIY_BANK):
+        """Réserve l'emplacement (bank, image_id) pour une image RGB 46x58"""
+        if len(rgb_data) != DIY_WIDTH * DIY_HEIGHT * 3:
+            raise ValueError(f"Image DIY de {len(rgb_data)} bytes (attendu {DIY_WIDTH * DIY_HEIGHT * 3})")
+        for other in self.slots.values():
+            if other.slot == (bank, image_id) and other.name != name:
+                raise ValueError(f"Emplacement DIY {image_id} déjà réservé pour '{other.name}'")
+        self.slots[name] = DiySlot(name, image_id, rgb_data, bank)
+        return self.slots[name]
+
+    def declare_text(self, name, image_id, text, color=(255, 255, 255), font_size=12, bold=False, bank=DIY_BANK):
+        """Réserve un emplacement pour un texte statique pré-rendu (visage, alerte)"""
+        rgb_data = render_text_rgb(text, color, self.controller.TEXT_FONT_PATHS, font_size, bold)
+        return self.declare_image(name, image_id, rgb_data, bank)
+
+    def load_manifest(self):
+        """Manifeste complet {adresse: {"bank:id": {"name", "hash", "updated"}}}"""
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Manifeste DIY illisible ({e}), tous les emplacements seront renvoyés")
+            return {}
+
+    def save_manifest(self, manifest):
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.manifest_path)
+
+    async def sync(self, force=False):
+        """
+        Uploade les emplacements déclarés dont l'empreinte diffère du manifeste
+        force=True : tout renvoyer (ex : images modifiées depuis l'éditeur)
+        Retourne le nombre d'emplacements uploadés
+        """
+        address = getattr(self.controller, 'address', None) or "unknown"
+        manifest = self.load_manifest()
+        entries = manifest.setdefault(address, {})
+        cache = self.controller.upload_cache
+        uploaded = 0
+
+        for slot in self.slots.values():
+            entry_id = f"{slot.bank}:{slot.image_id}"
+            entry = entries.get(entry_id)
+            if not force and entry and entry.get('hash') == slot.key:
+                # Déjà sur le masque : il suffit de le savoir
+                cache.store(slot.slot, slot.key)
+                slot.ready = True
+                continue
+
+            print(f"📥 Emplacement DIY {slot.image_id} ('{slot.name}') périmé, upload...")
+            slot.ready = False
+            try:
+                await self.controller.upload_raw_rgb(slot.rgb_data, image_index=slot.image_id, save=True)
+            except Exception as e:
+                print(f"❌ Upload DIY '{slot.name}' échoué: {e}")
+                entries.pop(entry_id, None)
+                continue
+
+            entries[entry_id] = {
+                'name': slot.name,
+                'hash': slot.key,
+                'updated': datetime.now().isoformat(timespec='seconds'),
+            }
+            slot.ready = True
+            uploaded += 1
+
+        try:
+            self.save_manifest(manifest)
+        except OSError as e:
+            print(f"⚠️ Manifeste DIY non sauvegardé: {e}")
+
+        print(f"✅ Emplacements DIY prêts: {sum(s.ready for s in self.slots.values())}/{len(self.slots)} "
+              f"({uploaded} uploadé(s))")
+        return uploaded
+
+    def available(self, name):
+        slot = self.slots.get(name)
+        return slot is not None and slot.ready
+
+    async def show(self, name):
+        """Affiche une image déclarée : rien si déjà à l'écran, sinon un seul PLAY"""
+        slot = self.slots.get(name)
+        if slot is None or not slot.ready:
+            return False
+        if self.controller.upload_cache.lookup(slot.key, len(slot.rgb_data)) == ON_SCREEN:
+            return True
+        return await self.controller.set_diy_image(slot.image_id, slot.bank)
+
+    def invalidate(self):
+        """Contenu des emplacements inconnu (autre masque, reconnexion) : attendre le prochain sync()"""
+        for slot in self.slots.values():
+            slot.ready = False
+
+    def stats(self):
+        return {name: {'image_id': slot.image_id, 'ready': slot.ready} for name, slot in self.slots.items()}
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Superviseur de liaison du masque
+Surveille la connexion (callback de déconnexion de Bleak + sondage de client.is_connected),
+reconnecte avec un backoff exponentiel et laisse le coordinateur rejouer l'état voulu.
+"""
+
+import asyncio
+import time
+
+# Sondage de client.is_connected (le callback de Bleak n'existe pas pour un client injecté)
+POLL_INTERVAL = 1.0
+# Backoff entre deux tentatives de reconnexion (secondes)
+BACKOFF_INITIAL = 0.5
+BACKOFF_MAX = 30.0
+
+
+class LinkSupervisor:
+    """
+    Tâche de fond qui maintient le masque connecté tant qu'une connexion est voulue
+
+    connect_cb  : coroutine qui (re)connecte et restaure l'état, lève une exception en cas d'échec
+    is_connected : callable, True si la liaison est utilisable
+
+    enable()  : connexion voulue (bouton Connect), démarre la surveillance
+    disable() : déconnexion manuelle, plus aucune tentative
+    link_down() : à appeler depuis le callback de déconnexion pour réagir sans attendre le sondage
+    """
+
+    def __init__(self, connect_cb, is_connected, poll_interval=POLL_INTERVAL,
+                 backoff_initial=BACKOFF_INITIAL, backoff_max=BACKOFF_MAX):
+        self.connect_cb = connect_cb
+        self.is_connected = is_connected
+        self.poll_interval = poll_interval
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+
+        self.enabled = False
+        self.state = 'idle'  # idle, connected, reconnecting
+        self._task = None
+        self._wakeup = None
+
+        self.connected_since = None
+        self.outages = 0
+        self.reconnects = 0
+        self.attempts = 0
+        self.recovery_total = 0.0
+        self.last_recovery = None
+        self.last_error = None
+
+    def enable(self):
+        self.enabled = True
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def disable(self):
+        self.enabled = False
+        self.connected_since = None
+        self.state = 'idle'
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def stop(self):
+        self.disable()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def link_up(self):
+        """Connexion établie (manuelle ou par le superviseur)"""
+        if self.connected_since is None:
+            self.connected_since = time.monotonic()
+        self.state = 'connected'
+        self.last_error = None
+
+    def link_down(self):
+        """Liaison perdue : réveille la boucle sans attendre le prochain sondage"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self):
+        while self.enabled:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self.enabled and not self.is_connected():
+                await self._recover()
+
+    async def _recover(self):
+        """Reconnecte avec backoff jusqu'au succès ou à une déconnexion manuelle"""
+        lost_at = time.monotonic()
+        was_connected = self.connected_since is not None
+        self.connected_since = None
+        if was_connected:
+            self.outages += 1
+            print("⚠️ Liaison avec le masque perdue, reconnexion...")
+        self.state = 'reconnecting'
+
+        delay = self.backoff_initial
+        while self.enabled:
+            self.attempts += 1
+            try:
+                await self.connect_cb()
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"❌ Reconnexion échouée ({e}), nouvel essai dans {delay:.1f} s")
+                # Attente interrompue par disable()
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                delay = min(delay * 2, self.backoff_max)
+                continue
+
+            if was_connected:
+                self.last_recovery = time.monotonic() - lost_at
+                self.recovery_total += self.last_recovery
+                self.reconnects += 1
+                print(f"✅ Masque reconnecté en {self.last_recovery:.2f} s")
+            self.link_up()
+            return
+
+    def stats(self):
+        uptime = time.monotonic() - self.connected_since if self.connected_since is not None else 0.0
+        return {
+            'state': self.state,
+            'uptime_s': round(uptime, 1),
+            'outages': self.outages,
+            'reconnects': self.reconnects,
+            'attempts': self.attempts,
+            'mttr_s': round(self.recovery_total / self.reconnects, 3) if self.reconnects else None,
+            'last_recovery_s': round(self.last_recovery, 3) if self.last_recovery is not None else None,
+            'last_error': self.last_error,
+        }
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Moteur d'upload à fenêtre glissante pour le protocole DATS / REOK / DATCP
+Plusieurs paquets non acquittés en vol, REOK associés aux packet_count, go-back-N en cas de perte.
+UploadSession enchaîne DATS / paquets / DATCP : annulable, suivi de progression, reprise
+au dernier paquet acquitté après un timeout REOK.
+"""
+
+import asyncio
+import time
+from collections import deque
+
+from mask_link import DEFAULT_CHUNK_SIZE
+from mask_pacing import get_pacing
+
+# Paquets envoyés sans attendre leur REOK
+DEFAULT_WINDOW = 4
+
+# Le dernier byte d'un REOK déchiffré vaut packet_count + 2 (DATSOK vaut 1),
+# cf. preview_log.txt : "Envoi paquet 0" -> ...0452454f4b...02
+REOK_SEQUENCE_OFFSET = 2
+
+
+# Reprises d'un upload au dernier paquet acquitté avant de l'abandonner
+RESUME_ATTEMPTS = 2
+# Pause avant une reprise, le temps que la liaison se remette (secondes)
+RESUME_DELAY = 0.5
+
+
+class UploadPreempted(Exception):
+    """Upload arrêté entre deux paquets pour laisser passer un affichage plus prioritaire"""
+
+
+class UploadCancelled(Exception):
+    """Upload annulé explicitement (UploadSession.cancel)"""
+
+
+def build_packets(buffer, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Découpe le buffer en paquets [longueur+1, packet_count, données...]"""
+    packets = []
+    for packet_count, start in enumerate(range(0, len(buffer), chunk_size)):
+        chunk = buffer[start:start + chunk_size]
+        packet = bytearray()
+        packet.append(len(chunk) + 1)
+        packet.append(packet_count & 0xFF)
+        packet.extend(chunk)
+        packets.append(bytes(packet))
+    return packets
+
+
+class WindowedUpload:
+    """
+    Envoie current_upload['complete_buffer'] d'un contrôleur avec une fenêtre glissante
+
+    Le masque répond un REOK par paquet. Son dernier byte porte le packet_count
+    acquitté : il sert d'acquittement cumulatif (tous les paquets jusqu'à lui sont
+    reçus). Sans numéro exploitable, chaque REOK acquitte le plus ancien paquet en
+    vol. Si aucun REOK n'arrive avant ack_timeout, les paquets non acquittés sont
+    renvoyés à partir du plus ancien (go-back-N) avec le même packet_count.
+    Si controller.upload_interrupt (asyncio.Event) est levé, l'upload s'arrête avant le
+    paquet suivant (UploadPreempted) ; le prochain DATS repart de zéro.
+
+    acked reste à jour entre deux run() : après un TimeoutError, un nouvel appel à run()
+    reprend au premier paquet non acquitté au lieu de tout renvoyer.
+    cancel    : asyncio.Event, arrêt avant le paquet suivant (UploadCancelled)
+    on_ack(n) : appelé avec le nombre de paquets acquittés à chaque progression
+    pacing    : preset de cet upload, transmis à send_upload_data (None = preset du contrôleur)
+    """
+
+    def __init__(self, controller, window=DEFAULT_WINDOW, chunk_size=None,
+                 ack_timeout=3.0, max_retries=3, cancel=None, on_ack=None, pacing=None):
+        self.controller = controller
+        self.link = getattr(controller, 'link', None)
+        self.window = max(1, int(window))
+        if chunk_size is None:
+            chunk_size = self.link.chunk_size if self.link else DEFAULT_CHUNK_SIZE
+        self.chunk_size = chunk_size
+        self.ack_timeout = ack_timeout
+        self.max_retries = max_retries
+        self.cancel = cancel
+        self.on_ack = on_ack
+        self.pacing = pacing
+        self.retransmissions = 0
+        self.acked = 0
+        self.packet_total = None
+
+    async def run(self):
+        """Envoie les paquets pas encore acquittés et attend le REOK de chacun"""
+        upload = self.controller.current_upload
+        buffer = upload['complete_buffer']
+        packets = build_packets(buffer, self.chunk_size)
+        self.packet_total = len(packets)
+        acked = self.acked
+        next_packet = acked
+        retries = 0
+        sent_at = {}
+
+        upload.setdefault('bytes_acked', 0)
+
+        # Heure d'arrivée de chaque REOK : la latence mesurée ne doit pas inclure le remplissage
+        # de la fenêtre, sinon LinkTuner ralentit en boucle à cause de ses propres pauses
+        arrivals = deque()
+
+        def on_response(response):
+            if response == "REOK":
+                arrivals.append(time.monotonic())
+
+        self.controller.notifications.add_listener(on_response)
+        try:
+            while acked < len(packets):
+                # Remplir la fenêtre
+                while next_packet < len(packets) and next_packet - acked < self.window:
+                    if self.cancel is not None and self.cancel.is_set():
+                        raise UploadCancelled(f"upload annulé au paquet {next_packet}/{len(packets)}")
+                    interrupt = getattr(self.controller, 'upload_interrupt', None)
+                    if interrupt is not None and interrupt.is_set():
+                        raise UploadPreempted(f"upload interrompu au paquet {next_packet}/{len(packets)}")
+                    sent_at[next_packet] = time.monotonic()
+                    await self.controller.send_upload_data(packets[next_packet], pacing=self.pacing)
+                    next_packet += 1
+                    upload['packet_count'] = next_packet
+                    upload['bytes_sent'] = min(next_packet * self.chunk_size, len(buffer))
+
+                try:
+                    block = await self.controller.notifications.wait_for("REOK", self.ack_timeout, raw=True)
+                except asyncio.TimeoutError:
+                    if self.link:
+                        self.link.record_error()
+                    retries += 1
+                    if retries > self.max_retries:
+                        raise TimeoutError(f"Pas de REOK pour le paquet {acked} après {self.max_retries} renvois")
+                    print(f"⚠️ REOK manquant pour le paquet {acked}, renvoi de {next_packet - acked} paquet(s)")
+                    self.retransmissions += next_packet - acked
+                    self.controller.notifications.clear("REOK")
+                    arrivals.clear()
+                    next_packet = acked
+                    continue
+
+                received = arrivals.popleft() if arrivals else time.monotonic()
+                previous = acked
+                acked = self._acked_after(block, acked, next_packet)
+                self.acked = acked
+                if acked > previous:
+                    if self.link:
+                        self.link.record_ack(received - sent_at[acked - 1])
+                    if self.on_ack:
+                        self.on_ack(acked)
+                retries = 0
+                upload['bytes_acked'] = min(acked * self.chunk_size, len(buffer))
+        finally:
+            self.controller.notifications.remove_listener(on_response)
+
+        return True
+
+    def _acked_after(self, block, acked, next_packet):
+        """Nombre de paquets acquittés après ce REOK"""
+        if not block or len(block) != 16:
+            return acked + 1
+
+        sequence = (block[15] - REOK_SEQUENCE_OFFSET) & 0xFF
+        if block[15] == 0 and (acked & 0xFF) != 0xFE:
+            # Pas de numéro de séquence (0 ne correspond qu'au paquet 254 modulo 256)
+            return acked + 1
+
+        # Retrouver l'index complet à partir du packet_count sur 8 bits
+        index = acked + ((sequence - acked) & 0xFF)
+        if index < next_packet:
+            return index + 1
+        if (acked - 1 - sequence) & 0xFF < self.window:
+            # REOK dupliqué : le masque attend toujours le paquet 'acked'
+            return acked
+        return acked + 1
+
+
+class UploadSession:
+    """
+    Un upload complet : DATS -> paquets (fenêtre glissante) -> DATCP
+
+    controller  : contrôleur connecté (send_command, send_upload_data, notifications...)
+    dats        : commande DATS déjà construite (texte ou image RGB)
+    buffer      : données envoyées en paquets
+    on_progress(acked_bytes, total) : appelé à chaque paquet acquitté
+    cancel      : asyncio.Event fourni par l'appelant (jeton d'annulation), même effet que cancel() ;
+                  déjà levé, la session s'arrête avant DATS
+    pacing      : preset de cet upload (fenêtre, délai inter-paquets) ; controller.pacing n'est
+                  pas modifié, un set_pacing() concurrent reste en place
+
+    Après un timeout REOK (renvois go-back-N épuisés), la session reprend au premier paquet
+    non acquitté (resume_attempts fois) tant que la liaison est la même : un 8 Ko RGB ne
+    repart pas de DATS pour une notification perdue.
+    cancel() arrête l'envoi avant le paquet suivant. Le protocole n'a pas de commande
+    d'abandon : le masque jette un transfert incomplet au DATS suivant, la session se
+    contente de ne pas envoyer DATCP et de remettre l'état d'upload à zéro.
+    """
+
+    def __init__(self, controller, dats, buffer, window=None, on_progress=None,
+                 resume_attempts=RESUME_ATTEMPTS, resume_delay=RESUME_DELAY,
+                 ack_timeout=3.0, max_retries=3, datcp_timeout=5.0, cancel=None, pacing=None):
+        self.controller = controller
+        self.dats = bytes(dats)
+        self.buffer = bytes(buffer)
+        self.total = len(self.buffer)
+        self.on_progress = on_progress
+        self.resume_attempts = resume_attempts
+        self.resume_delay = resume_delay
+        self.datcp_timeout = datcp_timeout
+
+        self.state = 'pending'  # pending, starting, sending, finishing, done, cancelled, preempted, failed
+        self.resumes = 0
+        self.error = None
+        self._cancel = cancel if cancel is not None else asyncio.Event()
+        self._done = asyncio.Event()
+        policy = controller.pacing if pacing is None else get_pacing(pacing)
+        self.engine = WindowedUpload(controller, window or policy.window,
+                                     ack_timeout=ack_timeout, max_retries=max_retries,
+                                     cancel=self._cancel, on_ack=self._on_ack, pacing=pacing)
+
+    @property
+    def active(self):
+        return self.state in ('pending', 'starting', 'sending', 'finishing')
+
+    @property
+    def acked_bytes(self):
+        return min(self.engine.acked * self.engine.chunk_size, self.total)
+
+    def cancel(self):
+        """Demande l'arrêt ; l'upload s'arrête avant le prochain paquet"""
+        self._cancel.set()
+
+    async def wait_closed(self):
+        """Attend la fin de la session (terminée, annulée ou en échec)"""
+        await self._done.wait()
+
+    async def run(self):
+        c = self.controller
+        if c.upload_running:
+            raise RuntimeError("Upload déjà en cours")
+        c.upload_running = True
+        c.upload_session = self
+        c.current_upload = {
+            'total_len': self.total,
+            'bytes_sent': 0,
+            'bytes_acked': 0,
+            'packet_count': 0,
+            'complete_buffer': self.buffer,
+        }
+        try:
+            self._check_cancelled()
+            self.state = 'starting'
+            c.notifications.clear()
+            await c.send_command(self.dats)
+            await c.wait_for_response("DATSOK", timeout=5.0)
+
+            self.state = 'sending'
+            await self._send_packets()
+
+            self._check_cancelled()
+            self.state = 'finishing'
+            await c.send_command(bytearray([5]) + b"DATCP")
+            await c.wait_for_response("DATCPOK", timeout=self.datcp_timeout)
+            self.state = 'done'
+            return True
+        except UploadCancelled as e:
+            self.state = 'cancelled'
+            self._abort()
+            print(f"🛑 {e}")
+            raise
+        except UploadPreempted:
+            self.state = 'preempted'
+            self._abort()
+            raise
+        except asyncio.CancelledError:
+            self.state = 'cancelled'
+            self._abort()
+            raise
+        except Exception as e:
+            self.state = 'failed'
+            self.error = str(e)
+            self._abort()
+            raise
+        finally:
+            c.upload_running = False
+            self._done.set()
+
+    async def _send_packets(self):
+        client = self.controller.client
+        while True:
+            try:
+                return await self.engine.run()
+            except TimeoutError:
+                if self.resumes >= self.resume_attempts or not self._same_link(client):
+                    raise
+                self.resumes += 1
+                print(f"🔁 Reprise de l'upload au paquet {self.engine.acked}/{self.engine.packet_total} "
+                      f"({self.resumes}/{self.resume_attempts})")
+                try:
+                    await asyncio.wait_for(self._cancel.wait(), timeout=self.resume_delay)
+                except asyncio.TimeoutError:
+                    pass
+                self._check_cancelled()
+
+    def _same_link(self, client):
+        """Reprise possible seulement sur la connexion qui a reçu le DATS"""
+        current = self.controller.client
+        return current is not None and current is client and current.is_connected
+
+    def _check_cancelled(self):
+        if self._cancel.is_set():
+            raise UploadCancelled(f"upload annulé après {self.acked_bytes}/{self.total} bytes")
+
+    def _abort(self):
+        """Oublie le transfert en cours : REOK en retard ignorés, le prochain DATS repart de zéro"""
+        self.controller.notifications.clear()
+        self.controller.current_upload = {}
+
+    def _on_ack(self, acked_packets):
+        if self.on_progress:
+            self.on_progress(self.acked_bytes, self.total)
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'acked_bytes': self.acked_bytes,
+            'total': self.total,
+            'progress': round(self.acked_bytes / self.total, 3) if self.total else 1.0,
+            'resumes': self.resumes,
+            'retransmissions': self.engine.retransmissions,
+            'error': self.error,
+        }
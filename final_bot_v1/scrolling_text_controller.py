@@ -6,15 +6,24 @@ Version basée sur final_mask_controller.py avec ajout du défilement
 
 import asyncio
 import time
-from bleak import BleakClient, BleakScanner
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.backends import default_backend
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
 import struct
+import numpy as np
+
+from mask_crypto import MaskCipher, ENCRYPTION_KEY
+from mask_notifications import NotificationDispatcher
+from mask_upload import WindowedUpload, UploadSession
+from mask_pacing import get_pacing
+from mask_raster import (LAYOUT_MSB, image_to_columns, columns_to_wire, columns_to_pixels,
+                         pixels_to_wire, white_color_array)
+from mask_link import LinkTuner, read_negotiated_mtu
+from mask_glyphs import load_font
+from mask_cache import UploadCache, payload_key, ON_SCREEN
+from mask_connection import MaskConnector
+from mask_commands import CommandQueue
 
 # Configuration BLE
 DEVICE_NAME = "MASK"
-ENCRYPTION_KEY = bytes.fromhex("32672f7974ad43451d9c6c894a0e8764")
 
 # UUIDs des caractéristiques
 COMMAND_UUID = "d44bc439-abfd-45a2-b575-925416129600"
@@ -29,25 +38,53 @@ SCROLL_MODES = {
     'scroll_right': 4 # Défilement vers la droite
 }
 
+# Réglages persistants rejoués après une reconnexion (dernière valeur envoyée de chacun)
+REPLAYED_COMMANDS = (b"LIGHT", b"MODE", b"SPEED", b"FC", b"BG")
+
+# Polices essayées dans l'ordre
+TEXT_FONT_PATHS = (
+    "/System/Library/Fonts/Arial.ttf",  # macOS
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",  # Linux
+    "arial.ttf"  # Windows
+)
+
 class ScrollingMaskController:
     """
     Contrôleur de masque LED avec support du texte défilant
     """
     
-    def __init__(self):
+    def __init__(self, client=None):
+        # client : remplaçant de BleakClient (ex : mask_simulator.SimulatedMaskClient)
+        self.injected_client = client
         self.client = None
+        self.address = None
         self.upload_running = False
         self.current_upload = {}
+        # asyncio.Event levé par l'ordonnanceur pour interrompre l'upload en cours entre deux paquets
+        self.upload_interrupt = None
+        # UploadSession en cours ou dernière terminée (progression, annulation)
+        self.upload_session = None
+        # Appelé avec (bytes acquittés, total) pendant chaque upload
+        self.on_upload_progress = None
         self.notification_response = None
+        self.cipher = MaskCipher()
+        self.notifications = NotificationDispatcher()
+        self.pacing = get_pacing()
+        self.link = LinkTuner()
+        self.upload_cache = UploadCache()
+        self.connector = MaskConnector(DEVICE_NAME, required_uuids=(COMMAND_UUID, UPLOAD_UUID, NOTIFY_UUID))
+        self.command_queue = CommandQueue(self._write_command, lambda: self.pacing.command_delay)
+        # État voulu : {mot-clé: commande}, conservé à travers les déconnexions
+        self.desired_state = {}
+        # Appelé (sans argument) quand Bleak signale une déconnexion non demandée
+        self.on_disconnect = None
         
     def encrypt_aes128(self, data):
         """Chiffrement AES-128 ECB"""
         if len(data) != 16:
             raise ValueError("Data must be exactly 16 bytes")
             
-        cipher = Cipher(algorithms.AES(ENCRYPTION_KEY), modes.ECB(), backend=default_backend())
-        encryptor = cipher.encryptor()
-        return encryptor.update(data) + encryptor.finalize()
+        return self.cipher.encrypt(data)
 
     def pad_byte_array(self, array, length):
         """Remplit le tableau avec des zéros jusqu'à la longueur spécifiée"""
@@ -60,90 +97,115 @@ class ScrollingMaskController:
         if not self.client:
             raise RuntimeError("Non connecté au masque")
             
+        self._remember_setting(data)
+        # File d'écriture : les réglages en attente sont fusionnés (dernière valeur gagnante)
+        await self.command_queue.send(data)
+
+    async def _write_command(self, data):
+        """Écriture chiffrée d'une commande, appelée par la file (la pause est gérée par la file)"""
+        if not self.client:
+            raise RuntimeError("Non connecté au masque")
         padded_data = self.pad_byte_array(data, 16)
         encrypted_data = self.encrypt_aes128(padded_data)
         
         await self.client.write_gatt_char(COMMAND_UUID, encrypted_data)
-        await asyncio.sleep(0.1)
+        self.connector.command_sent()
 
-    async def send_upload_data(self, data):
-        """Envoie des données via la caractéristique d'upload"""
+    def _remember_setting(self, data):
+        for keyword in REPLAYED_COMMANDS:
+            if bytes(data[1:1 + len(keyword)]) == keyword:
+                self.desired_state[keyword.decode()] = bytes(data)
+                return
+
+    async def restore_state(self):
+        """
+        Renvoie d'un bloc les derniers réglages (luminosité, mode, vitesse, couleurs)
+        après une reconnexion : écrits à la suite, une seule pause à la fin
+        """
+        if not self.client:
+            raise RuntimeError("Non connecté au masque")
+        futures = [self.command_queue.submit(data) for data in self.desired_state.values()]
+        await self.command_queue.flush()
+        await asyncio.gather(*futures)
+        return len(futures)
+
+    def set_pacing(self, pacing):
+        """Change la politique de cadencement ('safe', 'fast', 'max'), retourne l'ancienne"""
+        previous = self.pacing
+        self.pacing = get_pacing(pacing)
+        return previous
+
+    async def send_upload_data(self, data, pacing=None):
+        """Envoie des données via la caractéristique d'upload (pacing : preset de cet upload, sinon self.pacing)"""
         if not self.client:
             raise RuntimeError("Non connecté au masque")
             
         await self.client.write_gatt_char(UPLOAD_UUID, data, response=False)
-        await asyncio.sleep(0.2)
+        policy = self.pacing if pacing is None else get_pacing(pacing)
+        delay = policy.packet_delay(self.link)
+        if delay:
+            await asyncio.sleep(delay)
 
     def notification_handler(self, sender, data):
         """Gestionnaire des notifications"""
         try:
-            cipher = Cipher(algorithms.AES(ENCRYPTION_KEY), modes.ECB(), backend=default_backend())
-            decryptor = cipher.decryptor()
-            decrypted = decryptor.update(data) + decryptor.finalize()
+            decrypted = self.cipher.decrypt(data)
             
             str_len = decrypted[0]
             if str_len > 0 and str_len < len(decrypted):
                 response = decrypted[1:str_len+1].decode('ascii', errors='ignore')
                 self.notification_response = response
+                self.notifications.dispatch(response, decrypted)
         except Exception as e:
             print(f"Erreur de déchiffrement: {e}")
 
     async def connect(self):
         """Connexion au masque"""
-        print("Recherche du masque...")
-        
-        devices = await BleakScanner.discover()
-        
-        mask_device = None
-        for device in devices:
-            if device.name and DEVICE_NAME in device.name:
-                mask_device = device
-                break
-                
-        if not mask_device:
-            raise RuntimeError("Masque non trouvé")
-            
-        print(f"Connexion à {mask_device.name}")
-        
-        self.client = BleakClient(mask_device.address)
-        await self.client.connect()
+        # Client injecté, sinon adresse en cache, sinon scan arrêté au premier masque
+        self.client = await self.connector.connect(self.injected_client,
+                                                   disconnected_callback=self._handle_disconnected)
+        self.address = getattr(self.client, 'address', None)
+        self.cipher = MaskCipher()
+        self.upload_cache.invalidate()
         
         await self.client.start_notify(NOTIFY_UUID, self.notification_handler)
         
+        chunk_size = self.link.set_mtu(await read_negotiated_mtu(self.client))
+        print(f"MTU: {self.link.mtu or 'par défaut'}, paquets de {chunk_size} bytes")
+        
         print("Connecté avec succès!")
         return True
 
     async def disconnect(self):
         """Déconnexion du masque"""
-        if self.client:
-            await self.client.disconnect()
-            self.client = None
+        client, self.client = self.client, None
+        if client:
+            await client.disconnect()
+        self.upload_cache.invalidate()
+
+    def _handle_disconnected(self, client):
+        """Callback Bleak : ignoré pour une déconnexion demandée (self.client déjà remis à None)"""
+        if client is not self.client:
+            return
+        print("⚠️ Masque déconnecté")
+        self.upload_cache.invalidate()
+        if self.on_disconnect:
+            self.on_disconnect()
 
     def get_text_image(self, text, width_multiplier=1.5):
         """
-        Génère une image bitmap à partir du texte
+        Génère une image bitmap à partir du texte (une liste de 16 pixels par colonne)
         width_multiplier permet de créer plus d'espace pour le défilement
         """
-        try:
-            font_paths = [
-                "/System/Library/Fonts/Arial.ttf",  # macOS
-                "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",  # Linux
-                "arial.ttf"  # Windows
-            ]
-            
-            font = None
-            for font_path in font_paths:
-                try:
-                    font = ImageFont.truetype(font_path, 14)
-                    break
-                except:
-                    continue
-                    
-            if font is None:
-                font = ImageFont.load_default()
-                
-        except:
-            font = ImageFont.load_default()
+        return columns_to_pixels(self.get_text_columns(text, width_multiplier))
+
+    def get_text_columns(self, text, width_multiplier=1.5):
+        """
+        Génère le texte directement en mots de colonne 16 bits (tableau NumPy)
+        width_multiplier permet de créer plus d'espace pour le défilement
+        """
+        # Police chargée une seule fois (cache partagé avec l'atlas de glyphes)
+        _, font = load_font(TEXT_FONT_PATHS, 14)
 
         # Calcul de la largeur du texte
         dummy_img = Image.new('L', (1, 1))
@@ -163,72 +225,28 @@ class ScrollingMaskController:
         x_offset = (total_width - text_width) // 2
         draw.text((x_offset, y_offset), text, fill=255, font=font)
         
-        # Conversion en bitmap binaire par colonnes
-        pixels = []
-        for x in range(total_width):
-            column = []
-            for y in range(16):
-                pixel_value = img.getpixel((x, y))
-                binary_val = 1 if pixel_value > 128 else 0
-                column.append(binary_val)
-            pixels.append(column)
-            
-        return pixels
+        # Seuil + bit-packing vectorisés (pixel allumé si > 128)
+        return image_to_columns(img, threshold=128)
 
     def encode_bitmap_for_mask(self, bitmap):
         """
         Encode le bitmap au format masque selon mask-go
+        Accepte les mots de colonne de get_text_columns ou l'ancien format liste de colonnes
         """
-        results = bytearray()
-        
-        for column in bitmap:
-            if len(column) != 16:
-                print(f"ATTENTION: colonne de longueur {len(column)} au lieu de 16")
-                
-            val = 0
-            for j, pixel in enumerate(column):
-                if pixel == 1:
-                    bit_mapping = {
-                        0: 128,    # 0x80
-                        1: 64,     # 0x40
-                        2: 32,     # 0x20
-                        3: 16,     # 0x10
-                        4: 8,      # 0x08
-                        5: 4,      # 0x04
-                        6: 2,      # 0x02
-                        7: 1,      # 0x01
-                        8: 32768,  # 0x8000
-                        9: 16384,  # 0x4000
-                        10: 8192,  # 0x2000
-                        11: 4096,  # 0x1000
-                        12: 2048,  # 0x0800
-                        13: 1024,  # 0x0400
-                        14: 512,   # 0x0200
-                        15: 256    # 0x0100
-                    }
-                    
-                    if j in bit_mapping:
-                        val |= bit_mapping[j]
-            
-            # Encodage little-endian sur 2 bytes
-            int_bytes = struct.pack('<H', val)
-            results.extend(int_bytes)
-            
-        return bytes(results)
+        if isinstance(bitmap, np.ndarray) and bitmap.ndim == 1:
+            return columns_to_wire(bitmap, LAYOUT_MSB)
+        return pixels_to_wire(bitmap)
 
     def encode_color_array_for_mask(self, columns):
         """Génère un tableau de couleurs blanches"""
-        results = bytearray()
-        for i in range(columns):
-            results.extend([0xFF, 0xFF, 0xFF])  # RGB blanc
-        return bytes(results)
+        return white_color_array(columns)
 
     async def upload_part(self):
         """Envoie une partie de l'upload"""
         if self.current_upload['bytes_sent'] == self.current_upload['total_len']:
             return
             
-        max_size = 80
+        max_size = self.link.chunk_size
         
         bytes_to_send = min(max_size, 
                            self.current_upload['total_len'] - self.current_upload['bytes_sent'])
@@ -247,6 +265,41 @@ class ScrollingMaskController:
         self.current_upload['bytes_sent'] += bytes_to_send
         self.current_upload['packet_count'] += 1
 
+    async def upload_all_parts(self, window=None, pacing=None):
+        """Envoie tout le buffer courant avec une fenêtre glissante (REOK par paquet)"""
+        policy = self.pacing if pacing is None else get_pacing(pacing)
+        engine = WindowedUpload(self, window or policy.window, pacing=pacing)
+        return await engine.run()
+
+    async def upload_buffer(self, dats, buffer, cancel=None, pacing=None):
+        """
+        Upload complet DATS -> paquets -> DATCPOK par une UploadSession
+        (annulable par cancel_upload ou le jeton cancel, reprise au dernier paquet acquitté après un timeout REOK)
+        pacing : preset de cet upload seulement, self.pacing n'est pas modifié
+        """
+        session = UploadSession(self, dats, buffer, on_progress=self.on_upload_progress, cancel=cancel,
+                                pacing=pacing)
+        return await session.run()
+
+    async def cancel_upload(self):
+        """Annule l'upload en cours et attend son arrêt ; False si aucun upload n'était en cours"""
+        session = self.upload_session
+        if session is None or not session.active:
+            return False
+        session.cancel()
+        await session.wait_closed()
+        return True
+
+    def text_dats(self, bitmap, color_array):
+        """Commande DATS d'un texte : longueur totale, longueur du bitmap, type 0"""
+        cmd = bytearray()
+        cmd.append(9)
+        cmd.extend(b"DATS")
+        cmd.extend(struct.pack('>H', len(bitmap) + len(color_array)))
+        cmd.extend(struct.pack('>H', len(bitmap)))
+        cmd.append(0)
+        return cmd
+
     async def finish_upload(self):
         """Finalise l'upload avec DATCP"""
         cmd = bytearray()
@@ -256,20 +309,12 @@ class ScrollingMaskController:
         await self.send_command(cmd)
 
     async def wait_for_response(self, expected_response, timeout=3.0):
-        """Attend une réponse spécifique"""
-        start_time = time.time()
-        
-        if self.notification_response == expected_response:
-            self.notification_response = None
-            return True
-        
-        while time.time() - start_time < timeout:
-            if self.notification_response == expected_response:
-                self.notification_response = None
-                return True
-            await asyncio.sleep(0.1)
-            
-        raise TimeoutError(f"Timeout en attente de {expected_response}")
+        """Attend une réponse spécifique (réveil immédiat à la notification)"""
+        try:
+            await self.notifications.wait_for(expected_response, timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Timeout en attente de {expected_response}") from None
+        return True
 
     async def init_upload(self, bitmap, color_array):
         """Initialise l'upload avec DATS"""
@@ -285,14 +330,9 @@ class ScrollingMaskController:
             'complete_buffer': bitmap + color_array
         }
         
-        cmd = bytearray()
-        cmd.append(9)
-        cmd.extend(b"DATS")
-        cmd.extend(struct.pack('>H', self.current_upload['total_len']))
-        cmd.extend(struct.pack('>H', len(bitmap)))
-        cmd.append(0)
+        cmd = self.text_dats(bitmap, color_array)
         
-        self.notification_response = None
+        self.notifications.clear()
         await self.send_command(cmd)
         self.upload_running = True
         
@@ -305,6 +345,7 @@ class ScrollingMaskController:
         
         cmd = bytearray([5]) + b"MODE" + bytes([mode])
         await self.send_command(cmd)
+        self.upload_cache.invalidate()
         
         mode_names = {1: "steady", 2: "blink", 3: "scroll left", 4: "scroll right"}
         print(f"Mode configuré: {mode_names.get(mode, f'mode {mode}')}")
@@ -313,9 +354,10 @@ class ScrollingMaskController:
         """Configure la vitesse de défilement (0-255, plus haut = plus rapide)"""
         cmd = bytearray([6]) + b"SPEED" + bytes([speed])
         await self.send_command(cmd)
+        self.upload_cache.invalidate()
         print(f"Vitesse de défilement: {speed}")
 
-    async def set_scrolling_text(self, text, scroll_mode='scroll_left', speed=50, width_multiplier=1.5):
+    async def set_scrolling_text(self, text, scroll_mode='scroll_left', speed=50, width_multiplier=1.5, pacing=None):
         """
         Affiche du texte défilant sur le masque
         
@@ -324,37 +366,37 @@ class ScrollingMaskController:
             scroll_mode: 'scroll_left', 'scroll_right', 'blink', ou 'steady'
             speed: Vitesse de défilement (0-255)
             width_multiplier: Multiplicateur de largeur pour le défilement
+            pacing: Preset de cadencement pour cet appel ('safe', 'fast', 'max')
         """
         print(f"Affichage défilant: '{text}' (mode: {scroll_mode}, vitesse: {speed})")
+        # Preset de cet appel, passé à l'upload : self.pacing n'est pas modifié
+        pacing = get_pacing(pacing) if pacing is not None else None
         
-        # 1. Configuration du mode et de la vitesse
-        await self.set_mode(scroll_mode)
-        await self.set_scroll_speed(speed)
-        
-        # 2. Génération de l'image avec espace pour le défilement
-        pixel_map = self.get_text_image(text, width_multiplier)
+        # 1. Génération des colonnes avec espace pour le défilement
+        pixel_map = self.get_text_columns(text, width_multiplier)
         
-        # 3. Encodage du bitmap
+        # 2. Encodage du bitmap
         bitmap = self.encode_bitmap_for_mask(pixel_map)
         
-        # 4. Génération des couleurs
+        # 3. Génération des couleurs
         color_array = self.encode_color_array_for_mask(len(pixel_map))
         
-        print(f"Image: {len(pixel_map)} colonnes, Bitmap: {len(bitmap)} bytes")
+        # 4. Même contenu déjà à l'écran : rien à envoyer
+        key = payload_key('text', bitmap, color_array, scroll_mode, speed)
+        if self.upload_cache.lookup(key, len(bitmap) + len(color_array)) == ON_SCREEN:
+            print("♻️ Texte identique déjà affiché, upload ignoré")
+            return
         
-        # 5. Upload
-        await self.init_upload(bitmap, color_array)
+        # 5. Configuration du mode et de la vitesse
+        await self.set_mode(scroll_mode)
+        await self.set_scroll_speed(speed)
         
-        # 6. Envoi des paquets
-        while self.current_upload['bytes_sent'] < self.current_upload['total_len']:
-            await self.upload_part()
-            await self.wait_for_response("REOK", timeout=3.0)
-            
-        # 7. Finalisation
-        await self.finish_upload()
-        await self.wait_for_response("DATCPOK", timeout=3.0)
+        print(f"Image: {len(pixel_map)} colonnes, Bitmap: {len(bitmap)} bytes")
         
-        self.upload_running = False
+        # 6. Upload : DATS, paquets (fenêtre glissante), DATCP
+        await self.upload_buffer(self.text_dats(bitmap, color_array), bitmap + color_array, pacing=pacing)
+        
+        self.upload_cache.record_upload(key, len(bitmap) + len(color_array))
         print("✅ Texte défilant configuré avec succès!")
 
     async def set_brightness(self, brightness):
@@ -366,11 +408,13 @@ class ScrollingMaskController:
         """Configure la couleur de fond"""
         cmd = bytearray([6]) + b"BG" + bytes([1, r, g, b])
         await self.send_command(cmd)
+        self.upload_cache.invalidate()
 
     async def set_foreground_color(self, r, g, b):
         """Configure la couleur du texte"""
         cmd = bytearray([6]) + b"FC" + bytes([1, r, g, b])
         await self.send_command(cmd)
+        self.upload_cache.invalidate()
 
     async def demo_scrolling_effects(self):
         """Démonstration des différents effets de défilement"""
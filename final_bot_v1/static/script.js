@@ -7,6 +7,7 @@ const API = {
     anim: '/api/anim',
     diy: '/api/diy',
     logs: '/api/logs',
+    events: '/api/events',
     preview: '/api/preview'
 };
 
@@ -50,9 +51,13 @@ document.addEventListener('DOMContentLoaded', () => {
     initPalette();
     loadAutoSave();
 
-    // Polling
-    setInterval(updateStatus, 1000);
-    setInterval(fetchLogs, 1000);
+    // Push channel (Server-Sent Events), polling only without EventSource
+    if (window.EventSource) {
+        subscribeEvents();
+    } else {
+        setInterval(updateStatus, 1000);
+        setInterval(fetchLogs, 1000);
+    }
 
     // Restore Brightness
     const storedV = localStorage.getItem('mask_brightness');
@@ -203,22 +208,48 @@ function generateDIYGrid() {
     });
 }
 
+function subscribeEvents() {
+    const source = new EventSource(API.events);
+    // The browser reconnects on its own; each new stream starts with a full status and log backlog
+    source.addEventListener('status', e => applyStatus(JSON.parse(e.data)));
+    source.addEventListener('state', e => applyStatus(JSON.parse(e.data)));
+    source.addEventListener('logs', e => {
+        logLines = JSON.parse(e.data).slice(-MAX_LOG_LINES);
+        if (logLines.length) logCursor = logLines[logLines.length - 1].seq;
+        renderLogs();
+    });
+    source.addEventListener('log', e => {
+        const record = JSON.parse(e.data);
+        logLines.push(record);
+        logCursor = record.seq;
+        if (logLines.length > MAX_LOG_LINES) logLines.shift();
+        renderLogs();
+    });
+    source.addEventListener('upload', e => updateUploadProgress(JSON.parse(e.data)));
+}
+
+function updateUploadProgress(data) {
+    const btn = document.getElementById('uploadBtn');
+    if (btn && btn.disabled && data.progress < 100) btn.innerText = `⏳ SENDING ${data.progress}%`;
+}
+
 async function updateStatus() {
     try {
         const res = await fetch(API.status);
-        const data = await res.json();
-
-        isConnected = data.connected;
-        currentAnim = data.current_anim;
-        mode = data.mode;
+        applyStatus(await res.json());
+    } catch (e) { }
+}
 
-        updateConnectionUI();
-        updateActiveAnim();
+function applyStatus(data) {
+    isConnected = data.connected;
+    currentAnim = data.current_anim;
+    mode = data.mode;
 
-        const modeText = document.getElementById('mode-text');
-        if (modeText) modeText.innerText = mode || "--";
+    updateConnectionUI();
+    updateActiveAnim();
 
-    } catch (e) { }
+    const modeText = document.getElementById('mode-text');
+    if (modeText) modeText.innerText = mode || "--";
 }
 
 function updateConnectionUI() {
@@ -359,37 +390,47 @@ async function setAnim(id) {
 }
 
 // Logs
-let lastLogLength = 0;
+const MAX_LOG_LINES = 100;
+let logLines = []; // records {seq, ts, level, source, message}
+let logCursor = 0;
 async function fetchLogs() {
     try {
-        const res = await fetch(API.logs);
+        // Only records newer than the last one received
+        const res = await fetch(`${API.logs}?since=${logCursor}`);
         const data = await res.json();
-        const logs = data.logs || [];
-
-        // Updates ALL terminal windows (both Dashboard and Editor)
-        document.querySelectorAll('.terminal-window').forEach(container => {
-            // Avoid full re-render if nothing changed (basic check on length and active)
-            // But since we have multiple, simple check is safer.
-            // We can optimize if needed.
-
-            const html = logs.map(l => {
-                let type = 'info';
-                if (l.includes('Error') || l.includes('Failed')) type = 'error';
-                else if (l.includes('Sent') || l.includes('Success') || l.includes('Upload')) type = 'success';
-                return `<div class="log-line ${type}"><span class="log-ts">></span>${escapeHtml(l)}</div>`;
-            }).join('');
-
-            // Only update if different
-            if (container.innerHTML !== html) {
-                const isAtBottom = (container.scrollHeight - container.scrollTop - container.clientHeight) < 50;
-                container.innerHTML = html;
-                if (isAtBottom) container.scrollTop = container.scrollHeight;
-            }
-        });
-
+        // The server may move the cursor back (restarted server: its sequence starts over)
+        if (data.next !== undefined) logCursor = data.next;
+        if (!data.logs || !data.logs.length) return;
+        logLines = logLines.concat(data.logs).slice(-MAX_LOG_LINES);
+        renderLogs();
     } catch (e) { }
 }
 
+function renderLogs() {
+    const logs = logLines;
+    // Updates ALL terminal windows (both Dashboard and Editor)
+    document.querySelectorAll('.terminal-window').forEach(container => {
+        // Avoid full re-render if nothing changed (basic check on length and active)
+        // But since we have multiple, simple check is safer.
+        // We can optimize if needed.
+
+        const html = logs.map(l => {
+            const message = l.message;
+            let type = 'info';
+            if (l.level === 'ERROR' || message.includes('Error') || message.includes('Failed')) type = 'error';
+            else if (message.includes('Sent') || message.includes('Success') || message.includes('Upload')) type = 'success';
+            return `<div class="log-line ${type}"><span class="log-ts">></span>${escapeHtml(message)}</div>`;
+        }).join('');
+
+        // Only update if different
+        if (container.innerHTML !== html) {
+            const isAtBottom = (container.scrollHeight - container.scrollTop - container.clientHeight) < 50;
+            container.innerHTML = html;
+            if (isAtBottom) container.scrollTop = container.scrollHeight;
+        }
+    });
+}
+
 function escapeHtml(text) {
     return text.replace(/&/g, "&amp;").replace(/</g, "&lt;").replace(/>/g, "&gt;").replace(/"/g, "&quot;").replace(/'/g, "&#039;");
 }
@@ -462,6 +503,7 @@ function initGrid() {
         if (editorState.isDrawing) {
             editorState.isDrawing = false;
             saveAutoSave();
+            if (isLivePreview()) sendLiveFrame();
             // pushHistory(); 
         }
     };
@@ -784,6 +826,7 @@ function fillGrid() {
     if (!canvas) return;
     Array.from(canvas.children).forEach(p => p.style.backgroundColor = editorState.color);
     saveAutoSave();
+    if (isLivePreview()) sendLiveFrame();
 }
 
 function clearGrid() {
@@ -791,6 +834,7 @@ function clearGrid() {
     if (!canvas) return;
     Array.from(canvas.children).forEach(p => p.style.backgroundColor = '#000000');
     saveAutoSave();
+    if (isLivePreview()) sendLiveFrame();
 }
 
 function rgbToHex(rgb) {
@@ -818,6 +862,35 @@ function loadAutoSave() {
     } catch (e) { }
 }
 
+function gridToRGB(canvas) {
+    const cells = canvas.children;
+    const rgb = new Uint8Array(cells.length * 3);
+    for (let i = 0; i < cells.length; i++) {
+        const hex = rgbToHex(cells[i].style.backgroundColor);
+        const value = /^#[0-9a-f]{6}$/i.test(hex) ? parseInt(hex.slice(1), 16) : 0;
+        rgb[i * 3] = value >> 16;
+        rgb[i * 3 + 1] = (value >> 8) & 0xff;
+        rgb[i * 3 + 2] = value & 0xff;
+    }
+    return rgb;
+}
+
+function isLivePreview() {
+    const live = document.getElementById('livePreviewCheck');
+    return live && live.checked;
+}
+
+function sendLiveFrame() {
+    // Fire and forget: the server drops or interrupts older frames, the newest one wins
+    const canvas = document.getElementById('canvas');
+    if (!canvas) return;
+    fetch(API.preview, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/octet-stream' },
+        body: gridToRGB(canvas)
+    }).catch(() => { });
+}
+
 async function sendToMask() {
     const btn = document.getElementById('uploadBtn');
     if (btn) {
@@ -827,13 +900,12 @@ async function sendToMask() {
     const canvas = document.getElementById('canvas');
     if (!canvas) return;
 
-    const pixels = Array.from(canvas.children).map(p => rgbToHex(p.style.backgroundColor));
-
     try {
+        // Raw RGB grid: 7 KB instead of ~25 KB of JSON hex strings
         const res = await fetch(API.preview, {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ pixels })
+            headers: { 'Content-Type': 'application/octet-stream' },
+            body: gridToRGB(canvas)
         });
         const d = await res.json();
         if (btn) {
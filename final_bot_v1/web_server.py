@@ -1,8 +1,121 @@
 import os
+import sys
 import asyncio
 import json
+import logging
+import threading
+import time
+from collections import deque
+from itertools import islice
 from aiohttp import web
-from typing import List
+
+from mask_pacing import PACING_PRESETS
+from mask_raster import pixel_grid_to_rgb
+from mask_upload import UploadCancelled
+
+# Log records kept for the dashboard; older ones fall off the ring in O(1)
+MAX_LOGS = 500
+# Console lines logged above INFO, recognised by the emoji the code base prints them with
+CONSOLE_LEVELS = (("❌", logging.ERROR), ("⚠️", logging.WARNING))
+
+# Events buffered per SSE client before the oldest are dropped (slow browser tab)
+EVENT_QUEUE_SIZE = 256
+# Comment line sent when idle so proxies keep the stream open (seconds)
+EVENT_KEEPALIVE = 15.0
+# How often connection/mode changes are checked for the push channel (seconds)
+STATE_WATCH_INTERVAL = 0.25
+
+
+class LogRing:
+    """Bounded log history; each record gets a sequence number so clients only fetch what is new"""
+
+    def __init__(self, maxlen=MAX_LOGS):
+        self.records = deque(maxlen=maxlen)
+        self.next_seq = 1
+        self._lock = threading.Lock()
+
+    def append(self, message, level='INFO', source='web', ts=None):
+        with self._lock:
+            record = {"seq": self.next_seq, "ts": ts if ts is not None else time.time(),
+                      "level": level, "source": source, "message": message}
+            self.next_seq += 1
+            self.records.append(record)
+        return record
+
+    def since(self, seq=0, limit=None):
+        """
+        (records after seq, cursor for the next call, records lost off the ring since seq)
+        A cursor this ring never handed out (server restarted) starts over from the oldest
+        kept record; everything before it counts as lost.
+        """
+        with self._lock:
+            first = self.records[0]["seq"] if self.records else self.next_seq
+            if seq >= self.next_seq:
+                seq = 0
+            start = max(0, seq + 1 - first)
+            stop = None if limit is None else start + limit
+            records = list(islice(self.records, start, stop))
+            dropped = max(0, first - seq - 1)
+        cursor = records[-1]["seq"] if records else max(seq, first - 1)
+        return records, cursor, dropped
+
+
+class DashboardLogHandler(logging.Handler):
+    """logging handler feeding the dashboard ring buffer"""
+
+    def __init__(self, server, level=logging.INFO):
+        super().__init__(level)
+        self.server = server
+
+    def emit(self, record):
+        try:
+            message = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        self.server.add_record(message, record.levelname, record.name, record.created)
+
+
+class ConsoleCapture:
+    """
+    sys.stdout replacement: output still reaches the terminal, and each complete line
+    becomes a log record (print() calls arrive in pieces, the newline comes separately)
+    """
+
+    def __init__(self, logger, stream=None):
+        self.logger = logger
+        self.stream = stream or sys.__stdout__
+        self._partial = ""
+        self._local = threading.local()
+
+    def write(self, message):
+        self.stream.write(message)
+        if getattr(self._local, 'busy', False):
+            # A handler printing while we log: terminal only, no recursion
+            return len(message)
+        self._partial += message
+        if "\n" not in self._partial:
+            return len(message)
+        *lines, self._partial = self._partial.split("\n")
+        self._local.busy = True
+        try:
+            for line in lines:
+                line = line.strip()
+                if line:
+                    self.logger.log(self._level(line), line)
+        finally:
+            self._local.busy = False
+        return len(message)
+
+    def _level(self, line):
+        for prefix, level in CONSOLE_LEVELS:
+            if line.startswith(prefix):
+                return level
+        return logging.INFO
+
+    def flush(self):
+        self.stream.flush()
+
 
 class WebServer:
     def __init__(self, coordinator):
@@ -10,8 +123,17 @@ class WebServer:
         self.app = web.Application()
         self.runner = None
         self.site = None
-        self.log_buffer: List[str] = []
-        self.max_logs = 100
+        self.logs = LogRing()
+        # Server-Sent Events: one queue per connected dashboard
+        self.subscribers = set()
+        self.loop = None
+        self._watch_task = None
+        self._last_state = None
+        # Editor previews: newest request number, and the cancel token of the upload it is running
+        self.preview_seq = 0
+        self.preview_cancel = None
+        if getattr(coordinator, 'mask', None) is not None:
+            coordinator.mask.on_upload_progress = self._on_upload_progress
         
         # Setup Routes
         self.app.router.add_get('/', self.handle_index)
@@ -24,7 +146,12 @@ class WebServer:
         self.app.router.add_post('/api/anim', self.handle_anim)
         self.app.router.add_post('/api/diy', self.handle_diy)
         self.app.router.add_post('/api/preview', self.handle_preview)
+        self.app.router.add_post('/api/pacing', self.handle_pacing)
         self.app.router.add_get('/api/logs', self.handle_logs)
+        self.app.router.add_get('/api/events', self.handle_events)
+        self.app.on_startup.append(self._start_push)
+        self.app.on_shutdown.append(self._close_streams)
+        self.app.on_cleanup.append(self._stop_push)
         
         # Static files
         static_path = os.path.join(os.path.dirname(__file__), 'static')
@@ -42,12 +169,120 @@ class WebServer:
         if self.runner:
             await self.runner.cleanup()
 
-    def log(self, message):
-        """Append log to buffer"""
-        # print(message) # REMOVED to avoid recursion with main.py's WebLogger
-        self.log_buffer.append(message)
-        if len(self.log_buffer) > self.max_logs:
-            self.log_buffer.pop(0)
+    def log(self, message, level='INFO'):
+        """Append a dashboard message to the log ring"""
+        # print(message) # REMOVED to avoid recursion with main.py's console capture
+        self.add_record(message, level, 'web')
+
+    def add_record(self, message, level='INFO', source='web', ts=None):
+        """Store a log record and push it to open event streams (any thread)"""
+        record = self.logs.append(message, level, source, ts)
+        self.publish('log', record)
+        return record
+
+    def log_handler(self, level=logging.INFO):
+        """logging.Handler that sends records to this dashboard"""
+        return DashboardLogHandler(self, level)
+
+    # --- Push channel ---
+
+    async def _start_push(self, app):
+        self.loop = asyncio.get_running_loop()
+        self._watch_task = asyncio.create_task(self._watch_state())
+
+    async def _close_streams(self, app):
+        # End open event streams so shutdown does not wait on them
+        self.publish(None, None)
+
+    async def _stop_push(self, app):
+        if self._watch_task:
+            self._watch_task.cancel()
+            self._watch_task = None
+
+    def publish(self, event, data):
+        """Send an event to every open /api/events stream (safe from any thread)"""
+        if not self.subscribers or self.loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self._fanout(event, data)
+        elif not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._fanout, event, data)
+
+    def _fanout(self, event, data):
+        for queue in list(self.subscribers):
+            if queue.full():
+                # Slow client: lose the oldest event rather than block the mask
+                queue.get_nowait()
+            queue.put_nowait((event, data))
+
+    def _on_upload_progress(self, acked, total):
+        """Called by the upload session for every acknowledged packet"""
+        self.publish('upload', {"acked_bytes": acked, "total": total,
+                                "progress": int(acked * 100 / total) if total else 100})
+
+    def _state_snapshot(self):
+        """Small state published whenever it changes (connection, mode, upload start/end)"""
+        mask = self.coordinator.mask
+        session = getattr(mask, 'upload_session', None) if mask else None
+        return {
+            "connected": bool(mask and mask.client and mask.client.is_connected),
+            "mode": self.coordinator.mode,
+            "current_anim": self.coordinator.current_anim_id,
+            "link": self.coordinator.supervisor.state,
+            "uploading": bool(session and session.active),
+            "upload_state": session.state if session else None,
+        }
+
+    async def _watch_state(self):
+        while True:
+            await asyncio.sleep(STATE_WATCH_INTERVAL)
+            if not self.subscribers:
+                continue
+            try:
+                state = self._state_snapshot()
+            except Exception:
+                continue
+            if state != self._last_state:
+                self._last_state = state
+                self.publish('state', state)
+
+    async def handle_events(self, request):
+        """Server-Sent Events: full status and log backlog first, then state changes, upload progress and new log lines"""
+        response = web.StreamResponse(headers={
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+        })
+        await response.prepare(request)
+
+        queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        try:
+            await self._send_event(response, 'status', self.status_payload())
+            records, _, _ = self.logs.since(0)
+            await self._send_event(response, 'logs', records)
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), timeout=EVENT_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    await response.write(b": keepalive\n\n")
+                    continue
+                if event is None:
+                    break
+                await self._send_event(response, event, data)
+        except ConnectionError:
+            pass
+        finally:
+            self.subscribers.discard(queue)
+        return response
+
+    async def _send_event(self, response, event, data):
+        payload = json.dumps(data, ensure_ascii=False)
+        await response.write(f"event: {event}\ndata: {payload}\n\n".encode('utf-8'))
 
     # --- Handlers ---
 
@@ -64,15 +299,56 @@ class WebServer:
         # or just serve the main page since it's now one file.
         return await self.handle_index(request)
 
+    def _pacing_from(self, data):
+        """Optional per-request pacing preset, validated against PACING_PRESETS"""
+        pacing = data.get('pacing')
+        if pacing is not None and str(pacing).lower() not in PACING_PRESETS:
+            raise web.HTTPBadRequest(text=json.dumps({"status": "error", "message": f"Unknown pacing '{pacing}'"}),
+                                     content_type='application/json')
+        return pacing
+
     async def handle_preview(self, request):
-        data = await request.json()
-        pixels = data.get('pixels', [])
+        # Compact bodies: raw 42x56 RGB (application/octet-stream, pacing in the query)
+        # or JSON {"rgb": base64}; the legacy {"pixels": [hex, ...]} still works
+        if request.content_type == 'application/octet-stream':
+            data = dict(request.query)
+            pixels = await request.read()
+        else:
+            data = await request.json()
+            pixels = data.get('rgb') or data.get('pixels', [])
+        pacing = self._pacing_from(data)
+        try:
+            rgb_buffer = pixel_grid_to_rgb(pixels)
+        except ValueError as e:
+            return web.json_response({"status": "error", "message": str(e)}, status=400)
         
         if not self.coordinator.mask:
              return web.json_response({"status": "error", "message": "Not connected"}, status=400)
+        
+        # Live drawing: the newest frame wins. An older preview still uploading stops at its
+        # next packet, and one still waiting for the lock is dropped without being sent.
+        mask = self.coordinator.mask
+        self.preview_seq += 1
+        seq = self.preview_seq
+        if self.preview_cancel is not None:
+            self.preview_cancel.set()
+        cancel = self.preview_cancel = asyncio.Event()
              
         async with self.coordinator.lock:
-             success = await self.coordinator.mask.upload_pixel_grid(pixels)
+             if seq != self.preview_seq:
+                 mask.frame_deltas.supersede(len(rgb_buffer))
+                 return web.json_response({"status": "superseded"})
+             try:
+                 await mask.upload_raw_rgb(rgb_buffer, pacing=pacing, cancel=cancel)
+                 success = True
+             except UploadCancelled:
+                 return web.json_response({"status": "superseded"})
+             except Exception as e:
+                 print(f"❌ Grid Upload Error: {e}")
+                 success = False
+             finally:
+                 if self.preview_cancel is cancel:
+                     self.preview_cancel = None
              
         if success:
              self.log(f"🎨 Custom Design Uploaded")
@@ -81,10 +357,20 @@ class WebServer:
              return web.json_response({"status": "error", "message": "Upload failed"}, status=500)
 
     async def handle_status(self, request):
+        return web.json_response(self.status_payload())
+
+    def status_payload(self):
         upload_progress = 0
         is_uploading = False
+        upload = None
         
-        if self.coordinator.mask and hasattr(self.coordinator.mask, 'current_upload') and self.coordinator.mask.current_upload:
+        session = getattr(self.coordinator.mask, 'upload_session', None) if self.coordinator.mask else None
+        if session is not None:
+            # Progress counts acknowledged bytes, not bytes merely written
+            upload = session.stats()
+            is_uploading = session.active
+            upload_progress = int(upload['progress'] * 100)
+        elif self.coordinator.mask and hasattr(self.coordinator.mask, 'current_upload') and self.coordinator.mask.current_upload:
             curr = self.coordinator.mask.current_upload
             if curr.get('total_len', 0) > 0:
                 upload_progress = int((curr.get('bytes_sent', 0) / curr.get('total_len', 1)) * 100)
@@ -94,13 +380,33 @@ class WebServer:
                 if curr.get('bytes_sent', 0) < curr.get('total_len', 1):
                     is_uploading = True
                     
-        return web.json_response({
+        return {
             "connected": self.coordinator.mask.client.is_connected if (self.coordinator.mask and self.coordinator.mask.client) else False,
             "mode": self.coordinator.mode,
             "current_anim": self.coordinator.current_anim_id,
             "uploading": is_uploading,
-            "progress": upload_progress
-        })
+            "progress": upload_progress,
+            "upload": upload,
+            "pacing": self.coordinator.mask.pacing.name,
+            "link": self.coordinator.mask.link.stats(),
+            "cache": self.coordinator.mask.upload_cache.stats(),
+            "frame_deltas": self.coordinator.mask.frame_deltas.stats(),
+            "diy_slots": self.coordinator.slots.stats(),
+            "connection": self.coordinator.mask.connector.stats(),
+            "commands": self.coordinator.mask.command_queue.stats(),
+            "scheduler": self.coordinator.scheduler.stats(),
+            "supervisor": self.coordinator.supervisor.stats()
+        }
+
+    async def handle_pacing(self, request):
+        data = await request.json()
+        pacing = self._pacing_from(data)
+        if pacing is None:
+            return web.json_response({"status": "error", "message": "Missing 'pacing'",
+                                      "presets": list(PACING_PRESETS)}, status=400)
+        self.coordinator.set_pacing(pacing)
+        self.log(f"⏱️ Pacing set to {pacing}")
+        return web.json_response({"status": "ok", "pacing": self.coordinator.mask.pacing.name})
 
     async def handle_connect(self, request):
         # Trigger connection in background to avoid blocking
@@ -142,13 +448,14 @@ class WebServer:
         color_hex = data.get('color', '#FFFFFF')
         scroll = data.get('scroll', False)
         speed = data.get('speed') # Optional
+        pacing = self._pacing_from(data) # Optional: 'safe', 'fast', 'max'
         
         # Convert hex to rgb
         h = color_hex.lstrip('#')
         rgb = tuple(int(h[i:i+2], 16) for i in (0, 2, 4))
         
         # Use coordinator to show message (prioritize)
-        await self.coordinator.show_overlay_message(text, duration=None, color=rgb, speed=speed)
+        await self.coordinator.show_overlay_message(text, duration=None, color=rgb, speed=speed, pacing=pacing)
         self.log(f"💬 Sent text: {text}")
         return web.json_response({"status": "ok"})
 
@@ -162,12 +469,21 @@ class WebServer:
     async def handle_diy(self, request):
         data = await request.json()
         img_id = int(data.get('id', 1))
-        # Using set_diy_image we added
-        async with self.coordinator.lock:
-             self.coordinator.mode = "DIY"
-             await self.coordinator.mask.set_diy_image(img_id)
+        # Remembered by the coordinator so it is restored after overlays and reconnects
+        await self.coordinator.set_mode_diy(img_id)
         self.log(f"🖼️ DIY Image {img_id}")
         return web.json_response({"status": "ok"})
 
     async def handle_logs(self, request):
-        return web.json_response({"logs": self.log_buffer})
+        """Log records after ?since=<seq> (all kept records without it), at most ?limit= of them"""
+        try:
+            since = int(request.query.get('since', 0))
+            limit = int(request.query['limit']) if 'limit' in request.query else None
+            if limit is not None and limit < 0:
+                raise ValueError(limit)
+        except ValueError:
+            return web.json_response({"status": "error",
+                                      "message": "since must be an integer and limit a non-negative integer"},
+                                     status=400)
+        records, cursor, dropped = self.logs.since(since, limit)
+        return web.json_response({"logs": records, "next": cursor, "dropped": dropped})
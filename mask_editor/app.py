@@ -4,16 +4,23 @@ import os
 import asyncio
 import threading
 import struct
+import atexit
 from bleak import BleakClient, BleakScanner
 
+from mask_session import MaskSession, SessionBusy
+
 # Add src to path to import backend modules
 current_dir = os.path.dirname(os.path.abspath(__file__))
 src_path = os.path.join(current_dir, '..', 'src')
 sys.path.append(src_path)
 
+from modules.utils.pixel_grid import pixel_grid_to_rgb
+
 # Try importing the compatible controller
 try:
-    from working.mask_go_compatible import MaskGoCompatible
+    from working.mask_go_compatible import (MaskGoCompatible, DEVICE_NAME,
+                                            COMMAND_UUID, UPLOAD_UUID, NOTIFY_UUID)
+    from modules.core.connection import MaskConnector
 except ImportError as e:
     print(f"Warning: Could not import MaskGoCompatible: {e}. Live preview will be simulated.")
     class MaskGoCompatible:
@@ -62,7 +69,20 @@ MASK_WIDTH = 46  # Official Shining Mask width is often 46? User editor is 42. W
 MASK_WIDTH = 42
 MASK_HEIGHT = 56 
 
+# Shared across requests: cached mask address and connection metrics
+mask_connector = MaskConnector(DEVICE_NAME, required_uuids=(COMMAND_UUID, UPLOAD_UUID, NOTIFY_UUID)) if HAS_MASK_LIB else None
+
 class CustomRGBUploader(MaskGoCompatible):
+    async def connect(self):
+        """Direct connect to the cached mask address, name-filtered scan only as a fallback"""
+        self.client = await mask_connector.connect()
+        await self.client.start_notify(NOTIFY_UUID, self.notification_handler)
+        return True
+
+    async def send_command(self, data):
+        await super().send_command(data)
+        mask_connector.command_sent()
+
     async def init_upload_image(self, total_len, image_index):
         """
         Initialize upload for High Res Image.
@@ -146,94 +166,33 @@ class CustomRGBUploader(MaskGoCompatible):
             print(f"Upload flow error: {e}")
             return False
 
-async def send_to_mask(pixels_data):
+def build_rgb_buffer(pixels_data):
     """
-    Connects to mask and uploads properly formatted image data.
+    Converts the editor's pixel grid (hex list, raw RGB bytes or base64) to the
+    mask's 46x58 column-major RGB buffer. Returns None if the grid is malformed.
     """
-    TARGET_WIDTH = 46
-    TARGET_HEIGHT = 58
-    
-    # 1. Convert Frontend Data (Hex Strings) to Pillow Image
-    # Frontend sends 42x56 grid
-    SRC_WIDTH = 42
-    SRC_HEIGHT = 56
-    
     try:
-        from PIL import Image
-        
-        # Create Source Image
-        img = Image.new('RGB', (SRC_WIDTH, SRC_HEIGHT), (0,0,0))
-        pixels = img.load()
-        
-        for i, hex_color in enumerate(pixels_data):
-            if i >= SRC_WIDTH * SRC_HEIGHT: break
-            
-            x = i % SRC_WIDTH
-            y = i // SRC_WIDTH
-            
-            if hex_color and hex_color != 'rgba(0, 0, 0, 0)':
-                try:
-                    h = hex_color.lstrip('#')
-                    if len(h) == 6:
-                        color = tuple(int(h[i:i+2], 16) for i in (0, 2, 4))
-                        pixels[x, y] = color
-                except:
-                    pass
-        
-        # 2. Resize to Target Resolution (46x58)
-        # Using LANCZOS for better quality upscale
-        img_resized = img.resize((TARGET_WIDTH, TARGET_HEIGHT), Image.Resampling.LANCZOS)
-        
-        # 3. Create RGB Buffer (COLUMN-MAJOR / Vertical Scan)
-        # Scan X then Y
-        rgb_buffer = bytearray()
-        r_pixels = img_resized.load()
-        
-        for x in range(TARGET_WIDTH):
-            for y in range(TARGET_HEIGHT):
-                r, g, b = r_pixels[x, y]
-                rgb_buffer.extend([r, g, b])
-        
-        # Verify Size
-        expected_size = TARGET_WIDTH * TARGET_HEIGHT * 3 # 8004
-        if len(rgb_buffer) != expected_size:
-            print(f"⚠️ Warning: Buffer size {len(rgb_buffer)} != {expected_size}")
-            
-    except ImportError:
-        print("❌ PIL not found, cannot process image")
-        return False
-        
+        return pixel_grid_to_rgb(pixels_data)
+    except ValueError as e:
+        print(f"❌ Invalid pixel grid: {e}")
+        return None
+
+
+async def upload_rgb_job(mask, rgb_buffer):
+    """Session job: upload one frame on the shared connection."""
     print(f"Ready to upload {len(rgb_buffer)} bytes pure RGB.")
+    ok = await asyncio.wait_for(
+        mask.upload_pixels_bishop_style(rgb_buffer, len(rgb_buffer)), timeout=60.0)
+    if not ok:
+        # Let the session drop the connection and retry once
+        raise RuntimeError("Upload failed")
+    return {"coalesced": False}
 
-    if HAS_MASK_LIB:
-        mask = None
-        try:
-            mask = CustomRGBUploader()
-            
-            async def upload_logic():
-                await mask.connect()
-                
-                # Use our Custom Bishop Logic
-                await mask.upload_pixels_bishop_style(rgb_buffer, len(rgb_buffer))
-                
-                return True
 
-            await asyncio.wait_for(upload_logic(), timeout=60.0)
-            return True
-            
-        except asyncio.TimeoutError:
-            print("❌ Upload timed out")
-            return False
-        except Exception as e:
-            print(f"Error uploading: {e}")
-            import traceback
-            traceback.print_exc()
-            return False
-        finally:
-            if mask:
-                await mask.disconnect()
-            
-    return True
+# One persistent BLE session shared by all requests (own thread and event loop)
+mask_session = MaskSession(CustomRGBUploader) if HAS_MASK_LIB else None
+atexit.register(lambda: mask_session and mask_session.close())
+
 
 @app.route('/')
 def home():
@@ -253,37 +212,58 @@ def set_brightness_route():
         
         print(f"Setting Brightness: {percent}% (Byte: {val})")
         
-        async def brightness_logic():
-            mask = CustomRGBUploader()
-            await mask.connect()
+        async def brightness_job(mask):
             await mask.set_brightness(val)
-            await mask.disconnect()
+            return {"coalesced": False}
             
-        asyncio.run(brightness_logic())
+        if mask_session is None:
+            return jsonify({"status": "error", "message": "Mask library unavailable"}), 503
+        mask_session.run('brightness', brightness_job)
         return jsonify({"status": "success"})
         
+    except SessionBusy as e:
+        return jsonify({"status": "busy", "message": str(e)}), 503
     except Exception as e:
         print(f"Brightness Error: {e}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @app.route('/preview', methods=['POST'])
 def preview():
-    data = request.json
-    pixels = data.get('pixels', [])
+    # Compact bodies: raw RGB (application/octet-stream) or {"rgb": base64}; legacy {"pixels": [hex]}
+    if request.mimetype == 'application/octet-stream':
+        pixels = request.get_data()
+    else:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"status": "error", "message": "Expected a JSON object"}), 400
+        pixels = data.get('rgb') or data.get('pixels', [])
     
-    # Run async upload in a separate thread/loop
-    # Since flask is sync, we need a wrapper
-    success = False
+    rgb_buffer = build_rgb_buffer(pixels)
+    if rgb_buffer is None:
+        return jsonify({"status": "error", "message": "Failed to convert image"}), 400
+    if mask_session is None:
+        # No mask library: simulated preview
+        return jsonify({"status": "success"})
+    
+    # Queued on the shared session; a newer frame replaces this one if it has not started yet
     try:
-        success = asyncio.run(send_to_mask(pixels))
+        result = mask_session.run('preview', lambda mask: upload_rgb_job(mask, rgb_buffer))
+    except SessionBusy as e:
+        return jsonify({"status": "busy", "message": str(e)}), 503
     except Exception as e:
         print(f"Async Upload Error: {e}")
-        return jsonify({"status": "error", "message": str(e)}), 500
-        
-    if success:
-        return jsonify({"status": "success"})
-    else:
         return jsonify({"status": "error", "message": "Failed to upload to mask"}), 500
+        
+    return jsonify({"status": "success", "coalesced": result.get("coalesced", False)})
+
+@app.route('/connection_stats')
+def connection_stats():
+    """Connect method (direct / scan), time-to-first-command and preview round-trip latency"""
+    if mask_connector is None:
+        return jsonify({"status": "unavailable"})
+    stats = mask_connector.stats()
+    stats["session"] = mask_session.stats()
+    return jsonify(stats)
 
 if __name__ == '__main__':
     print("Starting Mask Editor Server...")
@@ -0,0 +1,172 @@
+"""
+Persistent mask session for the editor.
+
+One background thread owns one asyncio event loop and one connected uploader.
+Flask request threads submit jobs to a bounded queue; a pending job with the same
+coalescing key is replaced by the newer one, so dragging a brush only uploads the
+latest frame.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class SessionBusy(Exception):
+    """Raised when the job queue is full."""
+
+
+class MaskSession:
+    def __init__(self, uploader_factory, max_pending=8):
+        self.uploader_factory = uploader_factory
+        self.max_pending = max_pending
+
+        self._lock = threading.Lock()
+        self._pending = OrderedDict()  # key -> (job, [futures], submitted_at)
+        self._loop = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._wakeup = None
+        self._worker_task = None
+        self.mask = None
+
+        # Metrics
+        self.jobs_run = 0
+        self.jobs_coalesced = 0
+        self.jobs_failed = 0
+        self.reconnects = 0
+        self.last_latency = {}
+        self.avg_latency = {}
+
+    # --- Flask side (any thread) ---------------------------------------
+
+    def submit(self, key, job):
+        """
+        Queue job(mask) (an async function) under a coalescing key.
+        Returns a concurrent Future resolved with the job's result, or with
+        {"coalesced": True} if a newer job with the same key replaced it before it ran.
+        """
+        self._ensure_started()
+        future = Future()
+        with self._lock:
+            if key in self._pending:
+                # Replaced by this newer job: its latency clock starts now
+                _, futures, _ = self._pending.pop(key)
+                self.jobs_coalesced += len(futures)
+                for old in futures:
+                    old.set_result({"coalesced": True})
+            elif len(self._pending) >= self.max_pending:
+                raise SessionBusy(f"{len(self._pending)} jobs already pending")
+            self._pending[key] = (job, [future], time.monotonic())
+        self._loop.call_soon_threadsafe(self._wakeup.set)
+        return future
+
+    def run(self, key, job, timeout=120.0):
+        """Submit and wait for the result (blocking, for Flask routes)."""
+        return self.submit(key, job).result(timeout=timeout)
+
+    def stats(self):
+        connected = bool(self.mask and self.mask.client and self.mask.client.is_connected)
+        with self._lock:
+            pending = list(self._pending)
+        return {
+            "connected": connected,
+            "pending": pending,
+            "jobs_run": self.jobs_run,
+            "jobs_coalesced": self.jobs_coalesced,
+            "jobs_failed": self.jobs_failed,
+            "reconnects": self.reconnects,
+            "last_latency_ms": {k: round(v * 1000, 1) for k, v in self.last_latency.items()},
+            "avg_latency_ms": {k: round(v * 1000, 1) for k, v in self.avg_latency.items()},
+        }
+
+    def close(self, timeout=5.0):
+        """Disconnect and stop the loop thread."""
+        if not self._loop:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout=timeout)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._loop.close()
+
+    # --- Session loop ----------------------------------------------------
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None:
+                # Everything submit() touches exists before the thread starts
+                self._loop = asyncio.new_event_loop()
+                self._wakeup = asyncio.Event()
+
+                def run_loop():
+                    asyncio.set_event_loop(self._loop)
+                    self._worker_task = self._loop.create_task(self._worker())
+                    self._ready.set()
+                    self._loop.run_forever()
+
+                self._thread = threading.Thread(target=run_loop, name="mask-session", daemon=True)
+                self._thread.start()
+        # Every caller waits, not only the one that started the thread
+        self._ready.wait()
+
+    async def _worker(self):
+        while True:
+            await self._wakeup.wait()
+            with self._lock:
+                if not self._pending:
+                    self._wakeup.clear()
+                    continue
+                key, (job, futures, submitted_at) = self._pending.popitem(last=False)
+
+            try:
+                result = await self._run_supervised(job)
+            except Exception as e:
+                self.jobs_failed += 1
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            latency = time.monotonic() - submitted_at
+            self.jobs_run += 1
+            self.last_latency[key] = latency
+            previous = self.avg_latency.get(key)
+            self.avg_latency[key] = latency if previous is None else 0.2 * latency + 0.8 * previous
+            for future in futures:
+                future.set_result(result)
+
+    async def _run_supervised(self, job):
+        """Run job on the shared connection; on failure reconnect and retry once."""
+        for attempt in range(2):
+            try:
+                await self._ensure_connected()
+                return await job(self.mask)
+            except Exception as e:
+                print(f"⚠️ Mask session job failed ({e}), dropping connection")
+                await self._disconnect()
+                if attempt == 1:
+                    raise
+                self.reconnects += 1
+
+    async def _shutdown(self):
+        self._worker_task.cancel()
+        try:
+            await self._worker_task
+        except asyncio.CancelledError:
+            pass
+        await self._disconnect()
+
+    async def _ensure_connected(self):
+        if self.mask and self.mask.client and self.mask.client.is_connected:
+            return
+        self.mask = self.uploader_factory()
+        await self.mask.connect()
+
+    async def _disconnect(self):
+        mask, self.mask = self.mask, None
+        if mask and mask.client:
+            try:
+                await mask.disconnect()
+            except Exception:
+                pass
@@ -8,13 +8,32 @@ Classes et fonctions pour créer des animations personnalisées :
 - Animations complexes (feu, eau, plasma)
 - Séquences d'animation
 - Transitions entre animations
+
+Les frames sont des Frame (utils/frame.py) : un uint16 par colonne, envoyé tel quel au masque.
+compile_animation() rend une animation à l'avance en clip (clips.py) ; play_clip() l'envoie.
 """
 
 import asyncio
 import math
-import time
+import random
 from typing import List, Tuple, Callable
+
+import numpy as np
+
 from ..text.scrolling_controller import ScrollingTextController
+from ..utils.bitmap import convert_layout
+from ..utils.frame import Frame, FrameLike, FRAME_HEIGHT
+from .clips import AnimationClip, ClipCache
+from .pacer import FramePacer
+
+# Nom -> méthode qui crée l'animation (fonction t -> frame)
+ANIMATIONS = {
+    'pulse': 'create_pulse_animation',
+    'wave': 'create_wave_animation',
+    'fire': 'create_fire_animation',
+    'rain': 'create_rain_animation',
+    'matrix': 'create_matrix_animation',
+}
 
 class AnimationController(ScrollingTextController):
     """
@@ -22,24 +41,31 @@ class AnimationController(ScrollingTextController):
     Permet de créer et jouer des animations personnalisées.
     """
     
-    def __init__(self):
-        super().__init__()
+    def __init__(self, client=None):
+        super().__init__(client)
         self.animation_running = False
         self.current_animation = None
         self.fps = 10  # 10 FPS au lieu de 30 pour réduire la charge BLE
         self.frame_time = 1.0 / self.fps
+        self.clip_cache = ClipCache()
+        self.last_pacing = None  # stats du FramePacer de la dernière animation
         
-    def create_empty_frame(self) -> List[List[int]]:
+    def create_empty_frame(self) -> Frame:
         """Crée une frame vide (16x64 pixels)"""
-        return [[0 for _ in range(16)] for _ in range(64)]
+        return Frame(64)
     
-    def set_pixel(self, frame: List[List[int]], x: int, y: int, value: int = 1):
+    def set_pixel(self, frame: FrameLike, x: int, y: int, value: int = 1):
         """Allume un pixel dans la frame"""
-        if 0 <= x < len(frame) and 0 <= y < 16:
+        if isinstance(frame, Frame):
+            frame.set_pixel(x, y, value)
+        elif 0 <= x < len(frame) and 0 <= y < 16:
             frame[x][y] = value
     
-    def draw_line(self, frame: List[List[int]], x1: int, y1: int, x2: int, y2: int):
+    def draw_line(self, frame: FrameLike, x1: int, y1: int, x2: int, y2: int):
         """Dessine une ligne dans la frame"""
+        if isinstance(frame, Frame):
+            frame.line(x1, y1, x2, y2)
+            return
         # Algorithme de Bresenham simplifié
         dx = abs(x2 - x1)
         dy = abs(y2 - y1)
@@ -61,16 +87,24 @@ class AnimationController(ScrollingTextController):
                 error += dx
                 y += y_inc
     
-    def draw_circle(self, frame: List[List[int]], center_x: int, center_y: int, radius: int):
+    def draw_circle(self, frame: FrameLike, center_x: int, center_y: int, radius: int):
         """Dessine un cercle dans la frame"""
+        if isinstance(frame, Frame):
+            frame.circle(center_x, center_y, radius)
+            return
         for angle in range(0, 360, 5):  # Pas de 5 degrés
             x = center_x + int(radius * math.cos(math.radians(angle)))
             y = center_y + int(radius * math.sin(math.radians(angle)))
             self.set_pixel(frame, x, y, 1)
     
-    def apply_wave_effect(self, frame: List[List[int]], time_offset: float, amplitude: int = 3):
+    def apply_wave_effect(self, frame: FrameLike, time_offset: float, amplitude: int = 3):
         """Applique un effet de vague sur la frame"""
-        new_frame = self.create_empty_frame()
+        if isinstance(frame, Frame):
+            x = np.arange(len(frame))
+            offsets = (amplitude * np.sin(time_offset + x * 0.3)).astype(np.int64)
+            return frame.shift_columns(offsets)
+        
+        new_frame = [[0 for _ in range(16)] for _ in range(len(frame))]
         
         for x in range(len(frame)):
             wave_offset = int(amplitude * math.sin(time_offset + x * 0.3))
@@ -83,7 +117,7 @@ class AnimationController(ScrollingTextController):
     
     def create_pulse_animation(self, duration: float = 2.0) -> Callable:
         """Crée une animation de pulsation simple"""
-        def pulse_frame(t: float) -> List[List[int]]:
+        def pulse_frame(t: float) -> Frame:
             frame = self.create_empty_frame()
             
             # Calculer l'intensité du pulse (plus lent)
@@ -94,72 +128,61 @@ class AnimationController(ScrollingTextController):
             size = int(10 * pulse_intensity) + 5  # Taille variable
             
             # Dessiner un rectangle simple
-            for x in range(max(0, center_x - size), min(64, center_x + size)):
-                for y in range(max(0, center_y - size//2), min(16, center_y + size//2)):
-                    self.set_pixel(frame, x, y, 1)
-            
-            return frame
+            return frame.fill_rect(center_x - size, center_y - size//2, center_x + size, center_y + size//2)
         
         return pulse_frame
     
     def create_wave_animation(self, speed: float = 1.0) -> Callable:
         """Crée une animation de vague"""
-        def wave_frame(t: float) -> List[List[int]]:
+        x = np.arange(64)
+        
+        def wave_frame(t: float) -> Frame:
             frame = self.create_empty_frame()
             
             # Créer des vagues sinusoïdales
-            for x in range(64):
-                y = int(8 + 4 * math.sin(t * speed + x * 0.2))
-                self.set_pixel(frame, x, y, 1)
-                
-                # Ajouter une deuxième vague
-                y2 = int(8 + 2 * math.sin(t * speed * 1.5 + x * 0.3 + math.pi))
-                self.set_pixel(frame, x, y2, 1)
+            y = np.trunc(8 + 4 * np.sin(t * speed + x * 0.2))
+            frame.set_pixels(x, y)
             
-            return frame
+            # Ajouter une deuxième vague
+            y2 = np.trunc(8 + 2 * np.sin(t * speed * 1.5 + x * 0.3 + math.pi))
+            return frame.set_pixels(x, y2)
         
         return wave_frame
     
-    def create_fire_animation(self) -> Callable:
-        """Crée une animation de feu"""
-        import random
+    def create_fire_animation(self, seed=None) -> Callable:
+        """Crée une animation de feu (seed : tirages reproductibles)"""
+        rng = np.random.default_rng(seed)
         
-        def fire_frame(t: float) -> List[List[int]]:
+        def fire_frame(t: float) -> Frame:
             frame = self.create_empty_frame()
             
-            # Base du feu (toujours allumée)
-            for x in range(64):
-                if random.random() > 0.2:  # 80% de chance d'être allumé
-                    self.set_pixel(frame, x, 15, 1)
-                    self.set_pixel(frame, x, 14, 1)
-            
-            # Flammes qui montent
-            for x in range(64):
-                height = int(random.random() * 8 + 4)  # Hauteur aléatoire
-                for y in range(16 - height, 16):
-                    if random.random() > 0.3:  # 70% de chance d'être allumé
-                        self.set_pixel(frame, x, y, 1)
+            # Base du feu (toujours allumée) : 80% de chance par colonne
+            frame.fill_columns(np.where(rng.random(64) > 0.2, 2, 0))
             
+            # Flammes qui montent : hauteur aléatoire, 70% de chance par pixel
+            heights = (rng.random(64) * 8 + 4).astype(np.int64)
+            flames = Frame(64).fill_columns(heights)
+            sparks = np.packbits(rng.random((64, FRAME_HEIGHT)) > 0.3, axis=1, bitorder='little')
+            frame.words |= flames.words & sparks.view(frame.words.dtype).ravel()
             return frame
         
         return fire_frame
     
-    def create_rain_animation(self, speed: float = 2.0) -> Callable:
-        """Crée une animation de pluie"""
-        import random
-        
+    def create_rain_animation(self, speed: float = 2.0, seed=None) -> Callable:
+        """Crée une animation de pluie (seed : tirages reproductibles)"""
+        rnd = random.Random(seed)
         drops = []
         
-        def rain_frame(t: float) -> List[List[int]]:
+        def rain_frame(t: float) -> Frame:
             nonlocal drops
             frame = self.create_empty_frame()
             
             # Ajouter de nouvelles gouttes
-            if random.random() < 0.3:  # 30% de chance d'ajouter une goutte
+            if rnd.random() < 0.3:  # 30% de chance d'ajouter une goutte
                 drops.append({
-                    'x': random.randint(0, 63),
+                    'x': rnd.randint(0, 63),
                     'y': 0,
-                    'speed': random.uniform(0.5, 1.5) * speed
+                    'speed': rnd.uniform(0.5, 1.5) * speed
                 })
             
             # Mettre à jour et dessiner les gouttes
@@ -183,14 +206,13 @@ class AnimationController(ScrollingTextController):
         
         return rain_frame
     
-    def create_matrix_animation(self, speed: float = 1.0) -> Callable:
-        """Crée une animation style Matrix"""
-        import random
-        
-        columns = [{'pos': random.randint(-20, 0), 'speed': random.uniform(0.5, 2.0) * speed} 
+    def create_matrix_animation(self, speed: float = 1.0, seed=None) -> Callable:
+        """Crée une animation style Matrix (seed : tirages reproductibles)"""
+        rnd = random.Random(seed)
+        columns = [{'pos': rnd.randint(-20, 0), 'speed': rnd.uniform(0.5, 2.0) * speed} 
                   for _ in range(20)]
         
-        def matrix_frame(t: float) -> List[List[int]]:
+        def matrix_frame(t: float) -> Frame:
             nonlocal columns
             frame = self.create_empty_frame()
             
@@ -204,8 +226,8 @@ class AnimationController(ScrollingTextController):
                 
                 # Réinitialiser si la colonne est sortie
                 if col['pos'] > 20:
-                    col['pos'] = random.randint(-20, -5)
-                    col['speed'] = random.uniform(0.5, 2.0) * speed
+                    col['pos'] = rnd.randint(-20, -5)
+                    col['speed'] = rnd.uniform(0.5, 2.0) * speed
                 
                 # Dessiner la colonne
                 for j in range(8):  # Longueur de la traînée
@@ -220,21 +242,25 @@ class AnimationController(ScrollingTextController):
         return matrix_frame
     
     async def play_animation(self, animation_func: Callable, duration: float = 10.0):
-        """Joue une animation pendant une durée donnée"""
+        """Joue une animation pendant une durée donnée, cadencée à self.fps"""
         self.animation_running = True
-        start_time = time.time()
+        pacer = FramePacer(self.fps)
         frames_sent = 0
         frames_failed = 0
         
         try:
-            while self.animation_running and (time.time() - start_time) < duration:
-                current_time = time.time() - start_time
+            while self.animation_running and pacer.elapsed < duration:
+                # Échéance de la prochaine frame (les frames déjà périmées sont sautées)
+                index = await pacer.wait_next()
                 
                 # Générer la frame
-                frame = animation_func(current_time)
+                frame = animation_func(pacer.time_of(index))
                 
-                # Encoder et envoyer au masque
-                bitmap = self.encode_bitmap_for_mask(frame)
+                # Encoder et envoyer au masque dans la disposition du contrôleur
+                if isinstance(frame, Frame):
+                    bitmap = frame.to_wire(self.bitmap_layout)
+                else:
+                    bitmap = self.encode_bitmap_for_mask(frame)
                 color_array = self.encode_white_color_array_for_mask(len(frame))
                 
                 # Upload des données
@@ -242,6 +268,7 @@ class AnimationController(ScrollingTextController):
                 
                 if success:
                     frames_sent += 1
+                    pacer.frame_done()
                 else:
                     frames_failed += 1
                     # Si trop d'échecs, arrêter l'animation
@@ -249,16 +276,69 @@ class AnimationController(ScrollingTextController):
                         print("❌ Trop d'erreurs, arrêt de l'animation")
                         break
                 
-                # Attendre le prochain frame (30 FPS = 33ms)
-                await asyncio.sleep(self.frame_time)
-                
         except Exception as e:
             print(f"❌ Erreur animation: {e}")
         finally:
             self.animation_running = False
+            self.last_pacing = pacer.stats()
             if frames_sent > 0:
-                print(f"📊 Animation: {frames_sent} frames envoyées, {frames_failed} échecs")
+                print(f"📊 Animation: {frames_sent} frames envoyées, {frames_failed} échecs, {pacer.summary()}")
     
+    def compile_animation(self, name: str, duration: float = 10.0, fps: float = None,
+                          seed: int = 0, **params) -> AnimationClip:
+        """
+        Rend l'animation 'name' (voir ANIMATIONS) en clip, ou le relit du cache
+        La graine fixe les tirages aléatoires : le clip est identique d'une exécution à l'autre.
+        """
+        if name not in ANIMATIONS:
+            raise ValueError(f"Animation inconnue: {name} ({', '.join(ANIMATIONS)})")
+        factory = getattr(self, ANIMATIONS[name])
+        if name in ('fire', 'rain', 'matrix'):
+            params['seed'] = seed
+        return self.clip_cache.get_or_compile(name, lambda: factory(**params), duration,
+                                              fps or self.fps, params, layout=self.bitmap_layout)
+
+    async def play_clip(self, clip: AnimationClip, duration: float = None):
+        """Envoie les frames déjà encodées d'un clip, en boucle pendant duration (une fois par défaut)"""
+        self.animation_running = True
+        duration = clip.duration if duration is None else duration
+        pacer = FramePacer(clip.fps)
+        frames_sent = 0
+        frames_failed = 0
+
+        try:
+            while self.animation_running and pacer.elapsed < duration:
+                index = await pacer.wait_next()
+                bitmap, color_array = clip.frame(index % clip.frame_count)
+                if clip.layout != self.bitmap_layout:
+                    # Clip compilé pour une autre disposition
+                    bitmap = convert_layout(bitmap, clip.layout, self.bitmap_layout)
+
+                success = await self.upload_frame(bitmap, color_array)
+
+                if success:
+                    frames_sent += 1
+                    pacer.frame_done()
+                else:
+                    frames_failed += 1
+                    if frames_failed > 5:
+                        print("❌ Trop d'erreurs, arrêt de l'animation")
+                        break
+
+        except Exception as e:
+            print(f"❌ Erreur animation: {e}")
+        finally:
+            self.animation_running = False
+            self.last_pacing = pacer.stats()
+            if frames_sent > 0:
+                print(f"📊 Clip {clip.name}: {frames_sent} frames envoyées, {frames_failed} échecs, "
+                      f"{pacer.summary()}")
+
+    async def play_named_animation(self, name: str, duration: float = 10.0, seed: int = 0, **params):
+        """Compile (ou relit) l'animation puis joue le clip"""
+        clip = self.compile_animation(name, duration, seed=seed, **params)
+        await self.play_clip(clip, duration)
+
     def stop_animation(self):
         """Arrête l'animation en cours"""
         self.animation_running = False
@@ -277,11 +357,10 @@ class AnimationController(ScrollingTextController):
             # Upload des données
             await self.init_upload(bitmap, color_array)
             
-            # Envoyer tous les paquets avec des petites pauses
+            # Envoyer tous les paquets, espacés selon le réglage du lien
             while self.current_upload['bytes_sent'] < self.current_upload['total_len']:
                 await self.upload_part()
-                # Petite pause pour éviter la surcharge
-                await asyncio.sleep(0.01)  # 10ms entre les paquets
+                await asyncio.sleep(self.link.packet_delay)
                 
             # Finaliser
             await self.finish_upload()
@@ -292,6 +371,7 @@ class AnimationController(ScrollingTextController):
             return True
             
         except Exception as e:
+            self.link.record_error()
             if "disconnected" in str(e).lower():
                 print(f"⚠️ Déconnexion détectée lors de l'animation")
                 return False
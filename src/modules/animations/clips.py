@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Module Animations - Clips précompilés
+=====================================
+
+Une animation est rendue une fois pour toutes hors de la boucle temps réel :
+chaque frame est encodée (bitmap + tableau de couleurs) et le clip complet
+est écrit dans un fichier de cache, puis relu en mémoire mappée (np.memmap).
+La lecture ne fait plus qu'envoyer des bytes déjà prêts.
+
+Le fichier est nommé d'après l'animation et une empreinte de ses paramètres
+(fps, durée, graine aléatoire, disposition du bitmap...) : mêmes paramètres, même
+clip, même lecture.
+
+Format (petit-boutiste) :
+  en-tête  : magic 'MCLP', version, disposition, frames, largeur, fps, empreinte (16 bytes)
+  bitmaps  : frames x largeur x 2 bytes, tels qu'envoyés au masque dans la disposition
+             de l'en-tête (LAYOUT_LSB ou LAYOUT_MSB, voir utils/bitmap.py)
+  couleurs : frames x largeur x 3 bytes RGB
+"""
+
+import hashlib
+import json
+import os
+import struct
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from ..utils.bitmap import LAYOUT_LSB, LAYOUT_MSB
+from ..utils.frame import as_frame, WIRE_DTYPE
+
+CLIP_MAGIC = b"MCLP"
+CLIP_VERSION = 2
+CLIP_HEADER = struct.Struct('<4sHHIIf16s')
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../working/clips')
+
+# Disposition du bitmap -> code de l'en-tête
+LAYOUT_CODES = {LAYOUT_LSB: 0, LAYOUT_MSB: 1}
+CODE_LAYOUTS = {code: layout for layout, code in LAYOUT_CODES.items()}
+
+
+def clip_key(name: str, params: Dict) -> bytes:
+    """Empreinte (16 bytes) d'une animation et de ses paramètres"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{CLIP_VERSION}:{name}:".encode())
+    digest.update(json.dumps(params, sort_keys=True, default=repr).encode())
+    return digest.digest()
+
+
+class AnimationClip:
+    """
+    Suite de frames encodées, prêtes à envoyer
+
+    bitmaps : tableau (frames, largeur) '<u2', une ligne = bitmap d'une frame
+    colors  : tableau (frames, largeur * 3) uint8, une ligne = couleurs d'une frame
+    layout  : disposition des bytes de bitmaps (ceux envoyés au masque)
+    Les deux peuvent être des vues d'un np.memmap (clip relu depuis le cache).
+    """
+
+    def __init__(self, name: str, fps: float, bitmaps: np.ndarray, colors: np.ndarray,
+                 key: bytes = b"", path: Optional[str] = None, layout: str = LAYOUT_LSB):
+        self.name = name
+        self.fps = fps
+        self.bitmaps = bitmaps
+        self.colors = colors
+        self.key = key
+        self.path = path
+        self.layout = layout
+
+    @property
+    def frame_count(self) -> int:
+        return len(self.bitmaps)
+
+    @property
+    def width(self) -> int:
+        return self.bitmaps.shape[1] if self.bitmaps.ndim == 2 else 0
+
+    @property
+    def duration(self) -> float:
+        return self.frame_count / self.fps if self.fps else 0.0
+
+    @property
+    def mapped(self) -> bool:
+        return self.path is not None
+
+    def __len__(self):
+        return self.frame_count
+
+    def frame(self, index: int):
+        """(bitmap, couleurs) de la frame index, en vues sur le clip (aucune copie)"""
+        return memoryview(self.bitmaps[index]).cast('B'), memoryview(self.colors[index])
+
+    def __iter__(self):
+        for index in range(self.frame_count):
+            yield self.frame(index)
+
+    def __repr__(self):
+        return f"AnimationClip({self.name!r}, {self.frame_count} frames, {self.fps} fps)"
+
+
+def compile_clip(name: str, frame_func: Callable, duration: float, fps: float,
+                 color=(0xFF, 0xFF, 0xFF), key: bytes = b"", layout: str = LAYOUT_LSB) -> AnimationClip:
+    """
+    Rend frame_func(t) pour t = 0, 1/fps, 2/fps... pendant duration secondes
+    Les frames (Frame ou List[List[int]]) doivent toutes avoir la même largeur.
+    Les bitmaps sont stockés dans la disposition layout, prêts à envoyer.
+    """
+    count = max(1, int(round(duration * fps)))
+    bitmaps = None
+    for index in range(count):
+        words = np.frombuffer(as_frame(frame_func(index / fps)).to_wire(layout), dtype=WIRE_DTYPE)
+        if bitmaps is None:
+            bitmaps = np.empty((count, len(words)), dtype=WIRE_DTYPE)
+        elif len(words) != bitmaps.shape[1]:
+            raise ValueError(f"Frame {index} de largeur {len(words)}, {bitmaps.shape[1]} attendues")
+        bitmaps[index] = words
+    colors = np.tile(np.asarray(color, dtype=np.uint8), (count, bitmaps.shape[1]))
+    return AnimationClip(name, fps, bitmaps, colors, key, layout=layout)
+
+
+class ClipCache:
+    """Clips compilés sur disque, relus en mémoire mappée"""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR):
+        self.cache_dir = os.path.normpath(cache_dir)
+        self.hits = 0
+        self.misses = 0
+
+    def path_for(self, name: str, key: bytes) -> str:
+        return os.path.join(self.cache_dir, f"{name}-{key.hex()}.clip")
+
+    def load(self, name: str, key: bytes) -> Optional[AnimationClip]:
+        """Clip en cache, ou None s'il est absent, tronqué ou d'une autre version"""
+        path = self.path_for(name, key)
+        if not os.path.exists(path):
+            return None
+        try:
+            data = np.memmap(path, dtype=np.uint8, mode='r')
+        except (OSError, ValueError):
+            return None
+        if len(data) < CLIP_HEADER.size:
+            return None
+        header = CLIP_HEADER.unpack(bytes(data[:CLIP_HEADER.size]))
+        magic, version, layout_code, count, width, fps, stored_key = header
+        bitmap_size = count * width * 2
+        if (magic != CLIP_MAGIC or version != CLIP_VERSION or stored_key != key
+                or layout_code not in CODE_LAYOUTS
+                or len(data) != CLIP_HEADER.size + bitmap_size + count * width * 3):
+            print(f"⚠️ Clip en cache invalide, recompilation: {path}")
+            return None
+        start = CLIP_HEADER.size
+        bitmaps = data[start:start + bitmap_size].view(WIRE_DTYPE).reshape(count, width)
+        colors = data[start + bitmap_size:].reshape(count, width * 3)
+        return AnimationClip(name, fps, bitmaps, colors, key, path, CODE_LAYOUTS[layout_code])
+
+    def store(self, clip: AnimationClip) -> AnimationClip:
+        """Écrit le clip (fichier temporaire puis remplacement) et le relit en mémoire mappée"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path_for(clip.name, clip.key)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(CLIP_HEADER.pack(CLIP_MAGIC, CLIP_VERSION, LAYOUT_CODES[clip.layout], clip.frame_count,
+                                     clip.width, clip.fps, clip.key))
+            f.write(np.ascontiguousarray(clip.bitmaps, dtype=WIRE_DTYPE).tobytes())
+            f.write(np.ascontiguousarray(clip.colors, dtype=np.uint8).tobytes())
+        os.replace(tmp_path, path)
+        return self.load(clip.name, clip.key)
+
+    def get_or_compile(self, name: str, factory: Callable[[], Callable], duration: float, fps: float,
+                       params: Optional[Dict] = None, color=(0xFF, 0xFF, 0xFF),
+                       layout: str = LAYOUT_LSB) -> AnimationClip:
+        """
+        Clip en cache pour ces paramètres, sinon compilé puis mis en cache
+        factory() crée une animation neuve (fonction t -> frame) : l'état interne
+        d'une animation (gouttes, colonnes...) repart de zéro à chaque compilation.
+        La disposition fait partie de l'empreinte : un clip LSB n'est jamais relu pour un masque MSB.
+        """
+        key = clip_key(name, {'duration': duration, 'fps': fps, 'color': list(color), 'layout': layout,
+                              **(params or {})})
+        clip = self.load(name, key)
+        if clip is not None:
+            self.hits += 1
+            return clip
+        self.misses += 1
+        clip = compile_clip(name, factory(), duration, fps, color, key, layout)
+        try:
+            return self.store(clip)
+        except OSError as e:
+            # Cache en lecture seule ou disque plein : le clip reste jouable depuis la mémoire
+            print(f"⚠️ Clip non mis en cache ({e})")
+            return clip
+
+    def clear(self):
+        """Supprime les clips en cache"""
+        if not os.path.isdir(self.cache_dir):
+            return
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith('.clip'):
+                os.remove(os.path.join(self.cache_dir, filename))
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Module Animations - Animations de couleur (commandes FC)
+=======================================================
+
+Une animation de couleur est une courbe par images clés HSV, précalculée en
+table RGB : aucun bitmap à envoyer, une commande FC par changement de couleur.
+
+La lecture échantillonne la courbe à l'instant présent et soumet la couleur à
+la file de commandes (core/commands.py) :
+- une écriture à la fois ; tant qu'elle est en vol, les couleurs suivantes se
+  remplacent (seule la plus récente part, les intermédiaires sont abandonnées)
+- la cadence suit la durée mesurée des écritures (WriteRate) : aussi vite que
+  le lien le permet, sans accumuler de retard. Les écritures mesurées doivent
+  attendre l'acquittement du masque (response=True) ; une écriture sans réponse
+  se termine aussitôt et laisserait la cadence bloquée à MIN_INTERVAL
+"""
+
+import asyncio
+import bisect
+import math
+import random
+import time
+from typing import Callable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..utils.image_utils import hsv_to_rgb
+
+# Résolution de la table précalculée (échantillons par seconde)
+BAKE_RATE = 100
+
+# Bornes de la cadence d'envoi (secondes entre deux couleurs)
+MIN_INTERVAL = 1 / 50
+MAX_INTERVAL = 0.5
+# Lissage exponentiel des durées d'écriture
+RATE_ALPHA = 0.2
+
+Keyframe = Tuple[float, Tuple[float, float, float]]
+
+
+def fc_command(r: int, g: int, b: int) -> bytearray:
+    """Commande FC (couleur de premier plan) : [6] 'FC' [activé] r g b"""
+    cmd = bytearray()
+    cmd.append(6)
+    cmd.extend(b"FC")
+    cmd.append(1)  # Enable
+    cmd.append(r)
+    cmd.append(g)
+    cmd.append(b)
+    return cmd
+
+
+class ColorTimeline:
+    """
+    Courbe de couleur : images clés (t, (teinte, saturation, valeur)), interpolées en HSV
+
+    La teinte est en degrés et peut dépasser 360 pour tourner dans un sens donné
+    ((0, ...) -> (360, ...) fait un tour complet du cercle chromatique).
+    loop : la courbe recommence après sa dernière image clé
+    """
+
+    def __init__(self, keyframes: Sequence[Keyframe], loop: bool = True, bake_rate: int = BAKE_RATE):
+        if not keyframes:
+            raise ValueError("Au moins une image clé est nécessaire")
+        self.keyframes = sorted((float(t), tuple(hsv)) for t, hsv in keyframes)
+        self.times = [t for t, _ in self.keyframes]
+        self.duration = self.times[-1]
+        self.loop = loop
+        self.bake_rate = bake_rate
+        self.table = self._bake()
+
+    def hsv_at(self, t: float) -> Tuple[float, float, float]:
+        """Couleur HSV interpolée linéairement entre les deux images clés qui encadrent t"""
+        index = bisect.bisect_right(self.times, t)
+        if index == 0:
+            return self.keyframes[0][1]
+        if index == len(self.keyframes):
+            return self.keyframes[-1][1]
+        t0, hsv0 = self.keyframes[index - 1]
+        t1, hsv1 = self.keyframes[index]
+        f = (t - t0) / (t1 - t0)
+        return tuple(a + (b - a) * f for a, b in zip(hsv0, hsv1))
+
+    def _bake(self) -> np.ndarray:
+        """Table RGB (n, 3) échantillonnée à bake_rate par seconde"""
+        count = max(1, int(math.ceil(self.duration * self.bake_rate)) + 1)
+        table = np.empty((count, 3), dtype=np.uint8)
+        for i in range(count):
+            h, s, v = self.hsv_at(i / self.bake_rate)
+            table[i] = hsv_to_rgb(h, min(1.0, max(0.0, s)), min(1.0, max(0.0, v)))
+        return table
+
+    def color_at(self, t: float) -> Tuple[int, int, int]:
+        """Couleur RGB à l'instant t, lue dans la table"""
+        if self.loop and self.duration > 0:
+            t = t % self.duration
+        index = min(len(self.table) - 1, max(0, int(round(t * self.bake_rate))))
+        r, g, b = self.table[index]
+        return int(r), int(g), int(b)
+
+
+def _sampled(func: Callable[[float], Tuple[float, float, float]], duration: float, step: float):
+    """Images clés échantillonnées sur une fonction t -> (h, s, v)"""
+    count = int(round(duration / step))
+    return [(i * step, func(i * step)) for i in range(count + 1)]
+
+
+def color_preset(name: str, seed: int = 0) -> Optional[ColorTimeline]:
+    """Animations de couleur prédéfinies (pulse, wave, fire, rain, matrix), None si inconnue"""
+    rnd = random.Random(seed)
+    if name == "pulse":
+        # Blanc qui pulse, période de 2 secondes
+        return ColorTimeline(_sampled(lambda t: (0.0, 0.0, (math.sin(t * math.pi) + 1) / 2), 2.0, 0.125))
+    if name == "wave":
+        # Tour du cercle chromatique à 50°/s
+        return ColorTimeline([(0.0, (0.0, 1.0, 1.0)), (7.2, (360.0, 1.0, 1.0))])
+    if name == "fire":
+        # Rouge / orange vacillant
+        keys = [(i * 0.1, (rnd.uniform(8, 40), 1.0, rnd.uniform(0.75, 1.0))) for i in range(30)]
+        return ColorTimeline(keys + [(3.0, keys[0][1])])
+    if name == "rain":
+        # Bleu dont l'intensité ondule
+        return ColorTimeline(_sampled(lambda t: (225.0, 1.0, (math.sin(t * 5) + 1) / 2), 2 * math.pi / 5, 0.05))
+    if name == "matrix":
+        # Scintillement vert
+        keys = [(i * 0.1, (120.0, 1.0, rnd.uniform(0.6, 1.0))) for i in range(30)]
+        return ColorTimeline(keys + [(3.0, keys[0][1])])
+    return None
+
+
+class WriteRate:
+    """Cadence d'envoi soutenable, déduite de la durée mesurée des écritures"""
+
+    def __init__(self, min_interval: float = MIN_INTERVAL, max_interval: float = MAX_INTERVAL,
+                 alpha: float = RATE_ALPHA):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.alpha = alpha
+        self.write_time = None
+        self.samples = 0
+
+    def record(self, seconds: float):
+        """Durée d'une écriture terminée (avec réponse : jusqu'à l'acquittement du masque)"""
+        self.samples += 1
+        if self.write_time is None:
+            self.write_time = seconds
+        else:
+            self.write_time = self.alpha * seconds + (1 - self.alpha) * self.write_time
+
+    @property
+    def interval(self) -> float:
+        if self.write_time is None:
+            return self.min_interval
+        return min(self.max_interval, max(self.min_interval, self.write_time))
+
+
+class ColorTimelinePlayer:
+    """
+    Joue une ColorTimeline par commandes FC
+
+    queue : CommandQueue du contrôleur (les FC en attente se remplacent)
+    rate  : WriteRate alimenté par les écritures de ce contrôleur
+    """
+
+    def __init__(self, queue, rate: WriteRate, clock=time.monotonic, sleep=asyncio.sleep):
+        self.queue = queue
+        self.rate = rate
+        self._clock = clock
+        self._sleep = sleep
+        self.ticks = 0
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self.elapsed = 0.0
+        self._futures = set()
+
+    async def play(self, timeline: ColorTimeline, duration: float, running: Callable[[], bool] = lambda: True):
+        """Envoie la couleur de la courbe à la cadence mesurée pendant duration secondes"""
+        start = self._clock()
+        sent_before, coalesced_before = self.queue.sent, self.queue.coalesced
+        flush = None
+        last = None
+        try:
+            while running() and self._clock() - start < duration:
+                color = timeline.color_at(self._clock() - start)
+                self.ticks += 1
+                if color != last:
+                    last = color
+                    self.submitted += 1
+                    self._track(self.queue.submit(fc_command(*color)))
+                    if flush is None or flush.done():
+                        # Aucune écriture en vol : on lance la suivante, sinon la couleur attend (et se fait remplacer)
+                        flush = asyncio.create_task(self.queue.flush())
+                if self.errors > 5:
+                    print("❌ Trop d'erreurs d'écriture, arrêt de l'animation")
+                    break
+                await self._sleep(self.rate.interval)
+        finally:
+            if flush is not None:
+                await flush
+            await self.queue.flush()
+            self.elapsed = self._clock() - start
+            self.written += self.queue.sent - sent_before
+            self.dropped += self.queue.coalesced - coalesced_before
+
+    def _track(self, future):
+        if future in self._futures:
+            return
+        self._futures.add(future)
+        future.add_done_callback(self._on_written)
+
+    def _on_written(self, future):
+        self._futures.discard(future)
+        if not future.cancelled() and future.exception() is not None:
+            self.errors += 1
+
+    def stats(self):
+        return {
+            'ticks': self.ticks,
+            'submitted': self.submitted,
+            'written': self.written,
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'effective_rate': round(self.written / self.elapsed, 2) if self.elapsed > 0 else 0.0,
+            'interval_ms': round(self.rate.interval * 1000, 2),
+        }
+
+    def summary(self) -> str:
+        rate = self.written / self.elapsed if self.elapsed > 0 else 0.0
+        return (f"{self.written} couleurs envoyées ({rate:.1f}/s), {self.dropped} intermédiaires abandonnées, "
+                f"cadence {self.rate.interval * 1000:.0f} ms")
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Module Animations - Cadence des frames
+======================================
+
+La frame i est due à début + i / fps sur l'horloge monotone, quel que soit le
+temps pris par l'upload de la précédente : pas de dérive, pas de sleep fixe
+ajouté après chaque envoi.
+
+Quand le lien BLE prend du retard d'une frame ou plus, les frames périmées ne
+sont pas mises en file : la boucle saute directement à la frame due maintenant
+(comptée dans 'dropped').
+"""
+
+import asyncio
+import math
+import time
+
+
+class FramePacer:
+    """
+    Cadence de frames à fps images par seconde
+
+    Utilisation :
+        pacer = FramePacer(10)
+        while pacer.elapsed < duration:
+            index = await pacer.wait_next()   # frame à produire (les périmées sont sautées)
+            ... générer / envoyer la frame index (temps index / fps) ...
+            pacer.frame_done()
+        print(pacer.summary())
+    """
+
+    def __init__(self, fps: float, clock=time.monotonic, sleep=asyncio.sleep):
+        if fps <= 0:
+            raise ValueError(f"fps doit être positif ({fps})")
+        self.fps = fps
+        self.frame_time = 1.0 / fps
+        self._clock = clock
+        self._sleep = sleep
+        self.start = None
+        self._next = 0
+
+        self.frames = 0        # frames envoyées (frame_done)
+        self.dropped = 0       # frames sautées car déjà périmées
+        self._starts = 0
+        self._last_start = None
+        self._interval_count = 0
+        self._interval_sum = 0.0
+        self._interval_sq_sum = 0.0
+        self._late_sum = 0.0
+        self.late_max = 0.0
+
+    @property
+    def elapsed(self) -> float:
+        if self.start is None:
+            return 0.0
+        return self._clock() - self.start
+
+    def time_of(self, index: int) -> float:
+        """Temps d'animation de la frame index (secondes depuis le début)"""
+        return index * self.frame_time
+
+    async def wait_next(self) -> int:
+        """Attend l'échéance de la prochaine frame et retourne son index"""
+        now = self._clock()
+        if self.start is None:
+            self.start = now
+        index = self._next
+        due = self.start + index * self.frame_time
+        if now >= due + self.frame_time:
+            # En retard d'au moins une frame : on passe directement à celle due maintenant
+            current = int((now - self.start) / self.frame_time)
+            self.dropped += current - index
+            index = current
+            due = self.start + index * self.frame_time
+        elif now < due:
+            await self._sleep(due - now)
+            now = self._clock()
+
+        late = max(0.0, now - due)
+        self._starts += 1
+        self._late_sum += late
+        self.late_max = max(self.late_max, late)
+        if self._last_start is not None:
+            interval = now - self._last_start
+            self._interval_count += 1
+            self._interval_sum += interval
+            self._interval_sq_sum += interval * interval
+        self._last_start = now
+        self._next = index + 1
+        return index
+
+    def frame_done(self):
+        """La frame rendue par wait_next() est partie"""
+        self.frames += 1
+
+    @property
+    def effective_fps(self) -> float:
+        elapsed = self.elapsed
+        return self.frames / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def jitter(self) -> float:
+        """Écart-type des intervalles entre deux débuts de frame (secondes)"""
+        n = self._interval_count
+        if n < 2:
+            return 0.0
+        mean = self._interval_sum / n
+        return math.sqrt(max(0.0, self._interval_sq_sum / n - mean * mean))
+
+    def stats(self):
+        return {
+            'target_fps': self.fps,
+            'effective_fps': round(self.effective_fps, 2),
+            'frames': self.frames,
+            'dropped': self.dropped,
+            'jitter_ms': round(self.jitter * 1000, 2),
+            'late_avg_ms': round(self._late_sum / self._starts * 1000, 2) if self._starts else 0.0,
+            'late_max_ms': round(self.late_max * 1000, 2),
+        }
+
+    def summary(self) -> str:
+        return (f"{self.effective_fps:.1f}/{self.fps:g} FPS, {self.dropped} frames sautées, "
+                f"gigue {self.jitter * 1000:.1f} ms")
@@ -9,14 +9,16 @@ Gère la connexion, le chiffrement et les protocoles de base.
 
 import asyncio
 import time
-from bleak import BleakClient, BleakScanner
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.backends import default_backend
 import struct
+from .crypto import MaskCipher, ENCRYPTION_KEY
+from .notifications import NotificationDispatcher
+from .link import LinkTuner, read_negotiated_mtu
+from .connection import MaskConnector
+from .commands import CommandQueue
+from ..utils.bitmap import LAYOUT_LSB, encode_bitmap
 
 # Configuration BLE
 DEVICE_NAME = "MASK"
-ENCRYPTION_KEY = bytes.fromhex("32672f7974ad43451d9c6c894a0e8764")
 
 # UUIDs des caractéristiques
 COMMAND_UUID = "d44bc439-abfd-45a2-b575-925416129600"
@@ -37,28 +39,40 @@ class BaseMaskController:
     Gère la connexion BLE, le chiffrement et les protocoles de base.
     """
     
-    def __init__(self):
+    def __init__(self, client=None):
+        # client : remplaçant de BleakClient (ex : core.simulator.SimulatedMaskClient)
+        self.injected_client = client
         self.client = None
         self.upload_running = False
         self.current_upload = {}
         self.notification_response = None
+        self.cipher = MaskCipher()
+        self.notifications = NotificationDispatcher()
+        self.link = LinkTuner()
+        self.connector = MaskConnector(DEVICE_NAME, required_uuids=(COMMAND_UUID, UPLOAD_UUID, NOTIFY_UUID))
+        self.command_queue = CommandQueue(self._write_command)
+        # Disposition des bits des colonnes envoyées (voir utils/bitmap.py)
+        self.bitmap_layout = LAYOUT_LSB
         
     def encrypt_aes128(self, data):
         """Chiffrement AES-128 ECB"""
         if len(data) != 16:
             raise ValueError("Data must be exactly 16 bytes")
             
-        cipher = Cipher(algorithms.AES(ENCRYPTION_KEY), modes.ECB(), backend=default_backend())
-        encryptor = cipher.encryptor()
-        return encryptor.update(data) + encryptor.finalize()
+        return self.cipher.encrypt(data)
     
     def notification_handler(self, sender, data):
         """Gestionnaire des notifications BLE"""
         try:
             decrypted = self.decrypt_aes128(data)
-            response = decrypted.decode('utf-8', errors='ignore').rstrip('\x00')
+            str_len = decrypted[0]
+            if 0 < str_len < len(decrypted):
+                response = decrypted[1:str_len + 1].decode('ascii', errors='ignore')
+            else:
+                response = decrypted.decode('utf-8', errors='ignore').rstrip('\x00')
             print(f"📨 Réponse reçue: {response}")
             self.notification_response = response
+            self.notifications.dispatch(response, decrypted)
         except Exception as e:
             print(f"❌ Erreur déchiffrement notification: {e}")
     
@@ -67,32 +81,21 @@ class BaseMaskController:
         if len(data) != 16:
             raise ValueError("Encrypted data must be exactly 16 bytes")
             
-        cipher = Cipher(algorithms.AES(ENCRYPTION_KEY), modes.ECB(), backend=default_backend())
-        decryptor = cipher.decryptor()
-        return decryptor.update(data) + decryptor.finalize()
+        return self.cipher.decrypt(data)
     
     async def connect(self):
         """Connexion au masque LED"""
         try:
-            print(f"Recherche du masque...")
-            devices = await BleakScanner.discover()
-            
-            target_device = None
-            for device in devices:
-                if device.name and DEVICE_NAME in device.name:
-                    target_device = device
-                    break
-            
-            if not target_device:
-                raise Exception(f"Aucun appareil avec '{DEVICE_NAME}' trouvé")
-            
-            print(f"Connexion à {target_device.name}")
-            self.client = BleakClient(target_device.address)
-            await self.client.connect()
+            # Client injecté, sinon adresse en cache, sinon scan arrêté au premier masque
+            self.client = await self.connector.connect(self.injected_client)
+            self.cipher = MaskCipher()
             
             # S'abonner aux notifications
             await self.client.start_notify(NOTIFY_UUID, self.notification_handler)
             
+            # Taille des paquets selon le MTU négocié
+            self.link.set_mtu(await read_negotiated_mtu(self.client))
+            
             print("Connecté avec succès!")
             return True
             
@@ -111,11 +114,20 @@ class BaseMaskController:
         if not self.client or not self.client.is_connected:
             raise Exception("Pas connecté au masque")
         
+        # File d'écriture : les réglages en attente sont fusionnés (dernière valeur gagnante)
+        await self.command_queue.send(command_data)
+
+    async def _write_command(self, command_data):
+        """Écriture chiffrée d'une commande, appelée par la file"""
+        if not self.client or not self.client.is_connected:
+            raise Exception("Pas connecté au masque")
+
         # Padding à 16 bytes
         padded_data = command_data + b'\x00' * (16 - len(command_data))
         encrypted_data = self.encrypt_aes128(padded_data)
         
         await self.client.write_gatt_char(COMMAND_UUID, encrypted_data)
+        self.connector.command_sent()
     
     async def send_upload_data(self, data):
         """Envoie des données via le canal d'upload"""
@@ -125,16 +137,11 @@ class BaseMaskController:
         await self.client.write_gatt_char(UPLOAD_UUID, data)
     
     async def wait_for_response(self, expected_response, timeout=5.0):
-        """Attend une réponse spécifique"""
-        start_time = time.time()
-        self.notification_response = None
-        
-        while time.time() - start_time < timeout:
-            if self.notification_response and expected_response in self.notification_response:
-                return self.notification_response
-            await asyncio.sleep(0.1)
-            
-        raise TimeoutError(f"Timeout en attente de {expected_response}")
+        """Attend une réponse spécifique (réveil immédiat à la notification)"""
+        try:
+            return await self.notifications.wait_for(expected_response, timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Timeout en attente de {expected_response}") from None
     
     async def set_brightness(self, brightness):
         """Configure la luminosité (0-100)"""
@@ -190,23 +197,4 @@ class BaseMaskController:
     
     def encode_bitmap_for_mask(self, pixel_map):
         """Encode une carte de pixels en bitmap pour le masque"""
-        results = bytearray()
-        
-        for x in range(len(pixel_map)):
-            column = pixel_map[x]
-            
-            # Encoder chaque colonne en 2 bytes (16 bits pour 16 pixels)
-            byte1 = 0
-            byte2 = 0
-            
-            for y in range(8):
-                if column[y] == 1:
-                    byte1 |= (1 << y)
-            
-            for y in range(8, 16):
-                if y < len(column) and column[y] == 1:
-                    byte2 |= (1 << (y - 8))
-            
-            results.extend([byte1, byte2])
-        
-        return bytes(results)
+        return encode_bitmap(pixel_map, self.bitmap_layout)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Module Core - File d'écriture des commandes
+===========================================
+
+Une seule écriture à la fois sur COMMAND_UUID. Les commandes d'état idempotentes en attente
+(LIGHT, MODE, SPEED, FC, BG, ANIM/PLAY) sont fusionnées : seule la dernière valeur de chaque
+clé est écrite. Toute autre commande (DATS, DATCP, SAVE01...) sert de barrière : les commandes
+d'état en attente partent avant elle, l'ordre des séquences d'upload est conservé.
+"""
+
+import asyncio
+
+# Mot-clé -> clé de fusion (ANIM et PLAY choisissent tous deux ce qui est affiché)
+COALESCED_COMMANDS = {
+    b"LIGHT": "LIGHT",
+    b"MODE": "MODE",
+    b"SPEED": "SPEED",
+    b"FC": "FC",
+    b"BG": "BG",
+    b"ANIM": "display",
+    b"PLAY": "display",
+}
+
+
+def coalesce_key(data):
+    """Clé de fusion d'une commande en clair ([longueur] MOT-CLÉ args), None si elle ne se fusionne pas"""
+    for keyword, key in COALESCED_COMMANDS.items():
+        if bytes(data[1:1 + len(keyword)]) == keyword:
+            return key
+    return None
+
+
+class CommandQueue:
+    """
+    Sérialise les écritures de commandes et fusionne les commandes d'état
+
+    write : coroutine qui chiffre et écrit une commande, sans pause
+    pause : callable retournant la pause après une commande (pacing.command_delay) ;
+            un lot de commandes d'état n'en paie qu'une
+
+    Pendant qu'une écriture est en vol, les nouvelles valeurs d'une même clé se remplacent :
+    un curseur déplacé rapidement ne coûte qu'une écriture par aller-retour BLE.
+    Une valeur n'est jamais fusionnée par-dessus une barrière en attente.
+    """
+
+    def __init__(self, write, pause=lambda: 0.0):
+        self._write = write
+        self._pause = pause
+        self._pending = []  # [commande, future, clé] dans l'ordre de soumission
+        self._open = {}     # clé -> entrée encore fusionnable (aucune barrière après elle)
+        self._lock = asyncio.Lock()
+
+        self.sent = 0
+        self.coalesced = 0
+        self.batches = 0
+
+    def submit(self, data):
+        """
+        Met une commande en attente sans l'écrire (voir flush)
+        Retourne un future résolu quand cette valeur, ou une plus récente de la même clé, est écrite
+        """
+        key = coalesce_key(data)
+        entry = self._open.get(key) if key is not None else None
+        if entry is not None:
+            entry[0] = bytes(data)
+            self.coalesced += 1
+            return entry[1]
+
+        entry = [bytes(data), asyncio.get_running_loop().create_future(), key]
+        self._pending.append(entry)
+        if key is None:
+            # Barrière : les valeurs déjà en attente partent avant elle, telles quelles
+            self._open.clear()
+        else:
+            self._open[key] = entry
+        return entry[1]
+
+    async def send(self, data):
+        """Écrit une commande ; retourne quand elle (ou la valeur qui l'a remplacée) est partie"""
+        future = self.submit(data)
+        await self.flush()
+        # Future partagé entre les appelants fusionnés : une annulation ne doit pas le toucher
+        await asyncio.shield(future)
+
+    async def flush(self):
+        """Écrit les commandes en attente, dans l'ordre"""
+        async with self._lock:
+            await self._flush_locked()
+
+    async def _flush_locked(self):
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        self._open.clear()
+        settle = False
+        for data, future, key in batch:
+            try:
+                await self._write(data)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            self.sent += 1
+            if not future.done():
+                future.set_result(None)
+            if key is None:
+                await self._sleep_pause()
+                settle = False
+            else:
+                settle = True
+        self.batches += 1
+        if settle:
+            await self._sleep_pause()
+
+    async def _sleep_pause(self):
+        delay = self._pause()
+        if delay:
+            await asyncio.sleep(delay)
+
+    def stats(self):
+        submitted = self.sent + self.coalesced
+        return {
+            'sent': self.sent,
+            'coalesced': self.coalesced,
+            'batches': self.batches,
+            'pending': len(self._pending),
+            'saved_ratio': round(self.coalesced / submitted, 3) if submitted else 0.0,
+        }
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Module Core - Connexion rapide au masque
+=======================================
+
+Adresse et table GATT du dernier masque gardées sur disque : connexion directe d'abord,
+scan filtré par nom (arrêté au premier masque trouvé) seulement si elle échoue.
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+
+from bleak import BleakClient, BleakScanner
+
+# À côté des configurations (dossier working, cf. ConfigManager)
+DEFAULT_DEVICE_CACHE = os.path.normpath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../working', "mask_device.json"))
+
+# Connexion directe à l'adresse connue, puis scan en dernier recours (secondes)
+DIRECT_CONNECT_TIMEOUT = 5.0
+SCAN_TIMEOUT = 10.0
+
+
+class DeviceCache:
+    """Dernier masque connecté : {address, name, services, handles, updated}"""
+
+    def __init__(self, path=DEFAULT_DEVICE_CACHE):
+        self.path = path
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            return entry if entry.get('address') else None
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Cache du masque illisible ({e}), scan complet")
+            return None
+
+    def save(self, address, name=None, services=None, handles=None):
+        entry = {
+            'address': address,
+            'name': name,
+            'services': services or [],
+            'handles': handles or {},
+            'updated': datetime.now().isoformat(timespec='seconds'),
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def forget(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def gatt_layout(client):
+    """(services, {uuid caractéristique: handle}) du client connecté"""
+    try:
+        services = list(client.services)
+    except Exception:
+        return [], {}
+    handles = {}
+    for service in services:
+        for characteristic in service.characteristics:
+            handles[characteristic.uuid] = characteristic.handle
+    return [service.uuid for service in services], handles
+
+
+class MaskConnector:
+    """
+    Ouvre un BleakClient connecté au masque et mesure le temps jusqu'à la première commande
+
+    Ordre d'essai : client injecté (tests, simulateur), adresse en cache (sans scan,
+    découverte limitée aux services connus), puis scan arrêté au premier nom contenant
+    name_filter. Le cache est mis à jour après chaque connexion réussie.
+    required_uuids : caractéristiques indispensables ; si la connexion directe ne les
+    trouve pas (cache périmé), le cache est oublié et on repasse par le scan.
+    """
+
+    def __init__(self, name_filter, required_uuids=(), cache_path=DEFAULT_DEVICE_CACHE,
+                 client_class=BleakClient, direct_timeout=DIRECT_CONNECT_TIMEOUT, scan_timeout=SCAN_TIMEOUT):
+        self.name_filter = name_filter
+        self.required_uuids = tuple(required_uuids)
+        self.cache = DeviceCache(cache_path) if cache_path else None
+        self.client_class = client_class
+        self.direct_timeout = direct_timeout
+        self.scan_timeout = scan_timeout
+
+        self._started = None
+        self.method = None
+        self.connect_time = None
+        self.first_command_time = None
+        self.connects = 0
+        self.direct_connects = 0
+        self.scans = 0
+        self.failures = 0
+
+    async def connect(self, client=None, **client_kwargs):
+        """Retourne un client connecté (RuntimeError si aucun masque)"""
+        self._started = time.monotonic()
+        self.first_command_time = None
+        try:
+            if client is not None:
+                await client.connect()
+                method = 'injected'
+            else:
+                client, method = await self._connect_cached(**client_kwargs)
+                if client is None:
+                    client = await self._connect_scan(**client_kwargs)
+                    method = 'scan'
+        except Exception:
+            self.failures += 1
+            raise
+
+        self.method = method
+        self.connect_time = time.monotonic() - self._started
+        self.connects += 1
+        if method == 'direct':
+            self.direct_connects += 1
+        elif method == 'scan':
+            self.scans += 1
+        print(f"🔗 Connecté ({method}) en {self.connect_time:.2f} s")
+        return client
+
+    async def _connect_cached(self, **client_kwargs):
+        cached = self.cache.load() if self.cache else None
+        if not cached:
+            return None, None
+        kwargs = dict(client_kwargs)
+        if cached.get('services'):
+            # Découverte limitée aux services déjà vus sur ce masque
+            kwargs.setdefault('services', cached['services'])
+        client = self.client_class(cached['address'], timeout=self.direct_timeout, **kwargs)
+        try:
+            await client.connect()
+        except Exception as e:
+            print(f"⚠️ Connexion directe à {cached['address']} impossible ({e}), scan...")
+            return None, None
+
+        _, handles = gatt_layout(client)
+        missing = [uuid for uuid in self.required_uuids if uuid not in handles]
+        if missing:
+            print(f"⚠️ Caractéristiques absentes après connexion directe ({len(missing)}), cache oublié")
+            self.cache.forget()
+            try:
+                await client.disconnect()
+            except Exception:
+                pass
+            return None, None
+
+        self._remember(client, cached.get('name'), cached)
+        return client, 'direct'
+
+    async def _connect_scan(self, **client_kwargs):
+        print(f"Recherche du masque ({self.name_filter})...")
+        device = await BleakScanner.find_device_by_filter(
+            lambda d, adv: bool(d.name) and self.name_filter in d.name,
+            timeout=self.scan_timeout,
+        )
+        if device is None:
+            raise RuntimeError("Masque non trouvé")
+        print(f"Connexion à {device.name}")
+        client = self.client_class(device, **client_kwargs)
+        await client.connect()
+        self._remember(client, device.name)
+        return client
+
+    def _remember(self, client, name, cached=None):
+        if not self.cache:
+            return
+        services, handles = gatt_layout(client)
+        if cached and cached.get('handles') and handles and cached['handles'] != handles:
+            print("⚠️ Table GATT différente du cache (firmware modifié ?), cache mis à jour")
+        try:
+            self.cache.save(client.address, name, services, handles)
+        except OSError as e:
+            print(f"⚠️ Cache du masque non sauvegardé: {e}")
+
+    def command_sent(self):
+        """À appeler après chaque écriture de commande : mesure la première"""
+        if self.first_command_time is None and self._started is not None:
+            self.first_command_time = time.monotonic() - self._started
+
+    def stats(self):
+        return {
+            'method': self.method,
+            'connect_s': round(self.connect_time, 3) if self.connect_time is not None else None,
+            'first_command_s': round(self.first_command_time, 3) if self.first_command_time is not None else None,
+            'connects': self.connects,
+            'direct_connects': self.direct_connects,
+            'scans': self.scans,
+            'failures': self.failures,
+        }
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Module Core - Réglage adaptatif du lien BLE
+===========================================
+
+Taille de paquet selon le MTU ATT négocié, délai inter-paquets selon la latence des REOK et les erreurs
+"""
+
+# MTU ATT par défaut (non négocié) : on garde alors la taille historique
+DEFAULT_ATT_MTU = 23
+ATT_HEADER_SIZE = 3
+
+# En-tête d'un paquet d'upload : [longueur+1, packet_count]
+PACKET_HEADER_SIZE = 2
+
+# Limites du masque : 80 bytes de données historiquement, 96 validés (complete_text_display)
+DEFAULT_CHUNK_SIZE = 80
+MIN_CHUNK_SIZE = 16
+MAX_CHUNK_SIZE = 96
+
+# Délai inter-paquets (secondes)
+DEFAULT_PACKET_DELAY = 0.02
+MIN_PACKET_DELAY = 0.0
+MAX_PACKET_DELAY = 0.2
+
+# Lissage exponentiel de la latence REOK
+LATENCY_ALPHA = 0.2
+
+
+class LinkTuner:
+    """
+    Choisit la taille des paquets et le délai entre eux pour un lien donné
+
+    - chunk_size : la plus grande charge utile qui tient dans le MTU négocié,
+      bornée par les limites du masque
+    - packet_delay : diminue doucement tant que les REOK arrivent vite, double à
+      chaque timeout ou quand la latence s'envole (AIMD)
+    """
+
+    def __init__(self, chunk_size=DEFAULT_CHUNK_SIZE, packet_delay=DEFAULT_PACKET_DELAY,
+                 min_delay=MIN_PACKET_DELAY, max_delay=MAX_PACKET_DELAY):
+        self.mtu = None
+        self.max_chunk_size = chunk_size
+        self.chunk_size = chunk_size
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.packet_delay = min(max(packet_delay, min_delay), max_delay)
+
+        self.latency = None
+        self.best_latency = None
+        self.acks = 0
+        self.errors = 0
+
+    def set_mtu(self, mtu):
+        """Adapte la taille des paquets au MTU ATT négocié"""
+        if not mtu or mtu <= DEFAULT_ATT_MTU:
+            # MTU inconnu ou pas encore négocié (BlueZ) : taille historique
+            self.mtu = None
+            self.max_chunk_size = DEFAULT_CHUNK_SIZE
+        else:
+            self.mtu = mtu
+            payload = mtu - ATT_HEADER_SIZE - PACKET_HEADER_SIZE
+            self.max_chunk_size = max(MIN_CHUNK_SIZE, min(MAX_CHUNK_SIZE, payload))
+        self.chunk_size = self.max_chunk_size
+        return self.chunk_size
+
+    @property
+    def error_rate(self):
+        total = self.acks + self.errors
+        return self.errors / total if total else 0.0
+
+    def record_ack(self, latency):
+        """Un REOK est arrivé 'latency' secondes après l'envoi du paquet"""
+        self.acks += 1
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency = LATENCY_ALPHA * latency + (1 - LATENCY_ALPHA) * self.latency
+        if self.best_latency is None or latency < self.best_latency:
+            self.best_latency = latency
+
+        if self.best_latency and self.latency > 3 * self.best_latency + 0.01:
+            # Le masque accumule du retard : on espace les paquets
+            self._slow_down()
+        else:
+            # Diminution additive (1 ms par REOK) et retour vers la taille max
+            self.packet_delay = max(self.min_delay, self.packet_delay - 0.001)
+            if self.chunk_size < self.max_chunk_size and self.acks % 16 == 0:
+                self.chunk_size = min(self.max_chunk_size, self.chunk_size + 16)
+
+    def record_error(self):
+        """REOK manquant ou écriture échouée"""
+        self.errors += 1
+        self._slow_down()
+        if self.error_rate > 0.1:
+            self.chunk_size = max(MIN_CHUNK_SIZE, min(self.chunk_size, DEFAULT_CHUNK_SIZE) // 2)
+
+    def _slow_down(self):
+        self.packet_delay = min(self.max_delay, max(self.packet_delay * 2, 0.005))
+
+    def stats(self):
+        return {
+            'mtu': self.mtu,
+            'chunk_size': self.chunk_size,
+            'packet_delay_ms': round(self.packet_delay * 1000, 1),
+            'reok_latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+            'error_rate': round(self.error_rate, 3),
+        }
+
+
+async def read_negotiated_mtu(client):
+    """Lit le MTU ATT négocié par Bleak (None si indisponible)"""
+    backend = getattr(client, '_backend', None)
+    if hasattr(backend, '_acquire_mtu'):
+        # BlueZ : le MTU n'est connu qu'après AcquireWrite (recommandé par la doc Bleak)
+        try:
+            await backend._acquire_mtu()
+        except Exception:
+            pass
+    try:
+        return client.mtu_size
+    except Exception:
+        return None
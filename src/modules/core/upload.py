@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Module Core - Upload à fenêtre glissante
+========================================
+
+Protocole DATS / REOK / DATCP : plusieurs paquets non acquittés en vol, REOK
+associés aux packet_count, go-back-N en cas de perte. Miroir de WindowedUpload
+(final_bot_v1/mask_upload.py) pour les contrôleurs de src/.
+
+Le contrôleur fournit current_upload['complete_buffer'], notifications
+(NotificationDispatcher), send_upload_data() et, s'il en a un, link (LinkTuner).
+"""
+
+import asyncio
+import time
+from collections import deque
+
+from .link import DEFAULT_CHUNK_SIZE
+
+# Paquets envoyés sans attendre leur REOK
+DEFAULT_WINDOW = 4
+
+# Le dernier byte d'un REOK déchiffré vaut packet_count + 2 (DATSOK vaut 1),
+# cf. preview_log.txt : "Envoi paquet 0" -> ...0452454f4b...02
+REOK_SEQUENCE_OFFSET = 2
+
+
+class UploadPreempted(Exception):
+    """Upload arrêté entre deux paquets pour laisser passer un affichage plus prioritaire"""
+
+
+class UploadCancelled(Exception):
+    """Upload annulé explicitement (jeton cancel)"""
+
+
+def build_packets(buffer, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Découpe le buffer en paquets [longueur+1, packet_count, données...]"""
+    packets = []
+    for packet_count, start in enumerate(range(0, len(buffer), chunk_size)):
+        chunk = buffer[start:start + chunk_size]
+        packet = bytearray()
+        packet.append(len(chunk) + 1)
+        packet.append(packet_count & 0xFF)
+        packet.extend(chunk)
+        packets.append(bytes(packet))
+    return packets
+
+
+class WindowedUpload:
+    """
+    Envoie current_upload['complete_buffer'] d'un contrôleur avec une fenêtre glissante
+
+    Le masque répond un REOK par paquet. Son dernier byte porte le packet_count
+    acquitté : il sert d'acquittement cumulatif (tous les paquets jusqu'à lui sont
+    reçus). Sans numéro exploitable, chaque REOK acquitte le plus ancien paquet en
+    vol. Si aucun REOK n'arrive avant ack_timeout, les paquets non acquittés sont
+    renvoyés à partir du plus ancien (go-back-N) avec le même packet_count.
+    Si controller.upload_interrupt (asyncio.Event) est levé, l'upload s'arrête avant le
+    paquet suivant (UploadPreempted) ; le prochain DATS repart de zéro.
+
+    acked reste à jour entre deux run() : après un TimeoutError, un nouvel appel à run()
+    reprend au premier paquet non acquitté au lieu de tout renvoyer.
+    cancel    : asyncio.Event, arrêt avant le paquet suivant (UploadCancelled)
+    on_ack(n) : appelé avec le nombre de paquets acquittés à chaque progression
+    """
+
+    def __init__(self, controller, window=DEFAULT_WINDOW, chunk_size=None,
+                 ack_timeout=3.0, max_retries=3, cancel=None, on_ack=None):
+        self.controller = controller
+        self.link = getattr(controller, 'link', None)
+        self.window = max(1, int(window))
+        if chunk_size is None:
+            chunk_size = self.link.chunk_size if self.link else DEFAULT_CHUNK_SIZE
+        self.chunk_size = chunk_size
+        self.ack_timeout = ack_timeout
+        self.max_retries = max_retries
+        self.cancel = cancel
+        self.on_ack = on_ack
+        self.retransmissions = 0
+        self.acked = 0
+        self.packet_total = None
+
+    async def run(self):
+        """Envoie les paquets pas encore acquittés et attend le REOK de chacun"""
+        upload = self.controller.current_upload
+        buffer = upload['complete_buffer']
+        packets = build_packets(buffer, self.chunk_size)
+        self.packet_total = len(packets)
+        acked = self.acked
+        next_packet = acked
+        retries = 0
+        sent_at = {}
+
+        upload.setdefault('bytes_acked', 0)
+
+        # Heure d'arrivée de chaque REOK : la latence mesurée ne doit pas inclure le remplissage
+        # de la fenêtre, sinon LinkTuner ralentit en boucle à cause de ses propres pauses
+        arrivals = deque()
+
+        def on_response(response):
+            if response == "REOK":
+                arrivals.append(time.monotonic())
+
+        self.controller.notifications.add_listener(on_response)
+        try:
+            while acked < len(packets):
+                # Remplir la fenêtre
+                while next_packet < len(packets) and next_packet - acked < self.window:
+                    if self.cancel is not None and self.cancel.is_set():
+                        raise UploadCancelled(f"upload annulé au paquet {next_packet}/{len(packets)}")
+                    interrupt = getattr(self.controller, 'upload_interrupt', None)
+                    if interrupt is not None and interrupt.is_set():
+                        raise UploadPreempted(f"upload interrompu au paquet {next_packet}/{len(packets)}")
+                    sent_at[next_packet] = time.monotonic()
+                    await self.controller.send_upload_data(packets[next_packet])
+                    next_packet += 1
+                    upload['packet_count'] = next_packet
+                    upload['bytes_sent'] = min(next_packet * self.chunk_size, len(buffer))
+
+                try:
+                    block = await self.controller.notifications.wait_for("REOK", self.ack_timeout, raw=True)
+                except asyncio.TimeoutError:
+                    if self.link:
+                        self.link.record_error()
+                    retries += 1
+                    if retries > self.max_retries:
+                        raise TimeoutError(f"Pas de REOK pour le paquet {acked} après {self.max_retries} renvois")
+                    print(f"⚠️ REOK manquant pour le paquet {acked}, renvoi de {next_packet - acked} paquet(s)")
+                    self.retransmissions += next_packet - acked
+                    self.controller.notifications.clear("REOK")
+                    arrivals.clear()
+                    next_packet = acked
+                    continue
+
+                received = arrivals.popleft() if arrivals else time.monotonic()
+                previous = acked
+                acked = self._acked_after(block, acked, next_packet)
+                self.acked = acked
+                if acked > previous:
+                    if self.link:
+                        self.link.record_ack(received - sent_at[acked - 1])
+                    if self.on_ack:
+                        self.on_ack(acked)
+                retries = 0
+                upload['bytes_acked'] = min(acked * self.chunk_size, len(buffer))
+        finally:
+            self.controller.notifications.remove_listener(on_response)
+
+        return True
+
+    def _acked_after(self, block, acked, next_packet):
+        """Nombre de paquets acquittés après ce REOK"""
+        if not block or len(block) != 16:
+            return acked + 1
+
+        sequence = (block[15] - REOK_SEQUENCE_OFFSET) & 0xFF
+        if block[15] == 0 and (acked & 0xFF) != 0xFE:
+            # Pas de numéro de séquence (0 ne correspond qu'au paquet 254 modulo 256)
+            return acked + 1
+
+        # Retrouver l'index complet à partir du packet_count sur 8 bits
+        index = acked + ((sequence - acked) & 0xFF)
+        if index < next_packet:
+            return index + 1
+        if (acked - 1 - sequence) & 0xFF < self.window:
+            # REOK dupliqué : le masque attend toujours le paquet 'acked'
+            return acked
+        return acked + 1
@@ -18,8 +18,8 @@ class ScrollingTextController(BaseMaskController):
     Hérite de BaseMaskController et ajoute les fonctionnalités de texte.
     """
     
-    def __init__(self):
-        super().__init__()
+    def __init__(self, client=None):
+        super().__init__(client)
         # Propriétés spécifiques au texte
         self.font_size = 12
         self.auto_fit = True
@@ -48,7 +48,8 @@ class ScrollingTextController(BaseMaskController):
             'total_len': len(bitmap) + len(color_array),
             'bytes_sent': 0,
             'packet_count': 0,
-            'complete_buffer': bitmap + color_array
+            # bitmap peut être une vue (Frame.to_wire) : une seule copie, ici
+            'complete_buffer': b"".join((bitmap, color_array))
         }
         
         cmd = bytearray()
@@ -56,6 +57,7 @@ class ScrollingTextController(BaseMaskController):
         cmd.extend(b"DATS")
         cmd.extend(struct.pack('<I', self.current_upload['total_len']))
         
+        self.notifications.clear()
         await self.send_command(cmd)
         self.upload_running = True
     
@@ -64,7 +66,7 @@ class ScrollingTextController(BaseMaskController):
         if not self.upload_running or not self.current_upload:
             raise RuntimeError("Aucun upload en cours")
         
-        PACKET_SIZE = 128
+        PACKET_SIZE = self.link.chunk_size
         remaining = self.current_upload['total_len'] - self.current_upload['bytes_sent']
         chunk_size = min(PACKET_SIZE, remaining)
         
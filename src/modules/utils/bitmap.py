@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Module Utils - Encodage des bitmaps du masque
+=============================================
+
+Un seul encodeur pour tous les contrôleurs : une colonne de 16 pixels devient
+un mot de 2 bytes, emballé par NumPy (packbits) au lieu d'une boucle par pixel.
+
+Deux dispositions coexistent dans le dépôt :
+- LAYOUT_LSB : bit y = ligne y, mot uint16 little-endian
+  (BaseMaskController, frame_to_bitmap, Frame, complete_text_display)
+- LAYOUT_MSB : ligne 0 = 0x80 du premier byte, ligne 8 = 0x80 du second
+  (ScrollingMaskController / mask-go, final_bot_v1)
+
+La disposition n'a pas de valeur par défaut : l'appelant la donne toujours
+(le miroir final_bot_v1/mask_raster.py travaille surtout en LAYOUT_MSB).
+
+Un pixel est allumé s'il vaut 1 ; une colonne trop courte est complétée par
+des pixels éteints, au-delà de 16 lignes les valeurs sont ignorées.
+"""
+
+from typing import List, Sequence
+
+import numpy as np
+
+BITMAP_HEIGHT = 16
+
+LAYOUT_LSB = 'lsb'
+LAYOUT_MSB = 'msb'
+
+# Disposition -> ordre des bits de np.packbits dans chaque byte
+LAYOUTS = {
+    LAYOUT_LSB: 'little',
+    LAYOUT_MSB: 'big',
+}
+
+# Inversion des bits d'un byte : passe d'une disposition à l'autre
+_REVERSED_BITS = np.array([int(f"{i:08b}"[::-1], 2) for i in range(256)], dtype=np.uint8)
+
+
+def _bitorder(layout):
+    try:
+        return LAYOUTS[layout]
+    except KeyError:
+        raise ValueError(f"Disposition de bitmap inconnue: {layout!r} ({', '.join(LAYOUTS)})") from None
+
+
+def pixels_to_grid(pixel_map: Sequence[Sequence[int]]) -> np.ndarray:
+    """List[List[int]] (une liste de pixels par colonne) -> tableau booléen (W, 16)"""
+    width = len(pixel_map)
+    grid = np.zeros((width, BITMAP_HEIGHT), dtype=bool)
+    if not width:
+        return grid
+    try:
+        values = np.asarray(pixel_map)
+    except ValueError:
+        values = None  # colonnes de longueurs différentes
+    if values is not None and values.ndim == 2 and values.dtype != object:
+        lit = values[:, :BITMAP_HEIGHT] == 1
+        grid[:, :lit.shape[1]] = lit
+        return grid
+    for x, column in enumerate(pixel_map):
+        lit = np.asarray(column[:BITMAP_HEIGHT]) == 1
+        grid[x, :len(lit)] = lit
+    return grid
+
+
+def pack_grid(lit: np.ndarray, layout: str) -> np.ndarray:
+    """Tableau booléen (W, 16) -> bytes du bitmap, en tableau uint8 (W, 2)"""
+    return np.packbits(lit[:, :BITMAP_HEIGHT], axis=1, bitorder=_bitorder(layout))
+
+
+def unpack_grid(data, layout: str) -> np.ndarray:
+    """Bytes du bitmap -> tableau booléen (W, 16), inverse de pack_grid"""
+    packed = np.frombuffer(bytes(data), dtype=np.uint8).reshape(-1, 2)
+    return np.unpackbits(packed, axis=1, bitorder=_bitorder(layout)).astype(bool)
+
+
+def encode_bitmap(pixel_map: Sequence[Sequence[int]], layout: str) -> bytes:
+    """Colonnes de pixels -> bitmap du masque (2 bytes par colonne)"""
+    return pack_grid(pixels_to_grid(pixel_map), layout).tobytes()
+
+
+def decode_bitmap(data, layout: str) -> List[List[int]]:
+    """Bitmap du masque -> colonnes de pixels List[List[int]]"""
+    return unpack_grid(data, layout).astype(np.uint8).tolist()
+
+
+def convert_layout(data, source: str, target: str) -> bytes:
+    """Réécrit un bitmap d'une disposition dans l'autre (table d'inversion des bits)"""
+    if _bitorder(source) == _bitorder(target):
+        return bytes(data)
+    return _REVERSED_BITS[np.frombuffer(bytes(data), dtype=np.uint8)].tobytes()
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Module Utils - Frame compacte 16 lignes
+=======================================
+
+Une frame du masque stockée en colonnes empaquetées : un mot uint16 par colonne,
+bit y = ligne y. C'est exactement l'encodage attendu par le masque (2 bytes par
+colonne, petit-boutiste, lignes 0-7 dans le premier byte) : to_wire() expose le
+tableau tel quel, sans copie ni boucle.
+
+64 colonnes = 128 bytes, contre 64 listes de 16 entiers pour l'ancienne
+représentation List[List[int]]. Les opérations de dessin travaillent sur des
+masques de bits NumPy au lieu de boucler pixel par pixel.
+"""
+
+from typing import List, Sequence, Union
+
+import numpy as np
+
+from .bitmap import LAYOUT_LSB, pixels_to_grid, pack_grid, convert_layout
+
+FRAME_HEIGHT = 16
+FRAME_WIDTH = 64
+WIRE_DTYPE = np.dtype('<u2')
+
+# Masque des lignes [0, n) pour n = 0..16
+_ROW_MASKS = np.array([(1 << n) - 1 for n in range(FRAME_HEIGHT + 1)], dtype=np.uint32)
+
+
+def _row_span(y0, y1):
+    """Mot dont les bits y0..y1-1 sont à 1"""
+    y0 = max(0, min(FRAME_HEIGHT, y0))
+    y1 = max(0, min(FRAME_HEIGHT, y1))
+    if y1 <= y0:
+        return 0
+    return int(_ROW_MASKS[y1] ^ _ROW_MASKS[y0])
+
+
+class Frame:
+    """
+    Frame 16 lignes x width colonnes, un uint16 par colonne (bit y = ligne y)
+
+    Les méthodes de dessin modifient la frame et la retournent, pour chaîner :
+    Frame().line(0, 0, 63, 15).circle(32, 8, 6)
+    """
+
+    __slots__ = ('words',)
+
+    def __init__(self, width: int = FRAME_WIDTH, words=None):
+        if words is None:
+            self.words = np.zeros(width, dtype=WIRE_DTYPE)
+        else:
+            words = np.ascontiguousarray(words, dtype=WIRE_DTYPE)
+            # Tableau en lecture seule (frombuffer, memmap) : copie pour pouvoir dessiner
+            self.words = words if words.flags.writeable else words.copy()
+
+    # --- Conversion -----------------------------------------------------------
+
+    @classmethod
+    def from_columns(cls, columns: Sequence[Sequence[int]]) -> 'Frame':
+        """Depuis l'ancienne représentation : une liste de 16 valeurs 0/1 par colonne"""
+        if isinstance(columns, Frame):
+            return columns.copy()
+        return cls(words=pack_grid(pixels_to_grid(columns), LAYOUT_LSB).view(WIRE_DTYPE).ravel())
+
+    @classmethod
+    def from_wire(cls, data) -> 'Frame':
+        """Depuis un bitmap déjà encodé (2 bytes par colonne)"""
+        return cls(words=np.frombuffer(bytes(data), dtype=WIRE_DTYPE))
+
+    def to_columns(self) -> List[List[int]]:
+        """Vers l'ancienne représentation List[List[int]]"""
+        return self.to_array().astype(np.uint8).tolist()
+
+    def to_array(self) -> np.ndarray:
+        """Grille booléenne (width, 16)"""
+        return np.unpackbits(self.words.view(np.uint8).reshape(-1, 2), axis=1,
+                             bitorder='little').astype(bool)
+
+    def to_wire(self, layout: str = LAYOUT_LSB):
+        """
+        Bitmap du masque, 2 bytes par colonne
+        LAYOUT_LSB : vue sur le tableau, sans copie ; autre disposition : bytes convertis
+        """
+        view = memoryview(self.words).cast('B')
+        if layout == LAYOUT_LSB:
+            return view
+        return convert_layout(view, LAYOUT_LSB, layout)
+
+    def copy(self) -> 'Frame':
+        return Frame(words=self.words.copy())
+
+    @property
+    def width(self) -> int:
+        return len(self.words)
+
+    @property
+    def nbytes(self) -> int:
+        return self.words.nbytes
+
+    def __len__(self):
+        return len(self.words)
+
+    def __eq__(self, other):
+        if isinstance(other, Frame):
+            return np.array_equal(self.words, other.words)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Frame(width={self.width}, lit={self.count()})"
+
+    def count(self) -> int:
+        """Nombre de pixels allumés"""
+        return int(np.unpackbits(self.words.view(np.uint8)).sum())
+
+    # --- Pixels -------------------------------------------------------------
+
+    def get_pixel(self, x: int, y: int) -> int:
+        if 0 <= x < len(self.words) and 0 <= y < FRAME_HEIGHT:
+            return (int(self.words[x]) >> y) & 1
+        return 0
+
+    def set_pixel(self, x: int, y: int, value: int = 1) -> 'Frame':
+        """Allume (ou éteint avec value=0) un pixel ; hors cadre ignoré"""
+        if 0 <= x < len(self.words) and 0 <= y < FRAME_HEIGHT:
+            if value:
+                self.words[x] |= 1 << y
+            else:
+                self.words[x] &= ~(1 << y) & 0xFFFF
+        return self
+
+    def set_pixels(self, xs, ys, value: int = 1) -> 'Frame':
+        """set_pixel sur des tableaux de coordonnées ; points hors cadre ignorés"""
+        xs = np.asarray(xs, dtype=np.int64).ravel()
+        ys = np.asarray(ys, dtype=np.int64).ravel()
+        inside = (xs >= 0) & (xs < len(self.words)) & (ys >= 0) & (ys < FRAME_HEIGHT)
+        xs, ys = xs[inside], ys[inside]
+        bits = np.left_shift(1, ys).astype(WIRE_DTYPE)
+        if value:
+            np.bitwise_or.at(self.words, xs, bits)
+        else:
+            np.bitwise_and.at(self.words, xs, ~bits)
+        return self
+
+    def fill_rect(self, x0: int, y0: int, x1: int, y1: int, value: int = 1) -> 'Frame':
+        """Rectangle plein [x0, x1) x [y0, y1), découpé au cadre"""
+        x0, x1 = max(0, x0), min(len(self.words), x1)
+        span = _row_span(y0, y1)
+        if x1 > x0 and span:
+            if value:
+                self.words[x0:x1] |= span
+            else:
+                self.words[x0:x1] &= ~span & 0xFFFF
+        return self
+
+    def fill_columns(self, heights, value: int = 1) -> 'Frame':
+        """Allume le bas de chaque colonne sur heights[x] lignes (barres, flammes)"""
+        heights = np.clip(np.asarray(heights, dtype=np.int64), 0, FRAME_HEIGHT)[:len(self.words)]
+        spans = (_ROW_MASKS[FRAME_HEIGHT] ^ _ROW_MASKS[FRAME_HEIGHT - heights]).astype(WIRE_DTYPE)
+        target = self.words[:len(spans)]
+        if value:
+            target |= spans
+        else:
+            target &= ~spans
+        return self
+
+    def clear(self) -> 'Frame':
+        self.words[:] = 0
+        return self
+
+    # --- Dessin -------------------------------------------------------------
+
+    def line(self, x1: int, y1: int, x2: int, y2: int) -> 'Frame':
+        """Segment entre deux points (pas d'un pixel sur l'axe principal)"""
+        steps = max(abs(x2 - x1), abs(y2 - y1))
+        t = np.arange(steps + 1) / steps if steps else np.zeros(1)
+        xs = np.floor(x1 + (x2 - x1) * t + 0.5)
+        ys = np.floor(y1 + (y2 - y1) * t + 0.5)
+        return self.set_pixels(xs, ys)
+
+    def circle(self, center_x: int, center_y: int, radius: int, step: int = 5) -> 'Frame':
+        """Contour de cercle échantillonné tous les 'step' degrés"""
+        angles = np.radians(np.arange(0, 360, step))
+        # int() tronque vers zéro, comme le tracé d'origine
+        xs = center_x + np.trunc(radius * np.cos(angles))
+        ys = center_y + np.trunc(radius * np.sin(angles))
+        return self.set_pixels(xs, ys)
+
+    def blit(self, source: 'Frame', x: int = 0, y: int = 0, mode: str = "or") -> 'Frame':
+        """Colle source avec son coin haut-gauche en (x, y) ; ce qui dépasse est coupé"""
+        words = _shift_rows(source.words, y)
+        start, end = max(0, x), min(len(self.words), x + len(words))
+        if end > start:
+            region = self.words[start:end]
+            region[:] = _combine(region, words[start - x:end - x], mode)
+        return self
+
+    def merge(self, other: 'Frame', mode: str = "add") -> 'Frame':
+        """Nouvelle frame combinant les deux (largeur commune), mêmes modes que merge_frames"""
+        width = min(len(self.words), len(other.words))
+        return Frame(words=_combine(self.words[:width], other.words[:width], mode))
+
+    def shift(self, dx: int = 0, dy: int = 0) -> 'Frame':
+        """Nouvelle frame décalée de dx colonnes et dy lignes, sans rebouclage"""
+        words = _shift_rows(self.words, dy)
+        width = len(words)
+        result = np.zeros_like(words)
+        if 0 <= dx < width:
+            result[dx:] = words[:width - dx]
+        elif -width < dx < 0:
+            result[:width + dx] = words[-dx:]
+        return Frame(words=result)
+
+    def shift_columns(self, offsets) -> 'Frame':
+        """Nouvelle frame dont chaque colonne x est décalée verticalement de offsets[x] lignes"""
+        offsets = np.asarray(offsets, dtype=np.int64)
+        words = self.words.astype(np.uint32)
+        down = np.left_shift(words, np.clip(offsets, 0, FRAME_HEIGHT))
+        up = np.right_shift(words, np.clip(-offsets, 0, FRAME_HEIGHT))
+        return Frame(words=(np.where(offsets >= 0, down, up) & 0xFFFF).astype(WIRE_DTYPE))
+
+    def crop(self, start_x: int, width: int) -> 'Frame':
+        """Colonnes [start_x, start_x + width) (copie)"""
+        start = max(0, start_x)
+        return Frame(words=self.words[start:max(start, start_x + width)].copy())
+
+    def resize(self, new_width: int) -> 'Frame':
+        """Étirement horizontal au plus proche voisin"""
+        if not len(self.words):
+            return Frame(new_width)
+        old_width = len(self.words)
+        source = np.minimum(np.arange(new_width) * old_width // new_width, old_width - 1)
+        return Frame(words=self.words[source])
+
+
+FrameLike = Union[Frame, List[List[int]]]
+
+
+def _shift_rows(words, dy):
+    if dy >= 0:
+        shifted = np.left_shift(words.astype(np.uint32), min(dy, FRAME_HEIGHT)) & 0xFFFF
+    else:
+        shifted = np.right_shift(words, min(-dy, FRAME_HEIGHT))
+    return shifted.astype(WIRE_DTYPE)
+
+
+def _combine(a, b, mode):
+    if mode in ("add", "or"):
+        return a | b
+    if mode == "subtract":
+        return a & ~b
+    if mode in ("multiply", "and"):
+        return a & b
+    if mode == "xor":
+        return a ^ b
+    # "overlay" : en binaire, un pixel allumé de b recouvre a
+    return a | b
+
+
+def as_frame(frame: FrameLike) -> Frame:
+    """Frame telle quelle, ou conversion depuis List[List[int]]"""
+    return frame if isinstance(frame, Frame) else Frame.from_columns(frame)
+
+
+def frame_to_wire(frame: FrameLike, layout: str = LAYOUT_LSB):
+    """Bitmap du masque pour une Frame ou une List[List[int]]"""
+    return as_frame(frame).to_wire(layout)
@@ -8,12 +8,18 @@ Fonctions helpers pour :
 - Calculs mathématiques
 - Helpers pour couleurs
 - Fonctions de debug
+
+Les fonctions de frame acceptent une Frame (colonnes empaquetées, voir frame.py)
+ou l'ancienne représentation List[List[int]] ; elles retournent le même type.
 """
 
 import math
 from typing import List, Tuple, Optional
 from PIL import Image, ImageDraw, ImageFont
 
+from .frame import Frame, FrameLike, FRAME_WIDTH, as_frame
+from .bitmap import LAYOUT_LSB, encode_bitmap
+
 def clamp(value: float, min_val: float, max_val: float) -> float:
     """Limite une valeur entre min et max"""
     return max(min_val, min(max_val, value))
@@ -140,31 +146,20 @@ def bitmap_to_frame(bitmap: List[List[int]]) -> List[List[int]]:
     # Le bitmap est déjà au bon format
     return bitmap
 
-def frame_to_bitmap(frame: List[List[int]]) -> bytes:
-    """Convertit une frame en bitmap pour transmission"""
-    results = bytearray()
-    
-    for x in range(len(frame)):
-        column = frame[x]
-        
-        # Encoder chaque colonne en 2 bytes (16 bits pour 16 pixels)
-        byte1 = 0
-        byte2 = 0
-        
-        for y in range(8):
-            if y < len(column) and column[y] == 1:
-                byte1 |= (1 << y)
-        
-        for y in range(8, 16):
-            if y < len(column) and column[y] == 1:
-                byte2 |= (1 << (y - 8))
-        
-        results.extend([byte1, byte2])
-    
-    return bytes(results)
+def create_empty_frame(width: int = FRAME_WIDTH) -> Frame:
+    """Crée une frame vide (16 lignes x width colonnes)"""
+    return Frame(width)
+
+def frame_to_bitmap(frame: FrameLike, layout: str = LAYOUT_LSB) -> bytes:
+    """Convertit une frame en bitmap pour transmission (2 bytes par colonne, bit y = ligne y par défaut)"""
+    if isinstance(frame, Frame):
+        return bytes(frame.to_wire(layout))
+    return encode_bitmap(frame, layout)
 
-def resize_frame(frame: List[List[int]], new_width: int) -> List[List[int]]:
+def resize_frame(frame: FrameLike, new_width: int) -> FrameLike:
     """Redimensionne une frame horizontalement"""
+    if isinstance(frame, Frame):
+        return frame.resize(new_width)
     if not frame:
         return [[0 for _ in range(16)] for _ in range(new_width)]
     
@@ -179,8 +174,10 @@ def resize_frame(frame: List[List[int]], new_width: int) -> List[List[int]]:
     
     return new_frame
 
-def crop_frame(frame: List[List[int]], start_x: int, width: int) -> List[List[int]]:
+def crop_frame(frame: FrameLike, start_x: int, width: int) -> FrameLike:
     """Découpe une frame"""
+    if isinstance(frame, Frame):
+        return frame.crop(start_x, width)
     if not frame:
         return []
     
@@ -189,9 +186,15 @@ def crop_frame(frame: List[List[int]], start_x: int, width: int) -> List[List[in
     
     return frame[start_x:end_x]
 
-def merge_frames(frame1: List[List[int]], frame2: List[List[int]], 
-                mode: str = "add") -> List[List[int]]:
+def merge_frames(frame1: FrameLike, frame2: FrameLike,
+                mode: str = "add") -> FrameLike:
     """Fusionne deux frames"""
+    if isinstance(frame1, Frame) or isinstance(frame2, Frame):
+        if not len(frame1):
+            return frame2
+        if not len(frame2):
+            return frame1
+        return as_frame(frame1).merge(as_frame(frame2), mode)
     if not frame1:
         return frame2
     if not frame2:
@@ -226,8 +229,10 @@ def merge_frames(frame1: List[List[int]], frame2: List[List[int]],
     
     return result
 
-def debug_print_frame(frame: List[List[int]], title: str = "Frame"):
+def debug_print_frame(frame: FrameLike, title: str = "Frame"):
     """Affiche une frame en ASCII pour debug"""
+    if isinstance(frame, Frame):
+        frame = frame.to_columns()
     print(f"\n{title}:")
     print("+" + "-" * len(frame) + "+")
     
@@ -244,8 +249,10 @@ def debug_print_frame(frame: List[List[int]], title: str = "Frame"):
     print("+" + "-" * len(frame) + "+")
     print(f"Taille: {len(frame)}x16")
 
-def save_frame_as_image(frame: List[List[int]], filename: str, scale: int = 10):
+def save_frame_as_image(frame: FrameLike, filename: str, scale: int = 10):
     """Sauvegarde une frame comme image PNG (pour debug)"""
+    if isinstance(frame, Frame):
+        frame = frame.to_columns()
     if not frame:
         return
     
@@ -267,14 +274,14 @@ def save_frame_as_image(frame: List[List[int]], filename: str, scale: int = 10):
     print(f"Frame sauvegardée: {filename}")
 
 class FrameBuffer:
-    """Buffer circulaire pour stocker des frames d'animation"""
+    """Buffer circulaire pour stocker des frames d'animation (Frame : 128 bytes pour 64 colonnes)"""
     
     def __init__(self, size: int = 100):
         self.size = size
         self.buffer = []
         self.index = 0
     
-    def add_frame(self, frame: List[List[int]]):
+    def add_frame(self, frame: FrameLike):
         """Ajoute une frame au buffer"""
         if len(self.buffer) < self.size:
             self.buffer.append(frame)
@@ -282,7 +289,7 @@ class FrameBuffer:
             self.buffer[self.index] = frame
             self.index = (self.index + 1) % self.size
     
-    def get_frame(self, offset: int = 0) -> Optional[List[List[int]]]:
+    def get_frame(self, offset: int = 0) -> Optional[FrameLike]:
         """Récupère une frame avec un offset"""
         if not self.buffer:
             return None
@@ -290,12 +297,12 @@ class FrameBuffer:
         index = (self.index - 1 - offset) % len(self.buffer)
         return self.buffer[index]
     
-    def get_frames(self, count: int) -> List[List[List[int]]]:
+    def get_frames(self, count: int) -> List[FrameLike]:
         """Récupère les dernières frames"""
         frames = []
         for i in range(min(count, len(self.buffer))):
             frame = self.get_frame(i)
-            if frame:
+            if frame is not None and len(frame):
                 frames.append(frame)
         return frames
     
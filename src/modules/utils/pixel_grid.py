@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Module Utils - Grille de pixels de l'éditeur
+============================================
+
+Conversion vectorisée (NumPy) de la grille 42x56 de l'éditeur en image DIY 46x58 :
+- couleurs hex décodées d'un bloc, ou RGB brut / base64
+- redimensionnement LANCZOS
+- buffer RGB colonne par colonne (x puis y) de 8004 bytes
+"""
+
+import base64
+from collections.abc import Sequence
+
+import numpy as np
+from PIL import Image
+
+GRID_WIDTH = 42
+GRID_HEIGHT = 56
+DIY_WIDTH = 46
+DIY_HEIGHT = 58
+DIY_RGB_SIZE = DIY_WIDTH * DIY_HEIGHT * 3  # 8004
+
+
+def _hex6(color):
+    """'#rrggbb' -> 'rrggbb' ; toute autre valeur (vide, non-chaîne, rgba(...), invalide) -> noir"""
+    if not isinstance(color, str):
+        return '000000'
+    h = color.lstrip('#')
+    return h if len(h) == 6 else '000000'
+
+
+def _is_hex(h):
+    try:
+        return len(bytes.fromhex(h)) == 3
+    except ValueError:
+        return False
+
+
+def decode_hex_grid(colors, width=GRID_WIDTH, height=GRID_HEIGHT):
+    """Liste de couleurs hex (ligne par ligne) -> tableau (height, width, 3) uint8, décodé d'un bloc"""
+    if not isinstance(colors, Sequence):
+        raise ValueError(f"Grille de pixels invalide ({type(colors).__name__}), liste de couleurs attendue")
+    count = width * height
+    hexes = [_hex6(c) for c in colors[:count]]
+    try:
+        raw = bytes.fromhex(''.join(hexes))
+    except ValueError:
+        raw = b''
+    if len(raw) != 3 * len(hexes):
+        # Au moins une couleur invalide (ou des espaces qui décaleraient la suite) : elle passe en noir
+        raw = bytes.fromhex(''.join(h if _is_hex(h) else '000000' for h in hexes))
+    grid = np.zeros(count * 3, dtype=np.uint8)
+    grid[:len(raw)] = np.frombuffer(raw, dtype=np.uint8)
+    return grid.reshape(height, width, 3)
+
+
+def decode_rgb_grid(data, width=GRID_WIDTH, height=GRID_HEIGHT):
+    """RGB brut ligne par ligne (bytes ou base64) -> tableau (height, width, 3) uint8 sans copie"""
+    if isinstance(data, str):
+        data = base64.b64decode(data, validate=True)
+    expected = width * height * 3
+    if len(data) != expected:
+        raise ValueError(f"Grille RGB de {len(data)} bytes, {expected} attendus ({width}x{height})")
+    return np.frombuffer(data, dtype=np.uint8).reshape(height, width, 3)
+
+
+def grid_to_diy_rgb(grid, width=DIY_WIDTH, height=DIY_HEIGHT):
+    """Tableau (h, w, 3) -> buffer DIY : redimensionné (LANCZOS) puis colonne par colonne (x puis y)"""
+    img = Image.fromarray(np.ascontiguousarray(grid, dtype=np.uint8), 'RGB')
+    if img.size != (width, height):
+        img = img.resize((width, height), Image.Resampling.LANCZOS)
+    return np.asarray(img).transpose(1, 0, 2).tobytes()
+
+
+def pixel_grid_to_rgb(pixels, width=GRID_WIDTH, height=GRID_HEIGHT):
+    """Grille de l'éditeur (liste hex, RGB brut ou base64) -> buffer DIY 46x58 de 8004 bytes"""
+    if isinstance(pixels, (bytes, bytearray, memoryview, str)):
+        grid = decode_rgb_grid(pixels, width, height)
+    else:
+        grid = decode_hex_grid(pixels, width, height)
+    return grid_to_diy_rgb(grid)
@@ -5,11 +5,19 @@ Support des caractères complets avec chunking intelligent
 """
 
 import asyncio
+import os
+import sys
 from bleak import BleakClient, BleakScanner
 from Crypto.Cipher import AES
 import struct
 import time
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.core.link import LinkTuner, read_negotiated_mtu
+from modules.core.notifications import NotificationDispatcher
+from modules.core.upload import DEFAULT_WINDOW, WindowedUpload
+from modules.utils.bitmap import LAYOUT_LSB, encode_bitmap
+
 # Configuration validée
 ENCRYPTION_KEY = bytes.fromhex('32672f7974ad43451d9c6c894a0e8764')
 COMMAND_CHAR = "d44bc439-abfd-45a2-b575-925416129600"
@@ -20,8 +28,9 @@ class MaskTextDisplay:
     def __init__(self):
         self.client = None
         self.cipher = AES.new(ENCRYPTION_KEY, AES.MODE_ECB)
-        self.responses = []
-        self.notification_event = asyncio.Event()
+        self.notifications = NotificationDispatcher()
+        self.link = LinkTuner()
+        self.current_upload = {}
         
         # Police complète 8x16 pixels - CORRIGÉE
         self.font_patterns = {
@@ -837,8 +846,7 @@ class MaskTextDisplay:
             str_len = decrypted[0]
             if str_len > 0 and str_len < len(decrypted):
                 response = decrypted[1:str_len+1].decode('ascii', errors='ignore')
-                self.responses.append(response)
-                self.notification_event.set()
+                self.notifications.dispatch(response, decrypted)
                 print(f"📨 {response}")
         except Exception as e:
             print(f"❌ Erreur notification: {e}")
@@ -864,6 +872,9 @@ class MaskTextDisplay:
         
         await self.client.start_notify(NOTIFY_CHAR, self._notification_handler)
         
+        # Taille des paquets selon le MTU négocié
+        self.link.set_mtu(await read_negotiated_mtu(self.client))
+        
         print("✅ Connecté")
         return True
     
@@ -902,18 +913,8 @@ class MaskTextDisplay:
         return columns
     
     def encode_bitmap(self, bitmap):
-        """Encode bitmap pour le masque"""
-        encoded = bytearray()
-        
-        for column in bitmap:
-            val = 0
-            for j, pixel in enumerate(column[:16]):
-                if pixel == 1:
-                    val |= (1 << j)
-            
-            encoded.extend(struct.pack('<H', val))
-        
-        return bytes(encoded)
+        """Encode bitmap pour le masque (bit j = ligne j, mot little-endian)"""
+        return encode_bitmap(bitmap, LAYOUT_LSB)
     
     def encode_colors(self, num_columns, color=(255, 255, 255)):
         """Encode les couleurs"""
@@ -926,22 +927,12 @@ class MaskTextDisplay:
         return bytes(colors)
     
     async def wait_for_response(self, expected, timeout=10):
-        """Attend une réponse spécifique"""
-        start_time = asyncio.get_event_loop().time()
-        
-        while (asyncio.get_event_loop().time() - start_time) < timeout:
-            for i, response in enumerate(self.responses):
-                if expected in response:
-                    self.responses.pop(i)
-                    return True
-            
-            try:
-                await asyncio.wait_for(self.notification_event.wait(), timeout=0.5)
-                self.notification_event.clear()
-            except asyncio.TimeoutError:
-                continue
-        
-        return False
+        """Attend une réponse spécifique (réveil immédiat à la notification)"""
+        try:
+            await self.notifications.wait_for(expected, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
     
     async def set_background_color(self, r, g, b, enable=1):
         """Définit la couleur de background"""
@@ -1021,10 +1012,8 @@ class MaskTextDisplay:
         return success
     
     async def _standard_upload(self, bitmap_data, color_data, total_len, bitmap_len):
-        """Upload standard via protocole DATS"""
-        import struct
-        
-        self.responses.clear()
+        """Upload standard via protocole DATS, paquets par fenêtre glissante (modules.core.upload)"""
+        self.notifications.clear()
         
         # DATS
         dats_cmd = bytearray([9])
@@ -1043,27 +1032,15 @@ class MaskTextDisplay:
             print("❌ Pas de DATSOK")
             return False
         
-        # Upload chunks
-        complete_data = bitmap_data + color_data
-        max_chunk = 96
-        bytes_sent = 0
-        packet_count = 0
-        
-        while bytes_sent < len(complete_data):
-            remaining = len(complete_data) - bytes_sent
-            chunk_size = min(max_chunk, remaining)
-            chunk = complete_data[bytes_sent:bytes_sent + chunk_size]
-            packet = bytearray([chunk_size + 1, packet_count])
-            packet.extend(chunk)
-            
-            await self.client.write_gatt_char(UPLOAD_CHAR, bytes(packet))
-            
-            if not await self.wait_for_response("REOK", 3):
-                print(f"❌ Pas de REOK pour chunk {packet_count}")
-                return False
-            
-            bytes_sent += chunk_size
-            packet_count += 1
+        # Paquets : plusieurs en vol, REOK associés aux packet_count, renvoi en cas de perte
+        self.current_upload = {'complete_buffer': bitmap_data + color_data}
+        try:
+            await self.upload_all_parts()
+        except TimeoutError as e:
+            print(f"❌ {e}")
+            return False
+        finally:
+            self.current_upload = {}
         
         # DATCP
         datcp_cmd = bytearray([5])
@@ -1080,86 +1057,17 @@ class MaskTextDisplay:
         
         print("✅ Upload terminé avec succès")
         return True
-        if not bitmap_columns:
-            print("❌ Aucun caractère valide")
-            return False
-        
-        bitmap_data = self.encode_bitmap(bitmap_columns)
-        color_data = self.encode_colors(len(bitmap_columns), color)
-        
-        total_len = len(bitmap_data) + len(color_data)
-        bitmap_len = len(bitmap_data)
-        
-        print(f"📊 {len(bitmap_columns)} colonnes, {bitmap_len}B bitmap, {len(color_data)}B couleurs")
-        
-        # ÉTAPE 1: Initialiser avec DATS (mode déjà défini = pas de flèche!)
-        self.responses.clear()
-        
-        dats_cmd = bytearray([9])
-        dats_cmd.extend(b"DATS")
-        dats_cmd.extend(struct.pack('>H', total_len))
-        dats_cmd.extend(struct.pack('>H', bitmap_len))
-        dats_cmd.extend([0])
-        
-        while len(dats_cmd) < 16:
-            dats_cmd.append(0)
-        
-        print("📤 DATS (upload silencieux)...")
-        encrypted = self.cipher.encrypt(bytes(dats_cmd))
-        await self.client.write_gatt_char(COMMAND_CHAR, encrypted)
-        
-        if not await self.wait_for_response("DATSOK", 5):
-            print("❌ Pas de DATSOK")
-            return False
-        
-        # ÉTAPE 2: Upload des données par chunks
-        complete_data = bitmap_data + color_data
-        max_chunk = 96  # Taille sûre
-        bytes_sent = 0
-        packet_count = 0
-        
-        while bytes_sent < len(complete_data):
-            remaining = len(complete_data) - bytes_sent
-            chunk_size = min(max_chunk, remaining)
-            
-            chunk = complete_data[bytes_sent:bytes_sent + chunk_size]
-            
-            packet = bytearray([chunk_size + 1, packet_count])
-            packet.extend(chunk)
-            
-            await self.client.write_gatt_char(UPLOAD_CHAR, bytes(packet))
-            
-            if not await self.wait_for_response("REOK", 3):
-                print(f"❌ Pas de REOK pour chunk {packet_count}")
-                return False
-            
-            bytes_sent += chunk_size
-            packet_count += 1
-        
-        # ÉTAPE 3: Finaliser avec DATCP
-        datcp_cmd = bytearray([5])
-        datcp_cmd.extend(b"DATCP")
-        
-        while len(datcp_cmd) < 16:
-            datcp_cmd.append(0)
-        
-        encrypted = self.cipher.encrypt(bytes(datcp_cmd))
-        await self.client.write_gatt_char(COMMAND_CHAR, encrypted)
-        
-        if not await self.wait_for_response("DATCPOK", 5):
-            print("❌ Pas de DATCPOK")
-            return False
-        
-        # ✅ CORRECTION: Le mode est déjà défini en début de fonction!
-        print("✅ Upload terminé - mode déjà configuré (pas de flèche!)")
-        
-        # Optionnel: confirmer le mode final si nécessaire
-        await asyncio.sleep(0.2)
-        print("🔄 Confirmation du mode d'affichage...")
-        await self.set_display_mode(1)  # Confirmation du mode steady
-        
-        print(f"🎉 '{text}' affiché SANS flèche d'upload!")
-        return True
+
+    async def send_upload_data(self, data):
+        """Envoie un paquet via la caractéristique d'upload (appelé par WindowedUpload)"""
+        await self.client.write_gatt_char(UPLOAD_CHAR, bytes(data), response=False)
+        # Délai inter-paquets ajusté par le LinkTuner (latence REOK, erreurs)
+        if self.link.packet_delay:
+            await asyncio.sleep(self.link.packet_delay)
+
+    async def upload_all_parts(self, window=DEFAULT_WINDOW):
+        """Envoie current_upload['complete_buffer'] par paquets de link.chunk_size, fenêtre glissante"""
+        return await WindowedUpload(self, window).run()
     
     async def brightness(self, level):
         """Contrôle la luminosité"""
@@ -6,13 +6,16 @@ Résout le problème du "texte coupé en deux" avec l'encodage bitmap correct
 """
 
 import asyncio
+import os
+import sys
 import time
 from bleak import BleakClient, BleakScanner
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.backends import default_backend
 from PIL import Image, ImageDraw, ImageFont
 import struct
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.core.crypto import MaskCipher
+
 # Configuration BLE
 DEVICE_NAME = "MASK"
 ENCRYPTION_KEY = bytes.fromhex("32672f7974ad43451d9c6c894a0e8764")
@@ -32,15 +35,15 @@ class MaskController:
         self.upload_running = False
         self.current_upload = {}
         self.notification_response = None
+        # Contexte AES ouvert une fois, réutilisé pour chaque commande et notification
+        self.cipher = MaskCipher(ENCRYPTION_KEY)
         
     def encrypt_aes128(self, data):
         """Chiffrement AES-128 ECB"""
         if len(data) != 16:
             raise ValueError("Data must be exactly 16 bytes")
             
-        cipher = Cipher(algorithms.AES(ENCRYPTION_KEY), modes.ECB(), backend=default_backend())
-        encryptor = cipher.encryptor()
-        return encryptor.update(data) + encryptor.finalize()
+        return self.cipher.encrypt(data)
 
     def pad_byte_array(self, array, length):
         """Remplit le tableau avec des zéros jusqu'à la longueur spécifiée"""
@@ -70,9 +73,7 @@ class MaskController:
     def notification_handler(self, sender, data):
         """Gestionnaire des notifications"""
         try:
-            cipher = Cipher(algorithms.AES(ENCRYPTION_KEY), modes.ECB(), backend=default_backend())
-            decryptor = cipher.decryptor()
-            decrypted = decryptor.update(data) + decryptor.finalize()
+            decrypted = self.cipher.decrypt(data)
             
             str_len = decrypted[0]
             if str_len > 0 and str_len < len(decrypted):
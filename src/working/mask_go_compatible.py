@@ -5,13 +5,16 @@ Reproduction fidèle de l'encodage bitmap et du processus d'upload de mask-go
 """
 
 import asyncio
+import os
+import sys
 import time
 from bleak import BleakClient
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.backends import default_backend
 from PIL import Image, ImageDraw, ImageFont
 import struct
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.core.crypto import MaskCipher
+
 # Configuration BLE
 DEVICE_NAME = "MASK"
 ENCRYPTION_KEY = bytes.fromhex("32672f7974ad43451d9c6c894a0e8764")
@@ -27,15 +30,15 @@ class MaskGoCompatible:
         self.upload_running = False
         self.current_upload = {}
         self.notification_response = None
+        # Contexte AES ouvert une fois, réutilisé pour chaque commande et notification
+        self.cipher = MaskCipher(ENCRYPTION_KEY)
         
     def encrypt_aes128(self, data):
         """Chiffrement AES-128 ECB comme dans mask-go"""
         if len(data) != 16:
             raise ValueError("Data must be exactly 16 bytes")
             
-        cipher = Cipher(algorithms.AES(ENCRYPTION_KEY), modes.ECB(), backend=default_backend())
-        encryptor = cipher.encryptor()
-        return encryptor.update(data) + encryptor.finalize()
+        return self.cipher.encrypt(data)
 
     def pad_byte_array(self, array, length):
         """Remplit le tableau avec des zéros jusqu'à la longueur spécifiée"""
@@ -68,9 +71,7 @@ class MaskGoCompatible:
         try:
             print(f"Notification reçue: {data.hex()}")
             # Déchiffrement de la réponse
-            cipher = Cipher(algorithms.AES(ENCRYPTION_KEY), modes.ECB(), backend=default_backend())
-            decryptor = cipher.decryptor()
-            decrypted = decryptor.update(data) + decryptor.finalize()
+            decrypted = self.cipher.decrypt(data)
             
             print(f"Données déchiffrées: {decrypted.hex()}")
             
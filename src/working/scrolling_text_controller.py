@@ -5,13 +5,17 @@ Version basée sur final_mask_controller.py avec ajout du défilement
 """
 
 import asyncio
+import os
+import sys
 import time
 from bleak import BleakClient, BleakScanner
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.backends import default_backend
 from PIL import Image, ImageDraw, ImageFont
 import struct
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.core.crypto import MaskCipher
+from modules.utils.bitmap import LAYOUT_MSB, encode_bitmap
+
 # Configuration BLE
 DEVICE_NAME = "MASK"
 ENCRYPTION_KEY = bytes.fromhex("32672f7974ad43451d9c6c894a0e8764")
@@ -39,15 +43,15 @@ class ScrollingMaskController:
         self.upload_running = False
         self.current_upload = {}
         self.notification_response = None
+        # Contexte AES ouvert une fois, réutilisé pour chaque commande et notification
+        self.cipher = MaskCipher(ENCRYPTION_KEY)
         
     def encrypt_aes128(self, data):
         """Chiffrement AES-128 ECB"""
         if len(data) != 16:
             raise ValueError("Data must be exactly 16 bytes")
             
-        cipher = Cipher(algorithms.AES(ENCRYPTION_KEY), modes.ECB(), backend=default_backend())
-        encryptor = cipher.encryptor()
-        return encryptor.update(data) + encryptor.finalize()
+        return self.cipher.encrypt(data)
 
     def pad_byte_array(self, array, length):
         """Remplit le tableau avec des zéros jusqu'à la longueur spécifiée"""
@@ -77,9 +81,7 @@ class ScrollingMaskController:
     def notification_handler(self, sender, data):
         """Gestionnaire des notifications"""
         try:
-            cipher = Cipher(algorithms.AES(ENCRYPTION_KEY), modes.ECB(), backend=default_backend())
-            decryptor = cipher.decryptor()
-            decrypted = decryptor.update(data) + decryptor.finalize()
+            decrypted = self.cipher.decrypt(data)
             
             str_len = decrypted[0]
             if str_len > 0 and str_len < len(decrypted):
@@ -178,43 +180,12 @@ class ScrollingMaskController:
     def encode_bitmap_for_mask(self, bitmap):
         """
         Encode le bitmap au format masque selon mask-go
+        (ligne 0 = 0x80 du premier byte, ligne 8 = 0x80 du second)
         """
-        results = bytearray()
-        
         for column in bitmap:
             if len(column) != 16:
                 print(f"ATTENTION: colonne de longueur {len(column)} au lieu de 16")
-                
-            val = 0
-            for j, pixel in enumerate(column):
-                if pixel == 1:
-                    bit_mapping = {
-                        0: 128,    # 0x80
-                        1: 64,     # 0x40
-                        2: 32,     # 0x20
-                        3: 16,     # 0x10
-                        4: 8,      # 0x08
-                        5: 4,      # 0x04
-                        6: 2,      # 0x02
-                        7: 1,      # 0x01
-                        8: 32768,  # 0x8000
-                        9: 16384,  # 0x4000
-                        10: 8192,  # 0x2000
-                        11: 4096,  # 0x1000
-                        12: 2048,  # 0x0800
-                        13: 1024,  # 0x0400
-                        14: 512,   # 0x0200
-                        15: 256    # 0x0100
-                    }
-                    
-                    if j in bit_mapping:
-                        val |= bit_mapping[j]
-            
-            # Encodage little-endian sur 2 bytes
-            int_bytes = struct.pack('<H', val)
-            results.extend(int_bytes)
-            
-        return bytes(results)
+        return encode_bitmap(bitmap, LAYOUT_MSB)
 
     def encode_color_array_for_mask(self, columns):
         """Génère un tableau de couleurs blanches"""
@@ -0,0 +1,117 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.modules.animations.animation_controller import AnimationController
+from src.modules.animations.clips import ClipCache, CLIP_HEADER
+from src.modules.utils.bitmap import LAYOUT_MSB
+
+
+class TestAnimationClips(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.anim = AnimationController()
+        self.anim.clip_cache = ClipCache(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_clip_is_reproducible_and_cached(self):
+        clip = self.anim.compile_animation('rain', duration=2.0, fps=10, seed=3)
+        self.assertTrue(clip.mapped)
+        self.assertIsInstance(clip.bitmaps, np.memmap)
+        self.assertEqual((clip.frame_count, clip.width), (20, 64))
+        self.assertEqual(self.anim.clip_cache.misses, 1)
+
+        # Un autre contrôleur (nouvelle exécution) relit le même fichier sans rien recalculer
+        other = AnimationController()
+        other.clip_cache = ClipCache(self.tmp.name)
+        again = other.compile_animation('rain', duration=2.0, fps=10, seed=3)
+        self.assertEqual((other.clip_cache.hits, other.clip_cache.misses), (1, 0))
+        self.assertEqual(again.path, clip.path)
+
+        # Recompiler sans cache donne les mêmes bytes
+        self.anim.clip_cache.clear()
+        fresh = self.anim.compile_animation('rain', duration=2.0, fps=10, seed=3)
+        self.assertEqual(bytes(fresh.bitmaps), bytes(again.bitmaps))
+        self.assertNotEqual(self.anim.compile_animation('rain', duration=2.0, fps=10, seed=4).path, clip.path)
+
+    def test_frames_match_live_rendering(self):
+        clip = self.anim.compile_animation('fire', duration=1.0, fps=10, seed=9)
+        live = self.anim.create_fire_animation(seed=9)
+        for index in range(clip.frame_count):
+            bitmap, colors = clip.frame(index)
+            self.assertEqual(bytes(bitmap), bytes(live(index / 10).to_wire()))
+            self.assertEqual(bytes(colors), self.anim.encode_white_color_array_for_mask(64))
+
+    def test_clip_follows_controller_layout(self):
+        lsb = self.anim.compile_animation('fire', duration=0.5, fps=10, seed=9)
+        self.anim.bitmap_layout = LAYOUT_MSB
+        msb = self.anim.compile_animation('fire', duration=0.5, fps=10, seed=9)
+        # Disposition dans l'empreinte et dans l'en-tête : deux fichiers distincts
+        self.assertNotEqual(msb.path, lsb.path)
+        self.assertEqual(self.anim.clip_cache.misses, 2)
+        live = self.anim.create_fire_animation(seed=9)
+        for index in range(msb.frame_count):
+            self.assertEqual(bytes(msb.frame(index)[0]), bytes(live(index / 10).to_wire(LAYOUT_MSB)))
+
+        other = AnimationController()
+        other.clip_cache = ClipCache(self.tmp.name)
+        other.bitmap_layout = LAYOUT_MSB
+        self.assertEqual(other.compile_animation('fire', duration=0.5, fps=10, seed=9).layout, LAYOUT_MSB)
+
+    async def test_play_uses_controller_layout(self):
+        self.anim.bitmap_layout = LAYOUT_MSB
+        clip = self.anim.clip_cache.get_or_compile('fire', lambda: self.anim.create_fire_animation(seed=2),
+                                                   0.1, 100, {'seed': 2})
+        live = self.anim.create_fire_animation(seed=2)
+        sent = []
+
+        async def upload_frame(bitmap, color_array):
+            sent.append(bytes(bitmap))
+            return True
+
+        self.anim.upload_frame = upload_frame
+        # Clip LSB joué sur un masque MSB : converti à l'envoi
+        await self.anim.play_clip(clip)
+        self.assertEqual(sent[0], bytes(live(0).to_wire(LAYOUT_MSB)))
+
+        sent.clear()
+        await self.anim.play_animation(self.anim.create_fire_animation(seed=2), duration=0.05)
+        self.assertGreater(len(sent), 0)
+        self.assertEqual(sent[0], bytes(self.anim.create_fire_animation(seed=2)(0).to_wire(LAYOUT_MSB)))
+
+    def test_corrupt_cache_file_is_recompiled(self):
+        clip = self.anim.compile_animation('wave', duration=0.5, fps=10)
+        expected = bytes(clip.bitmaps)
+        with open(clip.path, 'r+b') as f:
+            f.truncate(CLIP_HEADER.size + 10)
+        clip = self.anim.compile_animation('wave', duration=0.5, fps=10)
+        self.assertEqual(self.anim.clip_cache.misses, 2)
+        self.assertEqual(bytes(clip.bitmaps), expected)
+
+    async def test_play_clip_streams_encoded_frames(self):
+        clip = self.anim.compile_animation('matrix', duration=0.5, fps=100, seed=1)
+        sent = []
+
+        async def upload_frame(bitmap, color_array):
+            sent.append(bytes(bitmap) + bytes(color_array))
+            return True
+
+        self.anim.upload_frame = upload_frame
+        await self.anim.play_clip(clip)
+        self.assertGreater(len(sent), 0)
+        for index, payload in enumerate(sent):
+            bitmap, colors = clip.frame(index % clip.frame_count)
+            self.assertEqual(payload, bytes(bitmap) + bytes(colors))
+
+
+if __name__ == "__main__":
+    unittest.main()
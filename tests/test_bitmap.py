@@ -0,0 +1,150 @@
+import importlib.util
+import os
+import random
+import struct
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "final_bot_v1"))
+sys.path.insert(0, ROOT)
+
+import mask_raster
+from scrolling_text_controller import ScrollingMaskController
+from src.modules.core.base_controller import BaseMaskController
+from src.modules.utils import image_utils
+from src.modules.utils.bitmap import (LAYOUT_LSB, LAYOUT_MSB, encode_bitmap, decode_bitmap,
+                                      convert_layout)
+from src.modules.utils.frame import Frame
+
+
+def load_script(name, path):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# --- Encodeurs d'origine, recopiés tels quels ---------------------------------
+
+def legacy_mask_go(bitmap):
+    """ScrollingMaskController.encode_bitmap_for_mask (src/working)"""
+    bit_mapping = {0: 128, 1: 64, 2: 32, 3: 16, 4: 8, 5: 4, 6: 2, 7: 1,
+                   8: 32768, 9: 16384, 10: 8192, 11: 4096, 12: 2048, 13: 1024, 14: 512, 15: 256}
+    results = bytearray()
+    for column in bitmap:
+        val = 0
+        for j, pixel in enumerate(column):
+            if pixel == 1 and j in bit_mapping:
+                val |= bit_mapping[j]
+        results.extend(struct.pack('<H', val))
+    return bytes(results)
+
+
+def legacy_complete_text(bitmap):
+    """MaskTextDisplay.encode_bitmap (complete_text_display.py)"""
+    encoded = bytearray()
+    for column in bitmap:
+        val = 0
+        for j, pixel in enumerate(column[:16]):
+            if pixel == 1:
+                val |= (1 << j)
+        encoded.extend(struct.pack('<H', val))
+    return bytes(encoded)
+
+
+def legacy_frame_to_bitmap(frame):
+    """image_utils.frame_to_bitmap"""
+    results = bytearray()
+    for column in frame:
+        byte1 = byte2 = 0
+        for y in range(8):
+            if y < len(column) and column[y] == 1:
+                byte1 |= (1 << y)
+        for y in range(8, 16):
+            if y < len(column) and column[y] == 1:
+                byte2 |= (1 << (y - 8))
+        results.extend([byte1, byte2])
+    return bytes(results)
+
+
+def legacy_base(pixel_map):
+    """BaseMaskController.encode_bitmap_for_mask (colonnes d'au moins 8 lignes)"""
+    results = bytearray()
+    for column in pixel_map:
+        byte1 = byte2 = 0
+        for y in range(8):
+            if column[y] == 1:
+                byte1 |= (1 << y)
+        for y in range(8, 16):
+            if y < len(column) and column[y] == 1:
+                byte2 |= (1 << (y - 8))
+        results.extend([byte1, byte2])
+    return bytes(results)
+
+
+def random_map(rnd, ragged=False, values=(0, 1)):
+    width = rnd.randint(0, 80)
+    columns = []
+    for _ in range(width):
+        height = rnd.randint(0, 20) if ragged else 16
+        columns.append([rnd.choice(values) for _ in range(height)])
+    return columns
+
+
+class TestBitmapEncoder(unittest.TestCase):
+
+    def setUp(self):
+        self.rnd = random.Random(1234)
+        self.working = load_script("working_scrolling_text_controller", "src/working/scrolling_text_controller.py")
+        self.complete = load_script("working_complete_text_display", "src/working/complete_text_display.py")
+
+    def maps(self, count=150, **kwargs):
+        return [random_map(self.rnd, **kwargs) for _ in range(count)]
+
+    def test_matches_legacy_encoders(self):
+        base = BaseMaskController()
+        for pixel_map in self.maps(values=(0, 1, 1, 2, True)):
+            self.assertEqual(encode_bitmap(pixel_map, LAYOUT_LSB), legacy_base(pixel_map))
+            self.assertEqual(base.encode_bitmap_for_mask(pixel_map), legacy_base(pixel_map))
+
+        working = self.working.ScrollingMaskController()
+        complete = self.complete.MaskTextDisplay()
+        final = ScrollingMaskController()
+        for pixel_map in self.maps(ragged=True, values=(0, 1, 1, 2, True)):
+            mask_go = legacy_mask_go(pixel_map)
+            self.assertEqual(encode_bitmap(pixel_map, LAYOUT_MSB), mask_go)
+            self.assertEqual(mask_raster.encode_bitmap(pixel_map, LAYOUT_MSB), mask_go)
+            self.assertEqual(final.encode_bitmap_for_mask(pixel_map), mask_go)
+
+            lsb = legacy_complete_text(pixel_map)
+            self.assertEqual(legacy_frame_to_bitmap(pixel_map), lsb)
+            self.assertEqual(encode_bitmap(pixel_map, LAYOUT_LSB), lsb)
+            self.assertEqual(mask_raster.encode_bitmap(pixel_map, LAYOUT_LSB), lsb)
+            self.assertEqual(image_utils.frame_to_bitmap(pixel_map), lsb)
+            self.assertEqual(image_utils.frame_to_bitmap(Frame.from_columns(pixel_map)), lsb)
+            self.assertEqual(complete.encode_bitmap(pixel_map), lsb)
+
+        quiet = [[self.rnd.choice((0, 1)) for _ in range(16)] for _ in range(40)]
+        self.assertEqual(working.encode_bitmap_for_mask(quiet), legacy_mask_go(quiet))
+
+    def test_layout_conversion_and_decode(self):
+        for pixel_map in self.maps(count=50):
+            lsb = encode_bitmap(pixel_map, LAYOUT_LSB)
+            msb = encode_bitmap(pixel_map, LAYOUT_MSB)
+            self.assertEqual(convert_layout(lsb, LAYOUT_LSB, LAYOUT_MSB), msb)
+            self.assertEqual(convert_layout(msb, LAYOUT_MSB, LAYOUT_LSB), lsb)
+            self.assertEqual(decode_bitmap(msb, LAYOUT_MSB), pixel_map)
+            self.assertEqual(mask_raster.decode_bitmap(lsb, LAYOUT_LSB), pixel_map)
+            self.assertEqual(bytes(Frame.from_columns(pixel_map).to_wire(LAYOUT_MSB)), msb)
+
+            words = mask_raster.pack_columns(mask_raster.pixels_to_grid(pixel_map).T)
+            self.assertEqual(mask_raster.columns_to_wire(words, LAYOUT_MSB), msb)
+            self.assertEqual(mask_raster.columns_to_wire(words, LAYOUT_LSB), lsb)
+
+        with self.assertRaises(ValueError):
+            encode_bitmap([[1] * 16], 'rgb')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.modules.animations.color_timeline import ColorTimeline, WriteRate, color_preset
+from src.modules.animations.stable_animation_controller import StableAnimationController
+from src.modules.core.simulator import SimulatedMaskClient
+from src.modules.utils.image_utils import hsv_to_rgb
+
+
+class TestColorTimeline(unittest.TestCase):
+
+    def test_hsv_keyframes_are_interpolated_and_looped(self):
+        wave = color_preset("wave")
+        self.assertEqual(wave.color_at(0.0), (255, 0, 0))
+        self.assertEqual(wave.color_at(2.4), hsv_to_rgb(120, 1.0, 1.0))
+        self.assertEqual(wave.color_at(4.8), hsv_to_rgb(240, 1.0, 1.0))
+        self.assertEqual(wave.color_at(7.2 + 2.4), wave.color_at(2.4))
+
+        fade = ColorTimeline([(0, (0, 0, 0)), (1, (0, 0, 1))], loop=False)
+        self.assertEqual(fade.color_at(0.5), hsv_to_rgb(0, 0, 0.5))
+        self.assertEqual(fade.color_at(5.0), (255, 255, 255))
+
+    def test_presets_are_reproducible(self):
+        for name in ("pulse", "wave", "fire", "rain", "matrix"):
+            self.assertEqual(color_preset(name).table.tobytes(), color_preset(name).table.tobytes(), name)
+        self.assertIsNone(color_preset("plasma"))
+
+
+class TestColorAnimation(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.client = SimulatedMaskClient(write_latency=0.02)
+        await self.client.connect()
+        self.anim = StableAnimationController()
+        self.anim.client = self.client
+
+    async def test_rate_follows_write_completions(self):
+        await self.anim.play_simple_animation("wave", duration=0.6)
+
+        stats = self.anim.last_pacing
+        # Écritures de 20 ms : environ 50 couleurs/s, pas plus
+        self.assertAlmostEqual(stats['interval_ms'], 20, delta=8)
+        self.assertGreater(stats['effective_rate'], 25)
+        self.assertLess(stats['effective_rate'], 55)
+        self.assertEqual(self.client.commands.count("FC"), stats['written'] + 1)
+        self.assertEqual(self.client.foreground, (255, 255, 255))
+
+    async def test_rate_tracks_slower_link(self):
+        # Écritures acquittées en 60 ms : la cadence n'est pas bloquée au plancher de 20 ms
+        self.client.write_latency = 0.06
+        await self.anim.play_simple_animation("wave", duration=0.6)
+
+        stats = self.anim.last_pacing
+        self.assertAlmostEqual(stats['interval_ms'], 60, delta=15)
+        self.assertLess(stats['effective_rate'], 20)
+
+    async def test_saturated_link_drops_intermediate_colors(self):
+        self.client.write_latency = 0.05
+        # Cadence forcée bien plus rapide que le lien
+        self.anim.write_rate = WriteRate(min_interval=0.005, max_interval=0.005)
+        timeline = ColorTimeline([(0, (0, 1, 1)), (0.5, (360, 1, 1))])
+        await self.anim.play_timeline(timeline, duration=0.5)
+
+        stats = self.anim.last_pacing
+        self.assertGreater(stats['dropped'], stats['written'])
+        self.assertLessEqual(stats['written'], 0.5 / 0.05 + 2)
+        self.assertEqual(stats['written'] + stats['dropped'], stats['submitted'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import math
+import os
+import random
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.modules.animations.animation_controller import AnimationController
+from src.modules.utils.frame import Frame
+from src.modules.utils import image_utils
+
+
+def random_columns(width=64, seed=0):
+    rnd = random.Random(seed)
+    return [[1 if rnd.random() < 0.3 else 0 for _ in range(16)] for _ in range(width)]
+
+
+def legacy_empty():
+    return [[0 for _ in range(16)] for _ in range(64)]
+
+
+class TestFrame(unittest.TestCase):
+
+    def setUp(self):
+        self.anim = AnimationController()
+
+    def test_wire_matches_legacy_encoder(self):
+        for seed in range(5):
+            columns = random_columns(seed=seed)
+            frame = Frame.from_columns(columns)
+            self.assertEqual(bytes(frame.to_wire()), self.anim.encode_bitmap_for_mask(columns))
+            self.assertEqual(image_utils.frame_to_bitmap(frame), image_utils.frame_to_bitmap(columns))
+            self.assertEqual(frame.to_columns(), columns)
+            self.assertEqual(Frame.from_wire(frame.to_wire()), frame)
+
+    def test_to_wire_is_a_view(self):
+        frame = Frame()
+        wire = frame.to_wire()
+        frame.set_pixel(0, 9)
+        self.assertEqual(bytes(wire[:2]), b"\x00\x02")
+        self.assertEqual(len(wire), 128)
+
+    def test_drawing_matches_legacy(self):
+        shapes = [
+            ('draw_circle', (32, 8, 6)), ('draw_circle', (5, 3, 9)),
+            ('draw_line', (0, 0, 63, 0)), ('draw_line', (3, 15, 3, 0)),
+            ('draw_line', (10, 2, 20, 12)), ('draw_line', (40, 12, 30, 2)),
+        ]
+        for name, args in shapes:
+            legacy = legacy_empty()
+            getattr(self.anim, name)(legacy, *args)
+            frame = self.anim.create_empty_frame()
+            getattr(self.anim, name)(frame, *args)
+            self.assertEqual(frame.to_columns(), legacy, (name, args))
+
+        columns = random_columns(seed=7)
+        for t in (0.0, 1.3, 4.2):
+            legacy = self.anim.apply_wave_effect(columns, t)
+            self.assertEqual(self.anim.apply_wave_effect(Frame.from_columns(columns), t).to_columns(), legacy)
+
+    def test_generators_match_legacy(self):
+        for t in (0.0, 0.7, 1.9):
+            pulse = self.anim.create_pulse_animation()(t)
+            intensity = (math.sin(t * math.pi / 2.0) + 1) / 2
+            size = int(10 * intensity) + 5
+            expected = legacy_empty()
+            for x in range(max(0, 32 - size), min(64, 32 + size)):
+                for y in range(max(0, 8 - size // 2), min(16, 8 + size // 2)):
+                    expected[x][y] = 1
+            self.assertEqual(pulse.to_columns(), expected)
+
+            wave = self.anim.create_wave_animation()(t)
+            expected = legacy_empty()
+            for x in range(64):
+                expected[x][int(8 + 4 * math.sin(t + x * 0.2))] = 1
+                expected[x][int(8 + 2 * math.sin(t * 1.5 + x * 0.3 + math.pi))] = 1
+            self.assertEqual(wave.to_columns(), expected)
+
+        fire = self.anim.create_fire_animation()(0.0)
+        # Pas de flamme au-dessus de 12 lignes de haut
+        self.assertFalse(any(fire.get_pixel(x, y) for x in range(64) for y in range(4)))
+
+    def test_image_utils_helpers(self):
+        a, b = random_columns(seed=1), random_columns(seed=2)
+        fa, fb = Frame.from_columns(a), Frame.from_columns(b)
+        for mode in ("add", "subtract", "multiply", "or", "and", "xor", "overlay"):
+            self.assertEqual(image_utils.merge_frames(fa, fb, mode).to_columns(),
+                             image_utils.merge_frames(a, b, mode), mode)
+        for width in (10, 64, 100):
+            self.assertEqual(image_utils.resize_frame(fa, width).to_columns(), image_utils.resize_frame(a, width))
+        for start, width in ((-3, 10), (20, 8), (60, 10)):
+            self.assertEqual(image_utils.crop_frame(fa, start, width).to_columns(),
+                             image_utils.crop_frame(a, start, width))
+
+        shifted = fa.shift(dx=3, dy=-2)
+        self.assertEqual(shifted.to_columns()[:3], [[0] * 16] * 3)
+        self.assertEqual(shifted.to_columns()[3], a[0][2:] + [0, 0])
+
+        canvas = Frame(8).blit(Frame(4).fill_rect(0, 0, 4, 16), x=6, y=3)
+        self.assertEqual(canvas.to_columns()[5:], [[0] * 16] + [[0] * 3 + [1] * 13] * 2)
+
+    def test_decoded_frame_is_drawable(self):
+        source = Frame(4).set_pixel(1, 3)
+        frame = Frame.from_wire(source.to_wire())
+        frame.set_pixel(0, 0).line(0, 15, 3, 15)
+        self.assertEqual(source.to_columns()[0], [0] * 16)
+        self.assertEqual(frame.get_pixel(0, 0), 1)
+        self.assertEqual(frame.get_pixel(1, 3), 1)
+        self.assertEqual(frame.count(), 6)
+
+    def test_smaller_than_lists(self):
+        legacy = random_columns()
+        legacy_size = sys.getsizeof(legacy) + sum(sys.getsizeof(column) for column in legacy)
+        self.assertEqual(Frame.from_columns(legacy).nbytes, 128)
+        self.assertLess(128 * 10, legacy_size)
+
+if __name__ == "__main__":
+    unittest.main()
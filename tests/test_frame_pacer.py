@@ -0,0 +1,79 @@
+import asyncio
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.modules.animations.animation_controller import AnimationController
+from src.modules.animations.pacer import FramePacer
+
+
+class FakeClock:
+    """Horloge monotone avancée à la main ; sleep() fait avancer le temps"""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, delay):
+        self.now += delay
+
+
+class TestFramePacer(unittest.IsolatedAsyncioTestCase):
+
+    async def test_no_drift_when_work_fits_in_frame(self):
+        clock = FakeClock()
+        pacer = FramePacer(10, clock=clock, sleep=clock.sleep)
+        for expected in range(50):
+            self.assertEqual(await pacer.wait_next(), expected)
+            clock.now += 0.07  # upload de 70 ms : la pause complète jusqu'à 100 ms
+            pacer.frame_done()
+
+        self.assertAlmostEqual(clock.now - pacer.start, 4.97)
+        stats = pacer.stats()
+        self.assertEqual((stats['frames'], stats['dropped']), (50, 0))
+        self.assertEqual(stats['jitter_ms'], 0.0)
+        self.assertAlmostEqual(pacer.effective_fps, 50 / 4.97, places=3)
+
+    async def test_skips_stale_frames_when_link_is_slow(self):
+        clock = FakeClock()
+        pacer = FramePacer(10, clock=clock, sleep=clock.sleep)
+        indexes = []
+        while pacer.elapsed < 3.0:
+            indexes.append(await pacer.wait_next())
+            clock.now += 0.25  # le lien ne suit pas : 4 frames par seconde
+            pacer.frame_done()
+
+        # Une frame sur 2 ou 3 est sautée, aucune n'est rattrapée en rafale
+        self.assertEqual(indexes, sorted(set(indexes)))
+        self.assertEqual(len(indexes), 12)
+        self.assertEqual(pacer.dropped, indexes[-1] + 1 - len(indexes))
+        self.assertAlmostEqual(pacer.effective_fps, 4.0, places=3)
+        self.assertLess(pacer.stats()['late_max_ms'], 100.0)
+
+    async def test_play_animation_reports_pacing(self):
+        anim = AnimationController()
+        anim.fps = 50
+        calls = []
+
+        async def upload_frame(bitmap, color_array):
+            calls.append(bytes(bitmap))
+            await asyncio.sleep(0.045)  # plus long que 20 ms : des frames doivent sauter
+            return True
+
+        anim.upload_frame = upload_frame
+        await anim.play_animation(anim.create_wave_animation(), duration=0.5)
+
+        stats = anim.last_pacing
+        self.assertEqual(stats['frames'], len(calls))
+        self.assertGreater(stats['dropped'], 0)
+        self.assertLess(stats['effective_fps'], 30)
+        self.assertGreater(stats['effective_fps'], 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
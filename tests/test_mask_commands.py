@@ -0,0 +1,75 @@
+import asyncio
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "final_bot_v1"))
+
+from mask_commands import CommandQueue, coalesce_key
+from mask_controller import MaskTextDisplay
+from mask_simulator import SimulatedMaskClient
+
+
+def light(value):
+    return bytes([6]) + b"LIGHT" + bytes([value])
+
+
+class TestCommandQueue(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.written = []
+
+        async def write(data):
+            await asyncio.sleep(0.01)  # aller-retour BLE
+            self.written.append(data)
+
+        self.queue = CommandQueue(write)
+
+    def test_coalesce_keys(self):
+        self.assertEqual(coalesce_key(light(5)), "LIGHT")
+        self.assertEqual(coalesce_key(bytes([5]) + b"ANIM" + bytes([3])), "display")
+        self.assertEqual(coalesce_key(bytes([6]) + b"PLAY" + bytes([1, 2])), "display")
+        self.assertIsNone(coalesce_key(bytes([9]) + b"DATS" + bytes(5)))
+        self.assertIsNone(coalesce_key(b"SAVE01"))
+
+    async def test_slider_drag_keeps_latest_value(self):
+        await asyncio.gather(*(self.queue.send(light(v)) for v in range(50)))
+        self.assertLessEqual(len(self.written), 3)
+        self.assertEqual(self.written[-1], light(49))
+
+    async def test_barrier_keeps_upload_order(self):
+        dats = bytes([9]) + b"DATS" + bytes(5)
+        datcp = bytes([5]) + b"DATCP"
+        await asyncio.gather(
+            self.queue.send(light(1)),
+            self.queue.send(dats),
+            self.queue.send(light(2)),
+            self.queue.send(datcp),
+        )
+        self.assertEqual(self.written, [light(1), dats, light(2), datcp])
+
+    async def test_write_error_reaches_every_waiter(self):
+        async def broken(data):
+            raise RuntimeError("Non connecté au masque")
+
+        queue = CommandQueue(broken)
+        results = await asyncio.gather(queue.send(light(1)), queue.send(light(2)), return_exceptions=True)
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in results))
+
+
+class TestControllerCoalescing(unittest.IsolatedAsyncioTestCase):
+
+    async def test_brightness_slider_on_simulated_mask(self):
+        client = SimulatedMaskClient(latency=0.001, write_latency=0.02)
+        mask = MaskTextDisplay(client=client)
+        await mask.connect()
+
+        await asyncio.gather(*(mask.set_brightness(v) for v in range(0, 101, 2)))
+        self.assertLess(client.commands.count("LIGHT"), 5)
+        self.assertEqual(client.brightness, 100)
+        self.assertEqual(mask.desired_state["LIGHT"][-1], 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
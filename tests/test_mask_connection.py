@@ -0,0 +1,91 @@
+import os
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "final_bot_v1"))
+
+import mask_connection
+from mask_connection import MaskConnector
+from mask_simulator import SimulatedMaskClient
+from scrolling_text_controller import ScrollingMaskController, COMMAND_UUID, UPLOAD_UUID, NOTIFY_UUID
+
+UUIDS = (COMMAND_UUID, UPLOAD_UUID, NOTIFY_UUID)
+
+
+class FakeBleakClient:
+    """BleakClient minimal : adresse, connexion (qui peut échouer) et table GATT"""
+
+    reachable = True
+    created = []
+
+    def __init__(self, address_or_device, timeout=10.0, services=None):
+        self.address = getattr(address_or_device, 'address', address_or_device)
+        self.services_filter = services
+        self.services = []
+        FakeBleakClient.created.append(self)
+
+    async def connect(self):
+        if not FakeBleakClient.reachable:
+            raise TimeoutError("device not found")
+        characteristics = [SimpleNamespace(uuid=uuid, handle=10 + i) for i, uuid in enumerate(UUIDS)]
+        self.services = [SimpleNamespace(uuid="d44bc439-abfd-45a2-b575-925416129000",
+                                         characteristics=characteristics)]
+
+    async def disconnect(self):
+        pass
+
+
+class TestMaskConnector(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.tmp.name, "mask_device.json")
+        FakeBleakClient.reachable = True
+        FakeBleakClient.created = []
+        device = SimpleNamespace(name="MASK-3B9D97", address="AA:BB:CC:DD:EE:FF")
+        self.scan = mock.AsyncMock(return_value=device)
+        patcher = mock.patch.object(mask_connection.BleakScanner, 'find_device_by_filter', self.scan)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+
+    def connector(self):
+        return MaskConnector("MASK", UUIDS, cache_path=self.cache_path, client_class=FakeBleakClient)
+
+    async def test_scan_then_direct(self):
+        first = self.connector()
+        await first.connect()
+        self.assertEqual(first.method, 'scan')
+        self.assertEqual(self.scan.await_count, 1)
+
+        second = self.connector()
+        client = await second.connect()
+        self.assertEqual(second.method, 'direct')
+        self.assertEqual(client.address, "AA:BB:CC:DD:EE:FF")
+        self.assertEqual(client.services_filter, ["d44bc439-abfd-45a2-b575-925416129000"])
+        self.assertEqual(self.scan.await_count, 1)
+
+    async def test_falls_back_to_scan(self):
+        await self.connector().connect()
+        FakeBleakClient.reachable = False
+        with self.assertRaises(TimeoutError):
+            await self.connector().connect()
+        self.assertEqual(self.scan.await_count, 2)
+
+    async def test_first_command_metric(self):
+        client = SimulatedMaskClient(latency=0.001)
+        mask = ScrollingMaskController(client=client)
+        await mask.connect()
+        self.assertIsNone(mask.connector.stats()['first_command_s'])
+        await mask.set_brightness(50)
+        stats = mask.connector.stats()
+        self.assertEqual(stats['method'], 'injected')
+        self.assertGreaterEqual(stats['first_command_s'], stats['connect_s'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import asyncio
+import os
+import sys
+import time
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "final_bot_v1"))
+
+from mask_controller import MaskTextDisplay
+from mask_scheduler import (DisplayScheduler, PRIORITY_ALERT, PRIORITY_SAY, PRIORITY_VAD,
+                            PRIORITY_IDLE)
+from mask_simulator import SimulatedMaskClient
+
+
+class TestDisplayScheduler(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.shown = []
+        self.idle = 0
+
+        async def on_idle():
+            self.idle += 1
+
+        self.scheduler = DisplayScheduler(on_idle=on_idle, min_hold=0.05)
+
+    async def asyncTearDown(self):
+        await self.scheduler.stop()
+
+    def job(self, name, hold=None, delay=0.0):
+        async def run():
+            if delay:
+                await asyncio.sleep(delay)
+            self.shown.append(name)
+            return hold
+        return run
+
+    async def test_priority_order(self):
+        release = asyncio.Event()
+
+        async def blocking():
+            await release.wait()
+
+        self.scheduler.submit(blocking, PRIORITY_IDLE)
+        await asyncio.sleep(0)
+        futures = [
+            self.scheduler.submit(self.job("idle"), PRIORITY_IDLE),
+            self.scheduler.submit(self.job("say"), PRIORITY_SAY),
+            self.scheduler.submit(self.job("alert"), PRIORITY_ALERT),
+        ]
+        release.set()
+        await asyncio.gather(*futures)
+        self.assertEqual(self.shown, ["alert", "say", "idle"])
+
+    async def test_duplicate_alerts_are_shown_once(self):
+        futures = [self.scheduler.submit(self.job("merci", hold=0.2), PRIORITY_ALERT, key="merci")
+                   for _ in range(5)]
+        self.assertEqual(await asyncio.gather(*futures), [True] * 5)
+        # Pendant l'affichage : déjà à l'écran
+        self.assertTrue(await self.scheduler.submit(self.job("merci"), PRIORITY_ALERT, key="merci"))
+        self.assertEqual(self.shown, ["merci"])
+        self.assertEqual(self.scheduler.stats()['coalesced'], 5)
+
+    async def test_stale_vad_frames_are_dropped(self):
+        first = self.scheduler.submit(self.job("alert", hold=0.3), PRIORITY_ALERT)
+        await first
+        face = self.scheduler.submit(self.job("face"), PRIORITY_VAD, max_wait=0.05)
+        self.assertFalse(await face)
+        self.assertEqual(self.shown, ["alert"])
+        self.assertEqual(self.scheduler.stats()['dropped_stale'], 1)
+
+    async def test_hold_is_cut_short_when_messages_wait(self):
+        start = time.monotonic()
+        await self.scheduler.submit(self.job("first", hold=10.0), PRIORITY_ALERT)
+        await self.scheduler.submit(self.job("second", hold=0.01), PRIORITY_ALERT)
+        self.assertLess(time.monotonic() - start, 1.0)
+        await asyncio.sleep(0.1)
+        self.assertEqual(self.idle, 1)
+
+    async def test_queue_depth_is_bounded(self):
+        scheduler = DisplayScheduler(max_pending={PRIORITY_ALERT: 3})
+        release = asyncio.Event()
+
+        async def blocking():
+            await release.wait()
+
+        scheduler.submit(blocking, PRIORITY_SAY)
+        await asyncio.sleep(0)
+        futures = [scheduler.submit(self.job(f"follow {i}"), PRIORITY_ALERT) for i in range(10)]
+        self.assertEqual(scheduler.stats()['depth']['alert'], 3)
+        release.set()
+        results = await asyncio.gather(*futures)
+        self.assertEqual(results, [False] * 7 + [True] * 3)
+        self.assertEqual(self.shown, ["follow 7", "follow 8", "follow 9"])
+        await scheduler.stop()
+
+
+class TestUploadPreemption(unittest.IsolatedAsyncioTestCase):
+
+    async def test_alert_interrupts_idle_upload_between_packets(self):
+        client = SimulatedMaskClient(latency=0.001, link_bytes_per_s=20000)
+        mask = MaskTextDisplay(client=client)
+        await mask.connect()
+        scheduler = DisplayScheduler(interrupt_target=mask)
+        order = []
+
+        async def idle_face():
+            order.append("face")
+            await mask.set_scrolling_text("LONG IDLE FACE TEXT", scroll_mode='steady')
+
+        async def alert():
+            order.append("alert")
+            await mask.set_animation(5)
+
+        face = scheduler.submit(idle_face, PRIORITY_IDLE)
+        await asyncio.sleep(0.1)
+        self.assertTrue(await scheduler.submit(alert, PRIORITY_ALERT))
+        self.assertTrue(await face)
+
+        self.assertEqual(order, ["face", "alert", "face"])
+        self.assertEqual(scheduler.stats()['preempted'], 1)
+        self.assertEqual(client.display, ('text',))
+        await scheduler.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
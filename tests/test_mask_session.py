@@ -0,0 +1,136 @@
+import asyncio
+import os
+import sys
+import threading
+import unittest
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "mask_editor"))
+
+from mask_session import MaskSession, SessionBusy
+
+
+class FakeUploader:
+    """Uploader minimal : connexion comptée, client qui peut tomber"""
+
+    connects = 0
+
+    def __init__(self):
+        self.client = None
+
+    async def connect(self):
+        FakeUploader.connects += 1
+        self.client = type("Client", (), {"is_connected": True})()
+
+    async def disconnect(self):
+        self.client = None
+
+
+class TestMaskSession(unittest.TestCase):
+
+    def setUp(self):
+        FakeUploader.connects = 0
+        self.session = MaskSession(FakeUploader, max_pending=2)
+        self.addCleanup(self.session.close)
+
+    def test_connection_is_shared(self):
+        async def job(mask):
+            return id(mask)
+
+        first = self.session.run('preview', job, timeout=5)
+        second = self.session.run('preview', job, timeout=5)
+        self.assertEqual(first, second)
+        self.assertEqual(FakeUploader.connects, 1)
+
+    def test_pending_frames_are_coalesced(self):
+        release = threading.Event()
+        uploaded = []
+
+        async def blocking(mask):
+            while not release.is_set():
+                await asyncio.sleep(0.01)
+            return "first"
+
+        def frame(n):
+            async def job(mask):
+                uploaded.append(n)
+                return n
+            return job
+
+        running = self.session.submit('preview', blocking)
+        while self.session.stats()["pending"]:
+            pass  # attendre que le premier job ait démarré
+        futures = [self.session.submit('preview', frame(n)) for n in range(5)]
+        release.set()
+
+        self.assertEqual(running.result(timeout=5), "first")
+        self.assertEqual([f.result(timeout=5) for f in futures[:-1]], [{"coalesced": True}] * 4)
+        self.assertEqual(futures[-1].result(timeout=5), 4)
+        self.assertEqual(uploaded, [4])
+        self.assertIn('preview', self.session.stats()["last_latency_ms"])
+
+    def test_queue_is_bounded(self):
+        release = threading.Event()
+
+        async def blocking(mask):
+            while not release.is_set():
+                await asyncio.sleep(0.01)
+
+        self.session.submit('a', blocking)
+        while self.session.stats()["pending"]:
+            pass
+        self.session.submit('b', blocking)
+        self.session.submit('c', blocking)
+        with self.assertRaises(SessionBusy):
+            self.session.submit('d', blocking)
+        release.set()
+
+    def test_failed_job_reconnects_once(self):
+        calls = []
+
+        async def flaky(mask):
+            calls.append(mask)
+            if len(calls) == 1:
+                raise ConnectionError("link lost")
+            return "ok"
+
+        self.assertEqual(self.session.run('preview', flaky, timeout=5), "ok")
+        self.assertEqual(FakeUploader.connects, 2)
+        self.assertEqual(self.session.stats()["reconnects"], 1)
+
+    def test_concurrent_first_requests(self):
+        async def job(mask):
+            return "ok"
+
+        set_event_loop = asyncio.set_event_loop
+
+        def slow_start(loop):
+            # Élargit la fenêtre entre le démarrage du thread et la boucle prête
+            threading.Event().wait(0.05)
+            set_event_loop(loop)
+
+        barrier = threading.Barrier(2)
+        results, errors = [], []
+
+        def request():
+            barrier.wait()
+            try:
+                results.append(self.session.run('preview', job, timeout=5))
+            except Exception as e:
+                errors.append(e)
+
+        with mock.patch("mask_session.asyncio.set_event_loop", slow_start):
+            threads = [threading.Thread(target=request) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(5)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(results), 2)
+        self.assertEqual(FakeUploader.connects, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
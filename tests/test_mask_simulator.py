@@ -0,0 +1,116 @@
+import asyncio
+import os
+import sys
+import time
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "final_bot_v1"))
+sys.path.insert(0, ROOT)
+
+from mask_simulator import SimulatedMaskClient
+from mask_controller import MaskTextDisplay
+from mask_upload import WindowedUpload
+from scrolling_text_controller import ScrollingMaskController
+from src.modules.core.base_controller import BaseMaskController
+from src.modules.core.simulator import SimulatedMaskClient as CoreSimulatedMaskClient
+
+
+class TestSimulatedMask(unittest.IsolatedAsyncioTestCase):
+
+    async def test_scrolling_text_reaches_mask(self):
+        client = SimulatedMaskClient(latency=0.001)
+        mask = ScrollingMaskController(client=client)
+        await mask.connect()
+
+        await mask.set_scrolling_text("HELLO", scroll_mode='scroll_left', speed=80)
+
+        columns = mask.get_text_columns("HELLO")
+        self.assertEqual(client.text_bitmap, mask.encode_bitmap_for_mask(columns))
+        self.assertEqual(len(client.text_colors), 3 * len(columns))
+        self.assertEqual((client.mode, client.speed), (3, 80))
+        self.assertEqual(client.display, ('text',))
+
+    async def test_display_commands(self):
+        client = SimulatedMaskClient(latency=0.001)
+        mask = MaskTextDisplay(client=client)
+        await mask.connect()
+
+        await mask.set_text_front_color((10, 20, 30))
+        await mask.set_brightness(70)
+        await mask.set_animation(18)
+        self.assertEqual(client.foreground, (10, 20, 30))
+        self.assertEqual(client.brightness, 70)
+        self.assertEqual(client.display, ('anim', 18))
+
+        image = bytes(range(256)) * 31 + bytes(68)
+        await mask.upload_raw_rgb(image, image_index=5, save=True)
+        self.assertEqual(client.diy_slots[(1, 5)], image)
+
+        await mask.set_diy_image(5)
+        self.assertEqual(client.display, ('diy', (1, 5)))
+        self.assertEqual(client.commands[-1], "PLAY")
+
+    async def test_chunks_follow_mtu(self):
+        client = SimulatedMaskClient(latency=0.001, mtu=50)
+        mask = ScrollingMaskController(client=client)
+        await mask.connect()
+        self.assertEqual(mask.link.chunk_size, 50 - 3 - 2)
+
+        await mask.set_scrolling_text("MTU", scroll_mode='steady')
+        self.assertEqual(client.uploads_completed, 1)
+
+    async def test_upload_survives_packet_loss(self):
+        client = SimulatedMaskClient(latency=0.001, loss=0.1, seed=3)
+        mask = ScrollingMaskController(client=client)
+        await mask.connect()
+        payload = bytes(i & 0xFF for i in range(3000))
+
+        await mask.init_upload(payload[:1000], payload[1000:])
+        engine = WindowedUpload(mask, window=4, ack_timeout=0.05, max_retries=10)
+        await engine.run()
+        await mask.finish_upload()
+        await mask.wait_for_response("DATCPOK", timeout=1.0)
+
+        self.assertGreater(client.dropped_packets, 0)
+        self.assertEqual(client.text_bitmap + client.text_colors, payload)
+
+    async def test_base_controller_uses_injected_client(self):
+        client = CoreSimulatedMaskClient(latency=0.001)
+        mask = BaseMaskController(client=client)
+        self.assertTrue(await mask.connect())
+
+        await mask.set_mode('blink')
+        await mask.send_command(bytearray([9]) + b"DATS" + bytes([0, 4, 0, 2, 0]))
+        self.assertEqual(await mask.wait_for_response("DATSOK", timeout=1.0), "DATSOK")
+        self.assertEqual(client.mode, 2)
+
+
+class TestUploadRegression(unittest.IsolatedAsyncioTestCase):
+    """Débit d'upload sur lien simulé : garde-fou contre le retour des sleeps fixes"""
+
+    async def _upload_time(self, pacing):
+        client = SimulatedMaskClient(latency=0.005, link_bytes_per_s=50000)
+        mask = ScrollingMaskController(client=client)
+        await mask.connect()
+        mask.set_pacing(pacing)
+        payload = bytes(8004)
+
+        start = time.perf_counter()
+        await mask.init_upload(payload[:4002], payload[4002:])
+        await mask.upload_all_parts()
+        await mask.finish_upload()
+        await mask.wait_for_response("DATCPOK", timeout=3.0)
+        return time.perf_counter() - start
+
+    async def test_fast_preset_throughput(self):
+        elapsed = await self._upload_time('fast')
+        # ~84 paquets : l'ancien stop-and-wait avec 200 ms par paquet prenait ~20 s
+        self.assertLess(elapsed, 3.0)
+
+    async def test_fast_beats_safe(self):
+        self.assertLess(await self._upload_time('fast'), await self._upload_time('safe'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "final_bot_v1"))
+
+from main import MaskCoordinator
+from mask_scheduler import PRIORITY_ALERT
+from mask_simulator import SimulatedMaskClient
+
+
+class TestLinkSupervisor(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.client = SimulatedMaskClient(latency=0.001)
+        self.coordinator = MaskCoordinator()
+        self.coordinator.mask.injected_client = self.client
+        self.coordinator.mask.connector.cache = None
+        self.coordinator.slots.manifest_path = os.path.join(self.tmp.name, "diy_slots.json")
+        self.coordinator.supervisor.poll_interval = 0.02
+        self.coordinator.supervisor.backoff_initial = 0.01
+
+    async def asyncTearDown(self):
+        await self.coordinator.disconnect()
+        self.tmp.cleanup()
+
+    async def _wait_connected(self, timeout=2.0):
+        supervisor = self.coordinator.supervisor
+        for _ in range(int(timeout / 0.01)):
+            if supervisor.state == 'connected' and self.coordinator.is_connected():
+                return
+            await asyncio.sleep(0.01)
+        self.fail(f"not reconnected: {supervisor.stats()}")
+
+    async def test_reconnect_replays_state(self):
+        self.assertTrue(await self.coordinator.connect())
+        await self.coordinator.mask.set_brightness(40)
+        await self.coordinator.mask.set_text_front_color((1, 2, 3))
+        await self.coordinator.set_mode_animation(7)
+
+        self.client.drop_link(reboot=True)
+        self.assertIsNone(self.client.brightness)
+        await asyncio.sleep(0.05)
+        await self._wait_connected()
+
+        self.assertEqual(self.client.brightness, 40)
+        self.assertEqual(self.client.foreground, (1, 2, 3))
+        self.assertEqual(self.client.display, ('anim', 7))
+        stats = self.coordinator.supervisor.stats()
+        self.assertEqual((stats['outages'], stats['reconnects']), (1, 1))
+        self.assertIsNotNone(stats['mttr_s'])
+
+    async def test_backoff_until_mask_returns(self):
+        self.assertTrue(await self.coordinator.connect())
+        failures = 3
+        connect = self.client.connect
+
+        async def flaky_connect(**kwargs):
+            nonlocal failures
+            if failures:
+                failures -= 1
+                raise RuntimeError("Masque non trouvé")
+            return await connect(**kwargs)
+
+        self.client.connect = flaky_connect
+        self.client.drop_link()
+        await asyncio.sleep(0.05)
+        await self._wait_connected()
+        self.assertEqual(self.coordinator.supervisor.attempts, 4)
+
+    async def test_alert_plays_slot_then_name(self):
+        self.assertTrue(await self.coordinator.connect())
+        self.client.commands.clear()
+        shown = await self.coordinator.show_overlay_message("Merci viewer", color=(0, 255, 255),
+                                                            priority=PRIORITY_ALERT, slot="Merci")
+        self.assertTrue(shown)
+        # Carte "MERCI <3" rappelée par PLAY avant l'upload du texte avec le nom
+        self.assertIn("PLAY", self.client.commands)
+        self.assertLess(self.client.commands.index("PLAY"), self.client.commands.index("DATS"))
+        self.assertEqual(self.client.display, ('text',))
+
+    async def test_manual_disconnect_stays_down(self):
+        self.assertTrue(await self.coordinator.connect())
+        await self.coordinator.disconnect()
+        await asyncio.sleep(0.1)
+        self.assertFalse(self.client.is_connected)
+        self.assertEqual(self.coordinator.supervisor.stats()['state'], 'idle')
+
+
+if __name__ == '__main__':
+    unittest.main()
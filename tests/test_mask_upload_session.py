@@ -0,0 +1,143 @@
+import asyncio
+import os
+import struct
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "final_bot_v1"))
+
+from mask_simulator import SimulatedMaskClient
+from mask_controller import MaskTextDisplay
+from mask_upload import UploadSession, UploadCancelled
+
+# Image DIY 46x58 RGB
+IMAGE = bytes(i * 7 & 0xFF for i in range(46 * 58 * 3))
+
+
+def image_dats(index=1):
+    return bytearray([9]) + b"DATS" + struct.pack('>HH', len(IMAGE), index) + b"\x01"
+
+
+class TestUploadSession(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.client = SimulatedMaskClient(latency=0.001)
+        self.mask = MaskTextDisplay(client=self.client)
+        await self.mask.connect()
+
+    async def test_resumes_from_last_acked_packet(self):
+        progress = []
+        stalled = False
+
+        def on_progress(acked, total):
+            nonlocal stalled
+            progress.append(acked)
+            if not stalled and acked >= total // 2:
+                # Le masque cesse de répondre le temps de plusieurs timeouts REOK
+                stalled = True
+                self.client.loss = 1.0
+                asyncio.get_running_loop().call_later(0.3, setattr, self.client, 'loss', 0.0)
+
+        session = UploadSession(self.mask, image_dats(), IMAGE, on_progress=on_progress,
+                                ack_timeout=0.05, max_retries=1, resume_attempts=5, resume_delay=0.05)
+        await session.run()
+
+        self.assertEqual(session.state, 'done')
+        self.assertGreaterEqual(session.resumes, 1)
+        self.assertEqual(self.client.commands.count("DATS"), 1)
+        self.assertEqual(self.client.image, IMAGE)
+        self.assertEqual(progress, sorted(progress))
+        self.assertEqual(progress[-1], len(IMAGE))
+        self.assertFalse(self.mask.upload_running)
+
+    async def test_gives_up_after_resume_attempts(self):
+        self.client.loss = 1.0
+        session = UploadSession(self.mask, image_dats(), IMAGE,
+                                ack_timeout=0.02, max_retries=0, resume_attempts=2, resume_delay=0.01)
+        with self.assertRaises(TimeoutError):
+            await session.run()
+        self.assertEqual((session.state, session.resumes), ('failed', 2))
+        self.assertFalse(self.mask.upload_running)
+
+    async def test_cancel_stops_before_datcp(self):
+        session = None
+
+        def on_progress(acked, total):
+            if acked > 1000:
+                session.cancel()
+
+        session = UploadSession(self.mask, image_dats(), IMAGE, on_progress=on_progress)
+        with self.assertRaises(UploadCancelled):
+            await session.run()
+
+        self.assertEqual(session.state, 'cancelled')
+        self.assertNotIn("DATCP", self.client.commands)
+        self.assertLess(session.acked_bytes, len(IMAGE))
+        self.assertFalse(self.mask.upload_running)
+
+        # Le DATS suivant repart de zéro
+        await self.mask.upload_raw_rgb(IMAGE, image_index=2)
+        self.assertEqual((self.client.image, self.client.image_index), (IMAGE, 2))
+
+    async def test_cancel_token(self):
+        # Jeton déjà levé : rien n'est envoyé
+        cancel = asyncio.Event()
+        cancel.set()
+        with self.assertRaises(UploadCancelled):
+            await self.mask.upload_raw_rgb(IMAGE, cancel=cancel)
+        self.assertNotIn("DATS", self.client.commands)
+
+        # Levé pendant l'upload : arrêt au paquet suivant
+        self.client.latency = 0.01
+        cancel = asyncio.Event()
+        upload = asyncio.create_task(self.mask.upload_raw_rgb(IMAGE, cancel=cancel))
+        while self.mask.upload_session is None or self.mask.upload_session.acked_bytes == 0:
+            await asyncio.sleep(0.005)
+        cancel.set()
+        with self.assertRaises(UploadCancelled):
+            await upload
+        self.assertEqual(self.client.uploads_completed, 0)
+        self.assertEqual(self.mask.frame_deltas.stats()['superseded'], 2)
+
+    async def test_per_call_pacing_leaves_controller_preset(self):
+        self.mask.set_pacing('fast')
+        upload = asyncio.create_task(self.mask.upload_raw_rgb(IMAGE, pacing='safe'))
+        while self.mask.upload_session is None or self.mask.upload_session.acked_bytes == 0:
+            await asyncio.sleep(0.005)
+        # Preset de l'appel transmis au moteur, pas installé sur le contrôleur
+        self.assertEqual(self.mask.upload_session.engine.window, 1)
+        self.assertEqual(self.mask.pacing.name, 'fast')
+
+        # POST /api/pacing pendant l'upload : conservé après la fin de l'appel
+        self.mask.set_pacing('max')
+        await upload
+        self.assertEqual(self.mask.pacing.name, 'max')
+        self.assertEqual(self.client.image, IMAGE)
+
+    async def test_identical_image_saved_once(self):
+        await self.mask.upload_raw_rgb(IMAGE)
+        await self.mask.upload_raw_rgb(IMAGE)
+        # Économie comptée par le cache seul, pas une seconde fois par le suivi des différences
+        self.assertEqual(self.mask.upload_cache.stats()['bytes_saved'], len(IMAGE))
+        self.assertEqual(self.mask.frame_deltas.stats()['bytes_saved'], 0)
+
+    async def test_new_text_cancels_upload_in_flight(self):
+        self.client.latency = 0.01
+        first = asyncio.create_task(self.mask.upload_raw_rgb(IMAGE))
+        while self.mask.upload_session is None or self.mask.upload_session.acked_bytes == 0:
+            await asyncio.sleep(0.005)
+        previous = self.mask.upload_session
+
+        await self.mask.set_scrolling_text("HI", scroll_mode='steady')
+        with self.assertRaises(UploadCancelled):
+            await first
+
+        self.assertEqual(previous.state, 'cancelled')
+        self.assertEqual(self.mask.upload_session.state, 'done')
+        self.assertEqual(self.client.display, ('text',))
+        self.assertEqual(self.client.uploads_completed, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import base64
+import os
+import random
+import sys
+import unittest
+
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "final_bot_v1"))
+sys.path.insert(0, ROOT)
+
+from mask_raster import pixel_grid_to_rgb, decode_hex_grid, DIY_RGB_SIZE
+from mask_cache import changed_column_ranges, FrameDeltaTracker
+from src.modules.utils.pixel_grid import pixel_grid_to_rgb as core_pixel_grid_to_rgb
+
+
+def reference_buffer(pixels_data):
+    """Conversion pixel par pixel d'origine (PIL + boucles Python)"""
+    img = Image.new('RGB', (42, 56), (0, 0, 0))
+    pixels = img.load()
+    for i, hex_color in enumerate(pixels_data[:42 * 56]):
+        if hex_color and hex_color != 'rgba(0, 0, 0, 0)':
+            try:
+                h = hex_color.lstrip('#')
+                if len(h) == 6:
+                    pixels[i % 42, i // 42] = tuple(int(h[j:j + 2], 16) for j in (0, 2, 4))
+            except ValueError:
+                pass
+    resized = img.resize((46, 58), Image.Resampling.LANCZOS).load()
+    buffer = bytearray()
+    for x in range(46):
+        for y in range(58):
+            buffer.extend(resized[x, y])
+    return bytes(buffer)
+
+
+class TestPixelGrid(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(7)
+        self.hexes = ['#%06x' % rng.randrange(1 << 24) for _ in range(42 * 56)]
+        self.hexes[1] = ''
+        self.hexes[2] = None
+        self.hexes[3] = 'rgba(0, 0, 0, 0)'
+        self.hexes[4] = '#GGGGGG'
+        self.hexes[5] = '#ABCDEF'
+
+    def test_matches_reference_conversion(self):
+        expected = reference_buffer(self.hexes)
+        self.assertEqual(len(expected), DIY_RGB_SIZE)
+        self.assertEqual(pixel_grid_to_rgb(self.hexes), expected)
+        self.assertEqual(core_pixel_grid_to_rgb(self.hexes), expected)
+        # Grille incomplète : le reste est noir
+        self.assertEqual(pixel_grid_to_rgb(self.hexes[:300]), reference_buffer(self.hexes[:300]))
+
+    def test_raw_and_base64_bodies(self):
+        raw = decode_hex_grid(self.hexes).tobytes()
+        self.assertEqual(len(raw), 42 * 56 * 3)
+        expected = reference_buffer(self.hexes)
+        self.assertEqual(pixel_grid_to_rgb(raw), expected)
+        self.assertEqual(pixel_grid_to_rgb(base64.b64encode(raw).decode()), expected)
+        with self.assertRaises(ValueError):
+            pixel_grid_to_rgb(raw[:-3])
+        with self.assertRaises(ValueError):
+            pixel_grid_to_rgb("not base64!")
+
+    def test_malformed_bodies(self):
+        black = reference_buffer([])
+        for convert in (pixel_grid_to_rgb, core_pixel_grid_to_rgb):
+            # Entrées qui ne sont pas des chaînes : noir, sans exception
+            self.assertEqual(convert([123] * (42 * 56)), black)
+            self.assertEqual(convert([{'r': 1}, ['#ffffff'], 1.5]), black)
+            # Espaces acceptés par bytes.fromhex : ne doivent pas décaler les couleurs suivantes
+            self.assertEqual(convert(['12 34 ', '#ABCDEF']), reference_buffer(['', '#ABCDEF']))
+            # Corps qui n'est pas une liste : ValueError (400 côté éditeur)
+            for body in ({'pixels': []}, None, 42):
+                with self.assertRaises(ValueError):
+                    convert(body)
+
+
+class TestFrameDeltas(unittest.TestCase):
+
+    def test_changed_column_ranges(self):
+        before = bytes(DIY_RGB_SIZE)
+        after = bytearray(before)
+        for column in (0, 1, 2, 10, 45):
+            after[column * 174 + 100] = 1
+        self.assertEqual(changed_column_ranges(before, bytes(after)), [(0, 3), (10, 11), (45, 46)])
+        self.assertEqual(changed_column_ranges(before, before), [])
+
+    def test_tracker_counts_changes_and_savings(self):
+        tracker = FrameDeltaTracker()
+        frame = bytes(DIY_RGB_SIZE)
+        self.assertIsNone(tracker.compare(1, frame))
+        tracker.record(1, frame)
+
+        edited = bytearray(frame)
+        edited[5 * 174] = 255
+        self.assertEqual(tracker.compare(1, bytes(edited)), [(5, 6)])
+        self.assertEqual(tracker.compare(1, frame), [])
+        tracker.supersede(DIY_RGB_SIZE - 1000)
+
+        stats = tracker.stats()
+        self.assertEqual((stats['compared'], stats['unchanged'], stats['superseded']), (2, 1, 1))
+        self.assertEqual(stats['bytes_saved'], DIY_RGB_SIZE - 1000)
+        self.assertEqual(stats['changed_ratio'], round(1 / 92, 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import asyncio
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.modules.core.link import read_negotiated_mtu
+from src.modules.core.simulator import SimulatedMaskClient
+from src.working.complete_text_display import NOTIFY_CHAR, MaskTextDisplay
+
+
+class TestTextDisplayUpload(unittest.TestCase):
+
+    def _display(self, **kwargs):
+        display = MaskTextDisplay()
+        client = SimulatedMaskClient(latency=0.001, **kwargs)
+        display.client = client
+        return display, client
+
+    async def _upload(self, display, client, text):
+        await client.connect()
+        await client.start_notify(NOTIFY_CHAR, display._notification_handler)
+        display.link.set_mtu(await read_negotiated_mtu(client))
+        return await display._upload_text_content(text, (255, 0, 0))
+
+    def test_text_upload_uses_sliding_window(self):
+        display, client = self._display()
+        self.assertTrue(asyncio.run(self._upload(display, client, "HELLO WORLD")))
+        self.assertEqual(client.display, ('text',))
+        self.assertEqual(client.uploads_completed, 1)
+        self.assertEqual(display.current_upload, {})
+
+    def test_chunk_size_follows_negotiated_mtu(self):
+        display, client = self._display(mtu=64)
+        self.assertTrue(asyncio.run(self._upload(display, client, "HELLO WORLD")))
+        # MTU 64 : 64 - 3 (ATT) - 2 (en-tête paquet) = 59 octets par paquet
+        self.assertEqual(display.link.chunk_size, 59)
+        self.assertEqual(client.upload_writes, -(-(176 + 264) // 59))
+        self.assertEqual(display.link.acks, client.upload_writes)
+
+    def test_lost_packets_are_resent(self):
+        display, client = self._display(loss=0.2, seed=3)
+        self.assertTrue(asyncio.run(self._upload(display, client, "HELLO WORLD HELLO")))
+        self.assertEqual(client.uploads_completed, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+from aiohttp.test_utils import TestClient, TestServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "final_bot_v1"))
+
+from main import MaskCoordinator
+from mask_simulator import SimulatedMaskClient
+from web_server import WebServer
+
+
+class TestEventStream(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.client = SimulatedMaskClient(latency=0.001)
+        self.coordinator = MaskCoordinator()
+        self.coordinator.mask.injected_client = self.client
+        self.coordinator.mask.connector.cache = None
+        self.coordinator.slots.manifest_path = os.path.join(self.tmp.name, "diy_slots.json")
+        # Pas d'emplacements DIY à synchroniser : seuls les évènements de l'upload testé arrivent
+        self.coordinator.slots.slots = {}
+        self.server = WebServer(self.coordinator)
+        self.http = TestClient(TestServer(self.server.app))
+        await self.http.start_server()
+
+    async def asyncTearDown(self):
+        await self.http.close()
+        await self.coordinator.disconnect()
+        self.tmp.cleanup()
+
+    async def _events(self, response):
+        """(event, data) lus au fil du flux SSE"""
+        event = None
+        while True:
+            line = (await response.content.readline()).decode('utf-8').rstrip('\n')
+            if line.startswith('event: '):
+                event = line[len('event: '):]
+            elif line.startswith('data: '):
+                yield event, json.loads(line[len('data: '):])
+
+    async def _next(self, stream, name, timeout=2.0):
+        async def find():
+            async for event, data in stream:
+                if event == name:
+                    return data
+        return await asyncio.wait_for(find(), timeout)
+
+    async def test_stream_pushes_state_logs_and_progress(self):
+        self.server.log("old line")
+        response = await self.http.get('/api/events')
+        self.assertEqual(response.headers['Content-Type'], 'text/event-stream')
+        stream = self._events(response)
+
+        status = await self._next(stream, 'status')
+        self.assertFalse(status['connected'])
+        self.assertEqual([r['message'] for r in await self._next(stream, 'logs')], ["old line"])
+
+        self.server.log("new line")
+        record = await self._next(stream, 'log')
+        self.assertEqual((record['seq'], record['message']), (2, "new line"))
+
+        await self.coordinator.connect()
+        state = await self._next(stream, 'state')
+        while not state['connected']:
+            state = await self._next(stream, 'state')
+
+        image = bytes(46 * 58 * 3)
+        upload = asyncio.create_task(self.coordinator.mask.upload_raw_rgb(image))
+        progress = []
+        while not progress or progress[-1]['acked_bytes'] < len(image):
+            progress.append(await self._next(stream, 'upload'))
+        await upload
+        # Un évènement par paquet acquitté
+        packets = -(-len(image) // self.coordinator.mask.link.chunk_size)
+        self.assertEqual(len(progress), packets)
+        self.assertEqual(progress[-1]['progress'], 100)
+        response.close()
+
+
+    async def test_newest_preview_wins(self):
+        await self.coordinator.connect()
+        self.client.latency = 0.005
+        frames = [bytes([value, 0, 0]) * (42 * 56) for value in (10, 20, 30)]
+        headers = {'Content-Type': 'application/octet-stream'}
+
+        first = asyncio.create_task(self.http.post('/api/preview', data=frames[0], headers=headers))
+        while self.coordinator.mask.upload_session is None or self.coordinator.mask.upload_session.acked_bytes == 0:
+            await asyncio.sleep(0.005)
+        rest = [asyncio.create_task(self.http.post('/api/preview', data=frame, headers=headers))
+                for frame in frames[1:]]
+        statuses = [(await (await task).json())['status'] for task in [first] + rest]
+
+        # Les deux dernières requêtes peuvent arriver dans n'importe quel ordre : une seule est affichée
+        self.assertEqual(statuses[0], 'superseded')
+        self.assertEqual(sorted(statuses[1:]), ['ok', 'superseded'])
+        shown = frames[statuses.index('ok')]
+        self.assertEqual(self.client.image[:3], shown[:3])
+        self.assertEqual(self.client.uploads_completed, 1)
+        deltas = self.coordinator.mask.frame_deltas.stats()
+        self.assertEqual(deltas['superseded'], 2)
+        self.assertGreater(deltas['bytes_saved'], 8004)
+
+
+if __name__ == "__main__":
+    unittest.main()
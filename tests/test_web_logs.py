@@ -0,0 +1,99 @@
+import io
+import logging
+import os
+import sys
+import unittest
+
+from aiohttp.test_utils import TestClient, TestServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "final_bot_v1"))
+
+from main import MaskCoordinator
+from web_server import WebServer, LogRing, ConsoleCapture
+
+
+class TestLogRing(unittest.TestCase):
+
+    def test_cursor_and_overflow(self):
+        ring = LogRing(maxlen=3)
+        for i in range(5):
+            ring.append(f"line {i}")
+
+        records, cursor, dropped = ring.since(0)
+        self.assertEqual([r['seq'] for r in records], [3, 4, 5])
+        self.assertEqual((cursor, dropped), (5, 2))
+
+        records, cursor, dropped = ring.since(3)
+        self.assertEqual([r['message'] for r in records], ["line 3", "line 4"])
+        self.assertEqual((cursor, dropped), (5, 0))
+
+        self.assertEqual(ring.since(5), ([], 5, 0))
+        records, cursor, _ = ring.since(2, limit=1)
+        self.assertEqual(([r['seq'] for r in records], cursor), ([3], 3))
+
+    def test_cursor_from_previous_run(self):
+        # Curseur donné par un serveur redémarré depuis : on repart du plus ancien record gardé
+        ring = LogRing(maxlen=3)
+        self.assertEqual(ring.since(40), ([], 0, 0))
+        for i in range(5):
+            ring.append(f"line {i}")
+        records, cursor, dropped = ring.since(40)
+        self.assertEqual([r['seq'] for r in records], [3, 4, 5])
+        self.assertEqual((cursor, dropped), (5, 2))
+        self.assertEqual(ring.since(6), ring.since(0))
+
+
+class TestConsoleCapture(unittest.TestCase):
+
+    def test_print_pieces_become_one_record_per_line(self):
+        server = WebServer(MaskCoordinator())
+        logger = logging.getLogger('test.console')
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        handler = server.log_handler()
+        logger.addHandler(handler)
+        terminal = io.StringIO()
+        try:
+            capture = ConsoleCapture(logger, stream=terminal)
+            print("✅ ok", file=capture)
+            print("❌ Erreur upload: boom", "⚠️ second", sep="\n", file=capture)
+            capture.write("partial")
+        finally:
+            logger.removeHandler(handler)
+
+        self.assertEqual(terminal.getvalue(), "✅ ok\n❌ Erreur upload: boom\n⚠️ second\npartial")
+        records, _, _ = server.logs.since(0)
+        self.assertEqual([(r['level'], r['source'], r['message']) for r in records], [
+            ('INFO', 'test.console', "✅ ok"),
+            ('ERROR', 'test.console', "❌ Erreur upload: boom"),
+            ('WARNING', 'test.console', "⚠️ second"),
+        ])
+
+
+class TestLogsEndpoint(unittest.IsolatedAsyncioTestCase):
+
+    async def test_since_cursor(self):
+        server = WebServer(MaskCoordinator())
+        http = TestClient(TestServer(server.app))
+        await http.start_server()
+        try:
+            for i in range(4):
+                server.log(f"line {i}")
+            data = await (await http.get('/api/logs', params={'since': 2})).json()
+            self.assertEqual([r['message'] for r in data['logs']], ["line 2", "line 3"])
+            self.assertEqual(data['next'], 4)
+
+            data = await (await http.get('/api/logs', params={'since': data['next']})).json()
+            self.assertEqual((data['logs'], data['next']), ([], 4))
+
+            response = await http.get('/api/logs', params={'since': 'x'})
+            self.assertEqual(response.status, 400)
+            response = await http.get('/api/logs', params={'limit': -1})
+            self.assertEqual(response.status, 400)
+        finally:
+            await http.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
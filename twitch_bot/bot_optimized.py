@@ -19,6 +19,7 @@ from twitchio.ext import commands
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from controller_optimized import OptimizedMaskController, PatternConfig
+from src.modules.core.scheduler import DisplayScheduler, UploadPreempted, PRIORITY_ALERT, PRIORITY_SAY
 
 # Charger les variables d'environnement
 load_dotenv()
@@ -30,6 +31,17 @@ CLIENT_ID = os.environ.get('TWITCH_CLIENT_ID')
 APP_TOKEN = os.environ.get('TWITCH_APP_TOKEN')
 
 class ExtendedMaskController(OptimizedMaskController):
+    def __init__(self):
+        super().__init__()
+        # asyncio.Event levé par l'ordonnanceur quand une alerte attend derrière un !say
+        self.upload_interrupt = None
+
+    async def _send_text_pattern(self, pattern):
+        """Envoie un texte, sauf si une alerte plus prioritaire attend (UploadPreempted, remis en file)"""
+        if self.upload_interrupt is not None and self.upload_interrupt.is_set():
+            raise UploadPreempted(f"envoi de '{pattern.text}' interrompu")
+        return await super()._send_text_pattern(pattern)
+
     async def show_animation(self, anim_id):
         """Affiche une animation intégrée (ANIM)"""
         try:
@@ -61,8 +73,9 @@ class FinalTwitchBot(commands.Bot):
         # Désactiver le clignotement automatique qui cause des uploads intempestifs
         self.mask_controller.config.animation_settings['auto_blink_enabled'] = False
         
-        self.mask_queue = asyncio.Queue()
-        self.mask_task = None
+        # Alertes avant !say, doublons fusionnés, retour à l'animation quand plus rien n'attend
+        self.scheduler = DisplayScheduler(on_idle=self.start_animation_loop,
+                                          interrupt_target=self.mask_controller)
         self.helix_user_id = None
         
         # Animation Loop
@@ -120,7 +133,6 @@ class FinalTwitchBot(commands.Bot):
         # Démarrage du contrôleur masque
         if await self.mask_controller.initialize():
             print("✅ Masque connecté et prêt !")
-            self.mask_task = asyncio.create_task(self.process_mask_queue())
             
             # Démarrage de l'animation par défaut
             await self.start_animation_loop()
@@ -201,47 +213,28 @@ class FinalTwitchBot(commands.Bot):
         """Obsolète"""
         pass
 
-    async def process_mask_queue(self):
-        """Traite la file d'attente des messages pour le masque"""
-        while True:
-            try:
-                item = await self.mask_queue.get()
-                text = item['text']
-                cfg = item.get('config', {})
-                
-                print(f"🎭 Envoi au masque: {text}")
-                
-                # 1. Pause Animation
-                await self.stop_animation_loop()
-                await asyncio.sleep(1.0) # Pause pour laisser le BLE respirer
-                
-                # 2. Affichage Texte avec Config
-                # TODO: PatternConfig ne supporte pas encore 'decoration' ou 'bold' nativement
-                # On passe 'color' et 'category'
-                pattern = PatternConfig(
-                    name="temp", 
-                    text=text, 
-                    color=cfg.get('text_color', 'white'), 
-                    category="text"
-                )
-                await self.mask_controller._send_text_pattern(pattern)
-                
-                # 3. Attente Lecture
-                repeat = cfg.get('repeat', 1)
-                duration = (5.0 + (len(text) * 0.3)) * repeat + 2.0 # +2s de marge
-                await asyncio.sleep(duration)
-                
-                # 4. Reprise Animation
-                await self.start_animation_loop()
-                
-                self.mask_queue.task_done()
-            except Exception as e:
-                print(f"❌ Erreur queue masque: {e}")
-                await asyncio.sleep(1)
+    async def _show_mask_message(self, text, cfg):
+        """Affiche un message ; retourne son temps de lecture (raccourci par l'ordonnanceur si d'autres attendent)"""
+        print(f"🎭 Envoi au masque: {text}")
+        
+        # TODO: PatternConfig ne supporte pas encore 'decoration' ou 'bold' nativement
+        # On passe 'color' et 'category'
+        pattern = PatternConfig(
+            name="temp", 
+            text=text, 
+            color=cfg.get('text_color', 'white'), 
+            category="text"
+        )
+        await self.mask_controller._send_text_pattern(pattern)
+        
+        repeat = cfg.get('repeat', 1)
+        return (5.0 + (len(text) * 0.3)) * repeat + 2.0 # +2s de marge
 
-    async def queue_mask_message(self, text, config=None):
-        """Ajoute un message à la file d'attente"""
-        await self.mask_queue.put({'text': text, 'config': config or {}})
+    async def queue_mask_message(self, text, config=None, priority=PRIORITY_SAY):
+        """Met un message en file (alertes prioritaires, messages identiques en attente fusionnés)"""
+        cfg = config or {}
+        self.scheduler.submit(lambda: self._show_mask_message(text, cfg), priority,
+                              key=(text, cfg.get('text_color')), name=text)
 
     async def handle_follow(self, pseudo, is_sub=False):
         """Gère l'affichage d'un follow/sub"""
@@ -253,7 +246,7 @@ class FinalTwitchBot(commands.Bot):
             cfg_key = 'sub'
             
         cfg = self.config.get(cfg_key, self.config.get('say'))
-        await self.queue_mask_message(message, cfg)
+        await self.queue_mask_message(message, cfg, priority=PRIORITY_ALERT)
 
     @commands.command(name='say')
     async def cmd_say(self, ctx, *, text: str):